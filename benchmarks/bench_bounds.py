@@ -0,0 +1,125 @@
+"""Compare `Bounds` operations and layout memory against a pydantic `Bounds`.
+
+Run with::
+
+    python benchmarks/bench_bounds.py
+
+"""
+
+from __future__ import annotations
+
+import tempfile
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from bench_layout import make_large_group_device
+from pydantic import BaseModel
+
+from pvi._format.dls import DLSFormatter
+from pvi._format.screen import ScreenFormatterFactory
+from pvi._format.utils import Bounds
+
+
+class PydanticBounds(BaseModel):
+    """`Bounds` as it was implemented with pydantic, for reference"""
+
+    x: int = 0
+    y: int = 0
+    w: int = 0
+    h: int = 0
+
+    def clone(self) -> PydanticBounds:
+        return PydanticBounds(x=self.x, y=self.y, w=self.w, h=self.h)
+
+    def split_by_ratio(
+        self, ratio: tuple[float, ...], spacing: int
+    ) -> tuple[PydanticBounds, ...]:
+        splits = len(ratio) - 1
+        widget_space = self.w - splits * spacing
+        widget_widths = tuple(int(widget_space * r) for r in ratio)
+        widget_xs = tuple(
+            self.x + sum(widget_widths[:i]) + spacing * i for i in range(splits + 1)
+        )
+        return tuple(
+            PydanticBounds(x=x, y=self.y, w=w, h=self.h)
+            for x, w in zip(widget_xs, widget_widths, strict=True)
+        )
+
+
+def time_operations(number: int = 100_000):
+    """Print the time per call of common operations on each `Bounds` type"""
+    ratio = (0.25,) * 4
+    print(f"{'operation':>16} {'pydantic ns':>12} {'Bounds ns':>10} {'speedup':>8}")
+    for name, statement in (
+        ("construct", "cls(x=1, y=2, w=3, h=4)"),
+        ("clone", "bounds.clone()"),
+        ("split_by_ratio", "bounds.split_by_ratio(ratio, 4)"),
+    ):
+        times = [
+            timeit.timeit(
+                statement,
+                globals={
+                    "cls": cls,
+                    "bounds": cls(x=1, y=2, w=300, h=4),
+                    "ratio": ratio,
+                },
+                number=number,
+            )
+            / number
+            * 1e9
+            for cls in (PydanticBounds, Bounds)
+        ]
+        print(
+            f"{name:>16} {times[0]:>12.0f} {times[1]:>10.0f}"
+            f" {times[0] / times[1]:>7.1f}x"
+        )
+
+    sizes = [_instance_bytes(cls) for cls in (PydanticBounds, Bounds)]
+    print(f"{'bytes/instance':>16} {sizes[0]:>12.0f} {sizes[1]:>10.0f}")
+
+
+def _instance_bytes(cls: type[PydanticBounds | Bounds], count: int = 10_000) -> float:
+    tracemalloc.start()
+    instances = [cls(x=i, y=i, w=i, h=i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del instances
+    return size / count
+
+
+def measure_layout(signals: int = 5000):
+    """Print the time and peak memory allocated laying out a large screen"""
+    create_screen_formatter = ScreenFormatterFactory.create_screen_formatter
+    results: list[tuple[float, int]] = []
+
+    def measured(self, *args, **kwargs):  # type: ignore
+        tracemalloc.start()
+        start = timeit.default_timer()
+        try:
+            return create_screen_formatter(self, *args, **kwargs)  # type: ignore
+        finally:
+            elapsed = timeit.default_timer() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((elapsed, peak))
+
+    device = make_large_group_device(signals)
+    ScreenFormatterFactory.create_screen_formatter = measured  # type: ignore
+    try:
+        # Only the top level screen is measured, as a large Group is not a SubScreen
+        with tempfile.TemporaryDirectory() as tmp:
+            DLSFormatter().format_bob(device, Path(tmp) / "bench.bob")
+    finally:
+        ScreenFormatterFactory.create_screen_formatter = create_screen_formatter
+
+    elapsed, peak = results[0]
+    print(
+        f"Layout of {signals} signals: {elapsed:.3f}s (traced), "
+        f"peak {peak / 1024 / 1024:.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    time_operations()
+    measure_layout()
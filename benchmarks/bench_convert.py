@@ -0,0 +1,105 @@
+"""Time and measure peak memory of parsing expanded databases of increasing size,
+extracting their asyn records and converting them to a Device.
+
+Run with::
+
+    python benchmarks/bench_convert.py
+
+"""
+
+import contextlib
+import io
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from pvi._convert._db_parser import iter_records
+from pvi._convert._template_convert import RecordExtractor, TemplateConverter
+
+RECORD = """
+# Parameter {i}
+record(ao, "DEV:Param{i}")
+{{
+    field(DESC, "Parameter {i} {{in braces}}")
+    field(DTYP, "asynFloat64")
+    field(OUT,  "@asyn(PORT,0,1)PARAM_{i}")
+    info(autosaveFields, "VAL")
+}}
+
+record(ai, "DEV:Param{i}_RBV")
+{{
+    field(DTYP, "asynFloat64")
+    field(INP,  "@asyn(PORT,0,1)PARAM_{i}")
+    field(SCAN, "I/O Intr")
+}}
+
+record(calc, "DEV:Calc{i}")
+{{
+    field(CALC, "A+1")
+}}
+"""
+
+
+def write_database(path: Path, parameters: int) -> None:
+    """Write an expanded database with `parameters` setting pairs and a calc record
+    for each, i.e. 3 * `parameters` records"""
+    with path.open("w") as f:
+        for i in range(parameters):
+            f.write(RECORD.format(i=i))
+
+
+def parse(path: Path) -> None:
+    with path.open() as f:
+        for _ in iter_records(f):
+            pass
+
+
+def extract(path: Path) -> None:
+    # Non-asyn records are reported as they are skipped
+    with contextlib.redirect_stdout(io.StringIO()), path.open() as f:
+        RecordExtractor(f).get_asyn_records()
+
+
+def convert(path: Path) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        TemplateConverter([path]).convert()
+
+
+def measure(function: Callable[[Path], None], path: Path) -> tuple[float, float]:
+    """Return the time taken by `function` and its peak memory in MiB, measured in a
+    second call to leave the time unaffected by tracemalloc"""
+    start = time.perf_counter()
+    function(path)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak / 2**20
+
+
+def main():
+    print(
+        f"{'records':>8} {'MiB file':>9} {'parse s':>8} {'parse MiB':>10}"
+        f" {'extract s':>10} {'extract MiB':>12} {'convert s':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for parameters in (1000, 10000, 33334):
+            path = Path(tmp) / "device.db"
+            write_database(path, parameters)
+            size = path.stat().st_size / 2**20
+            parse_s, parse_mib = measure(parse, path)
+            extract_s, extract_mib = measure(extract, path)
+            convert_s, _ = measure(convert, path)
+            print(
+                f"{parameters * 3:>8} {size:>9.1f} {parse_s:>8.2f} {parse_mib:>10.2f}"
+                f" {extract_s:>10.2f} {extract_mib:>12.1f} {convert_s:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
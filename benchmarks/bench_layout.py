@@ -0,0 +1,122 @@
+"""Time laying out screens of increasing size to check layout scales linearly.
+
+Run with::
+
+    python benchmarks/bench_layout.py
+
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from pvi._format.dls import DLSFormatter
+from pvi._format.screen import ScreenFormatterFactory
+from pvi.device import (
+    ComponentUnion,
+    Device,
+    Grid,
+    Group,
+    SignalR,
+    SignalRW,
+    TextRead,
+    TextWrite,
+)
+
+SIZES = (625, 1250, 2500, 5000)
+
+
+def make_signals(count: int, prefix: str = "") -> list[ComponentUnion]:
+    """Create `count` signals, alternating between SignalR and SignalRW"""
+    return [
+        SignalRW(
+            name=f"{prefix}Signal{i}",
+            write_pv=f"{prefix.upper()}SIGNAL{i}",
+            write_widget=TextWrite(),
+            read_pv=f"{prefix.upper()}SIGNAL{i}_RBV",
+            read_widget=TextRead(),
+        )
+        if i % 2
+        else SignalR(name=f"{prefix}Signal{i}", read_pv=f"{prefix.upper()}SIGNAL{i}")
+        for i in range(count)
+    ]
+
+
+def make_flat_device(signals: int) -> Device:
+    """Create a Device with `signals` top level signals"""
+    return Device(label="Flat", children=make_signals(signals))
+
+
+def make_grouped_device(signals: int, group_size: int = 25) -> Device:
+    """Create a Device with `signals` signals split into Groups of `group_size`"""
+    return Device(
+        label="Grouped",
+        children=[
+            Group(
+                name=f"Group{g}",
+                layout=Grid(),
+                children=make_signals(group_size, prefix=f"Group{g}"),
+            )
+            for g in range(signals // group_size)
+        ],
+    )
+
+
+def make_large_group_device(signals: int) -> Device:
+    """Create a Device with all `signals` signals in one Group"""
+    return Device(
+        label="Large Group",
+        children=[Group(name="Group", layout=Grid(), children=make_signals(signals))],
+    )
+
+
+def time_layout(device: Device, repeat: int = 3) -> float:
+    """Return the best time spent laying out the screens of `device`
+
+    Only the time spent in `ScreenFormatterFactory.create_screen_formatter` is
+    counted, not formatting the widgets or writing the files.
+
+    """
+    create_screen_formatter = ScreenFormatterFactory.create_screen_formatter
+    elapsed = 0.0
+    depth = 0
+
+    def timed(self, *args, **kwargs):  # type: ignore
+        nonlocal elapsed, depth
+        # Sub screens are created recursively, so only time the outermost call
+        depth += 1
+        start = time.perf_counter()
+        try:
+            return create_screen_formatter(self, *args, **kwargs)  # type: ignore
+        finally:
+            depth -= 1
+            if depth == 0:
+                elapsed += time.perf_counter() - start
+
+    ScreenFormatterFactory.create_screen_formatter = timed  # type: ignore
+    best = float("inf")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for _ in range(repeat):
+                elapsed = 0.0
+                DLSFormatter().format(device, Path(tmp) / "bench.bob")
+                best = min(best, elapsed)
+    finally:
+        ScreenFormatterFactory.create_screen_formatter = create_screen_formatter
+    return best
+
+
+def main():
+    print(f"{'device':>12} {'signals':>8} {'seconds':>9} {'us/signal':>10}")
+    for name, make_device in (
+        ("flat", make_flat_device),
+        ("grouped", make_grouped_device),
+        ("large group", make_large_group_device),
+    ):
+        for size in SIZES:
+            seconds = time_layout(make_device(size))
+            print(f"{name:>12} {size:>8} {seconds:>9.4f} {seconds / size * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
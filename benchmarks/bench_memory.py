@@ -0,0 +1,223 @@
+"""Measure the memory allocated by the stages of formatting a large synthetic device
+with tracemalloc, and check it against the budgets in memory_budgets.json.
+
+The stages are loading and merging a chain of included devices, laying out the screens
+of the device with a `ScreenFormatterFactory` and rendering them to bob files with lxml.
+Peak is the most memory allocated at once during a stage and retained is the memory
+still allocated after it. tracemalloc only sees memory allocated by Python, not by
+libxml2, so the growth of the peak RSS is shown too, but not checked, as it depends on
+the platform and allocator.
+
+Run with::
+
+    python benchmarks/bench_memory.py [--signals 10000] [--update-budgets]
+
+It fails if a stage is over its budget. Run it with ``--update-budgets`` to accept an
+intended change in memory use.
+
+"""
+
+import argparse
+import gc
+import json
+import math
+import sys
+import tempfile
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from lxml.etree import _Element  # pyright: ignore [reportPrivateUsage]
+from synthetic import DeviceShape, patch_format_screens, write_device_chain
+
+from pvi._format.dls import DLSFormatter, write_bob
+from pvi._format.screen import ScreenFormatterFactory
+from pvi._format.widget import GroupFormatter
+from pvi._format.writer import WriteSummary
+from pvi._timings import peak_rss
+from pvi.device import Device
+
+SIGNALS = 10000
+BUDGETS = Path(__file__).parent / "memory_budgets.json"
+# Headroom over the measured memory when budgets are updated
+BUDGET_HEADROOM = 1.25
+# Smallest budget, so that stages that retain almost nothing do not fail on noise
+MIN_BUDGET_MIB = 1.0
+
+
+@dataclass
+class StageMemory:
+    """Memory allocated by one stage, in MiB"""
+
+    peak_mib: float
+    retained_mib: float
+    rss_growth_mib: float
+
+
+@contextmanager
+def measure(name: str, results: dict[str, StageMemory]) -> Iterator[None]:
+    """Measure the memory allocated while in this context as the stage `name`"""
+    gc.collect()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    rss_before = peak_rss()
+    yield
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    results[name] = StageMemory(
+        peak_mib=(peak - before) / 2**20,
+        retained_mib=(retained - before) / 2**20,
+        rss_growth_mib=(peak_rss() - rss_before) / 2**20,
+    )
+
+
+def bob_screen_factory(device: Device, path: Path) -> ScreenFormatterFactory[_Element]:
+    """Get the `ScreenFormatterFactory` that `DLSFormatter` creates to format bob files,
+    without formatting any screens"""
+    factories: list[ScreenFormatterFactory[_Element]] = []
+
+    def capture(
+        format_screens: Any, factory: ScreenFormatterFactory[_Element], *args: Any
+    ) -> WriteSummary:
+        factories.append(factory)
+        return WriteSummary()
+
+    with patch_format_screens(capture):
+        DLSFormatter().format_bob(device, path)
+
+    return factories[0]
+
+
+def measure_stages(signals: int, directory: Path) -> dict[str, StageMemory]:
+    """Measure every stage for a synthetic device chain of `signals` signals.
+
+    Returns:
+        Memory allocated by each stage
+
+    """
+    results: dict[str, StageMemory] = {}
+    device_path = write_device_chain(DeviceShape(signals), directory)
+    factory = bob_screen_factory(
+        Device(label="Synthetic 0"), directory / "Synthetic.bob"
+    )
+
+    tracemalloc.start()
+    try:
+        with measure("include chain", results):
+            device = Device.deserialize(device_path)
+            device.deserialize_parents([directory])
+
+        with measure("layout", results):
+            screen, sub_screens = factory.create_screen_formatter(
+                device.children, device.label
+            )
+            screens: list[tuple[str, GroupFormatter[_Element]]] = [
+                ("Synthetic", screen),
+                *sub_screens,
+            ]
+
+        with measure("render bob", results):
+            summary = WriteSummary()
+            for name, screen in screens:
+                write_bob(screen, directory / f"{name}.bob", summary)
+    finally:
+        tracemalloc.stop()
+
+    return results
+
+
+def check_budgets(
+    signals: int, results: dict[str, StageMemory], budgets: dict[str, Any]
+) -> list[str]:
+    """Compare the memory of each stage with its budget.
+
+    Args:
+        signals: Number of signals the stages were measured with
+        results: Memory allocated by each stage
+        budgets: The content of memory_budgets.json
+
+    Returns:
+        A message for each stage that allocated more than its budget
+
+    """
+    if budgets.get("signals") != signals:
+        return [f"No budgets for {signals} signals, only {budgets.get('signals')}"]
+
+    failures: list[str] = []
+    for stage, memory in results.items():
+        budget = budgets["stages"].get(stage)
+        if budget is None:
+            failures.append(f"No budget for {stage}")
+            continue
+
+        for key in ("peak_mib", "retained_mib"):
+            used = getattr(memory, key)
+            if used > budget[key]:
+                failures.append(
+                    f"{stage} {key} is {used:.1f} MiB, over its budget of "
+                    f"{budget[key]:.1f} MiB"
+                )
+
+    return failures
+
+
+def make_budgets(signals: int, results: dict[str, StageMemory]) -> dict[str, Any]:
+    """Create budgets with headroom over the measured memory of each stage"""
+
+    def budget(mib: float) -> float:
+        # Round up to half a MiB
+        return max(MIN_BUDGET_MIB, math.ceil(mib * BUDGET_HEADROOM * 2) / 2)
+
+    return {
+        "signals": signals,
+        "stages": {
+            stage: {
+                "peak_mib": budget(memory.peak_mib),
+                "retained_mib": budget(memory.retained_mib),
+            }
+            for stage, memory in results.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--signals", type=int, default=SIGNALS)
+    parser.add_argument(
+        "--update-budgets",
+        action="store_true",
+        help=f"Write budgets with headroom over the measured memory to {BUDGETS.name}"
+        ", instead of failing if a stage is over its budget",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = measure_stages(args.signals, Path(tmp))
+
+    print(f"{'stage':>14} {'peak MiB':>9} {'retained MiB':>13} {'+RSS MiB':>9}")
+    for stage, memory in results.items():
+        print(
+            f"{stage:>14} {memory.peak_mib:>9.1f} {memory.retained_mib:>13.1f} "
+            f"{memory.rss_growth_mib:>9.1f}"
+        )
+
+    if args.update_budgets:
+        BUDGETS.write_text(
+            json.dumps(make_budgets(args.signals, results), indent=2) + "\n"
+        )
+        return
+
+    failures = check_budgets(args.signals, results, json.loads(BUDGETS.read_text()))
+    for failure in failures:
+        print(failure)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
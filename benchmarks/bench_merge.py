@@ -0,0 +1,43 @@
+"""Time merging the components of a deep include hierarchy of increasing size.
+
+Run with::
+
+    python benchmarks/bench_merge.py
+
+"""
+
+import time
+
+from bench_layout import make_signals
+
+from pvi.device import ComponentUnion, Device, Grid, Group
+
+
+def make_hierarchy(levels: int, groups: int, signals: int) -> list[ComponentUnion]:
+    """Create the components of `levels` included devices, each with `groups` groups of
+    `signals` signals. Every other level repeats the signals of the level before in new
+    groups, so they are removed from those groups when merged."""
+    components: list[ComponentUnion] = []
+    for level in range(levels):
+        for group in range(groups):
+            children = make_signals(signals, prefix=f"L{level // 2}G{group}")
+            components.append(
+                Group(
+                    name=f"Level{level}Group{group}", layout=Grid(), children=children
+                )
+            )
+    return components
+
+
+def main():
+    print(f"{'components':>11} {'s':>7}")
+    for levels in (4, 16, 64):
+        components = make_hierarchy(levels, groups=10, signals=50)
+        device = Device(label="Merge", children=[])
+        start = time.perf_counter()
+        device.merge_components(components)
+        print(f"{levels * 10 * 50:>11} {time.perf_counter() - start:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Time each stage of loading, formatting, converting and regrouping synthetic devices
+of increasing size, and check that no stage scales worse than linearly.
+
+Run with::
+
+    python benchmarks/bench_stages.py [--sizes 1000 10000 100000] [--check]
+
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from synthetic import (
+    DeviceShape,
+    patch_format_screens,
+    write_device_chain,
+    write_scaled_adl,
+    write_scaled_template,
+)
+
+from pvi._convert._template_convert import TemplateConverter
+from pvi._format.aps import APSFormatter
+from pvi._format.base import Formatter
+from pvi._format.dls import DLSFormatter
+from pvi._format.screen import ScreenFormatterFactory
+from pvi._format.writer import WriteSummary
+from pvi._pv_group import group_by_ui
+from pvi.device import Device, Include, walk
+
+SIZES = (1000, 10000, 100000)
+FORMATS: dict[str, Formatter] = {
+    "bob": DLSFormatter(),
+    "edl": DLSFormatter(),
+    "adl": APSFormatter(),
+}
+# Allowed growth of the time per signal from the smallest to the largest size
+SCALING_TOLERANCE = 3.0
+# Stages faster than this at the largest size are too noisy to check for scaling
+MIN_CHECKED_SECONDS = 0.05
+
+
+class StageTimer:
+    """Accumulate the time spent in named stages.
+
+    Time spent in a stage nested in a different stage only counts towards the inner
+    stage, and a stage nested in itself, e.g. by recursion, is only timed once.
+
+    """
+
+    def __init__(self):
+        self.seconds: dict[str, float] = defaultdict(float)
+        # Name, start time and time spent in nested stages of each running stage
+        self._running: list[list[Any]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if any(running[0] == name for running in self._running):
+            yield
+            return
+
+        self._running.append([name, time.perf_counter(), 0.0])
+        try:
+            yield
+        finally:
+            _, start, nested = self._running.pop()
+            elapsed = time.perf_counter() - start
+            self.seconds[name] += elapsed - nested
+            if self._running:
+                self._running[-1][2] += elapsed
+
+    def wrap(self, name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap `function` to time each call to it as the stage `name`"""
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with self.stage(name):
+                return function(*args, **kwargs)
+
+        return timed
+
+    @contextmanager
+    def patch(self, owner: Any, attribute: str, name: str) -> Iterator[None]:
+        """Time calls to a function or method of `owner` as the stage `name`"""
+        original = getattr(owner, attribute)
+        setattr(owner, attribute, self.wrap(name, original))
+        try:
+            yield
+        finally:
+            setattr(owner, attribute, original)
+
+
+def time_format(timer: StageTimer, device: Device, directory: Path, suffix: str):
+    """Format `device` and time its layout, rendering and writing.
+
+    Rendering is everything the formatter does to turn laid out screens into file
+    content, i.e. the function it passes to `ScreenFormatterFactory.format_screens`.
+    The remaining time, e.g. creating widget formatter classes, is counted as setup.
+
+    """
+
+    def timed_format_screens(
+        format_screens: Callable[..., WriteSummary], *args: Any
+    ) -> WriteSummary:
+        factory, components, title, path, all_suffixes, write, *jobs = args
+        write = timer.wrap(f"render {suffix}", write)
+        return format_screens(
+            factory, components, title, path, all_suffixes, write, *jobs
+        )
+
+    with (
+        patch_format_screens(timed_format_screens),
+        timer.patch(
+            ScreenFormatterFactory, "layout_screen_formatter", f"layout {suffix}"
+        ),
+        timer.patch(WriteSummary, "write", f"write {suffix}"),
+        timer.stage(f"setup {suffix}"),
+    ):
+        FORMATS[suffix].format(device, directory / f"Synthetic.{suffix}")
+
+
+def time_stages(signals: int, directory: Path) -> dict[str, float]:
+    """Time every stage for a synthetic device chain of `signals` signals.
+
+    Returns:
+        Seconds spent in each stage
+
+    """
+    timer = StageTimer()
+    device_path = write_device_chain(DeviceShape(signals), directory)
+
+    with timer.stage("yaml load"):
+        device = Device.deserialize(device_path)
+    top_device = device.model_copy(deep=True)
+    with timer.stage("include resolution"):
+        device.deserialize_parents([directory])
+
+    for suffix in FORMATS:
+        # Formatting modifies the children of Groups
+        time_format(timer, device.model_copy(deep=True), directory, suffix)
+
+    template = directory / "synthetic.template"
+    write_scaled_template(signals, template)
+    # Records that are not asyn records are reported as they are skipped
+    with contextlib.redirect_stdout(io.StringIO()), timer.stage("convert"):
+        TemplateConverter([template]).convert()
+
+    signals_and_groups = [c for c in top_device.children if not isinstance(c, Include)]
+    pvs = [signal.name for signal in walk(signals_and_groups)]
+    ui_paths = write_scaled_adl(pvs, directory)
+    with timer.stage("regroup"):
+        group_by_ui(top_device, ui_paths)
+
+    return dict(timer.seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument(
+        "--check", action="store_true", help="Fail if a stage scales worse than linear"
+    )
+    args = parser.parse_args()
+
+    results: dict[int, dict[str, float]] = {}
+    print(f"{'signals':>8} {'stage':>18} {'s':>8} {'us/signal':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            seconds = time_stages(size, Path(tmp))
+        results[size] = seconds
+        for stage, elapsed in seconds.items():
+            print(
+                f"{size:>8} {stage:>18} {elapsed:>8.3f} {elapsed / size * 1e6:>10.1f}"
+            )
+
+    failures = check_scaling(results)
+    for failure in failures:
+        print(failure)
+
+    if args.check and failures:
+        sys.exit(1)
+
+
+def check_scaling(results: dict[int, dict[str, float]]) -> list[str]:
+    """Compare the time per signal of each stage at the smallest and largest sizes.
+
+    Args:
+        results: Seconds spent in each stage by number of signals
+
+    Returns:
+        A message for each stage whose time per signal grew more than
+        `SCALING_TOLERANCE` times
+
+    """
+    smallest, largest = min(results), max(results)
+    failures: list[str] = []
+    for stage, elapsed in results[largest].items():
+        if elapsed < MIN_CHECKED_SECONDS:
+            continue
+
+        growth = (elapsed / largest) / (results[smallest][stage] / smallest)
+        if growth > SCALING_TOLERANCE:
+            failures.append(
+                f"{stage} takes {growth:.1f}x longer per signal at {largest} signals "
+                f"than at {smallest}"
+            )
+
+    return failures
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time `pvi` commands from process start to exit, to check the CLI starts quickly.
+
+Run with::
+
+    python benchmarks/bench_startup.py
+
+"""
+
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+INPUT = Path(__file__).parent.parent / "tests" / "format" / "input"
+RUNS = 5
+
+
+def commands(output: Path) -> dict[str, list[str]]:
+    """Arguments of the commands to time, writing any output to `output`"""
+    device = str(INPUT / "grandparent.pvi.device.yaml")
+    return {
+        "import pvi": ["-c", "import pvi"],
+        "--version": ["-m", "pvi", "--version"],
+        "generate-template": [
+            "-m",
+            "pvi",
+            "generate-template",
+            device,
+            "PREFIX",
+            str(output / "grandparent.template"),
+        ],
+        "format adl": [
+            "-m",
+            "pvi",
+            "format",
+            str(output / "grandparent.adl"),
+            device,
+            str(INPUT / "aps.adl.pvi.formatter.yaml"),
+        ],
+        "format bob": [
+            "-m",
+            "pvi",
+            "format",
+            str(output / "grandparent.bob"),
+            device,
+            str(INPUT / "dls.bob.pvi.formatter.yaml"),
+        ],
+    }
+
+
+def time_command(args: list[str]) -> float:
+    """Return the median time of running python with `args` in a new process"""
+    times: list[float] = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+
+def main():
+    print(f"{'command':>18} {'s':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, args in commands(Path(tmp)).items():
+            print(f"{name:>18} {time_command(args):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Time formatting a device with many sub screens with an increasing number of jobs.
+
+Run with::
+
+    python benchmarks/bench_sub_screens.py
+
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from bench_layout import make_signals
+
+from pvi._format.dls import DLSFormatter
+from pvi.device import Device, Group, SubScreen
+
+
+def make_sub_screen_device(sub_screens: int = 48, signals: int = 150) -> Device:
+    """Create a Device with `sub_screens` SubScreens of `signals` signals, like PandA"""
+    return Device(
+        label="Sub Screens",
+        children=[
+            Group(
+                name=f"Block{i}",
+                layout=SubScreen(),
+                children=make_signals(signals, prefix=f"Block{i}"),
+            )
+            for i in range(sub_screens)
+        ],
+    )
+
+
+def main():
+    device = make_sub_screen_device()
+    jobs_options = sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"{'jobs':>5} {'.bob s':>8} {'.edl s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for jobs in jobs_options:
+            times: list[float] = []
+            for suffix in (".bob", ".edl"):
+                start = time.perf_counter()
+                DLSFormatter().format(device, Path(tmp) / f"device{suffix}", jobs)
+                times.append(time.perf_counter() - start)
+            print(f"{jobs:>5} {times[0]:>8.2f} {times[1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
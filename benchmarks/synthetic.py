@@ -0,0 +1,253 @@
+"""Generate synthetic Devices, databases and UI files of any size for benchmarks, and
+observe how they are formatted."""
+
+import math
+import re
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pvi._format.screen import ScreenFormatterFactory
+from pvi._format.writer import WriteSummary
+from pvi.device import (
+    LED,
+    ButtonPanel,
+    ComponentUnion,
+    Device,
+    Grid,
+    Group,
+    Include,
+    Row,
+    SignalR,
+    SignalRW,
+    SignalW,
+    SubScreen,
+    TextRead,
+    TextWrite,
+    Tree,
+)
+
+INPUT = Path(__file__).parent.parent / "tests"
+SIM_DETECTOR_TEMPLATE = INPUT / "convert" / "input" / "simDetector.template"
+
+
+@dataclass
+class DeviceShape:
+    """The shape of a synthetic chain of Devices, each including the next.
+
+    Args:
+        signals: Number of signals across all Devices of the chain
+        includes: Number of Devices included in a chain below the top Device
+        depth: Levels of Groups, with those below the top level on SubScreens
+        group_size: Number of signals in each innermost Group
+        sub_screens: Number of Groups on SubScreens in each Group above the innermost
+        tables: Fraction of the signals in tables of Rows of 4 signals
+        button_panels: Fraction of the other signals with a ButtonPanel
+
+    """
+
+    signals: int
+    includes: int = 3
+    depth: int = 2
+    group_size: int = 25
+    sub_screens: int = 4
+    tables: float = 0.1
+    button_panels: float = 0.05
+
+
+def make_signals(count: int, prefix: str, button_panels: float) -> list[ComponentUnion]:
+    """Create `count` signals alternating between SignalR and SignalRW, replacing a
+    `button_panels` fraction of them with a SignalW with a ButtonPanel"""
+    every = round(1 / button_panels) if button_panels else 0
+    signals: list[ComponentUnion] = []
+    for i in range(count):
+        name, pv = f"{prefix}Signal{i}", f"{prefix.upper()}SIGNAL{i}"
+        if every and i % every == every - 1:
+            signals.append(
+                SignalW(
+                    name=name,
+                    write_pv=pv,
+                    write_widget=ButtonPanel(actions={"Start": "1", "Stop": "0"}),
+                )
+            )
+        elif i % 2:
+            signals.append(
+                SignalRW(
+                    name=name,
+                    write_pv=pv,
+                    write_widget=TextWrite(),
+                    read_pv=f"{pv}_RBV",
+                    read_widget=TextRead(),
+                )
+            )
+        else:
+            signals.append(SignalR(name=name, read_pv=pv))
+
+    return signals
+
+
+def make_table(rows: int, prefix: str) -> Group:
+    """Create a table of `rows` Rows of 4 signals"""
+    return Group(
+        name=f"{prefix}Table",
+        layout=Grid(),
+        children=[
+            Group(
+                name=f"{prefix}Row{row}",
+                layout=Row(header=None if row else ["Enable", "Value", "Low", "High"]),
+                children=[
+                    SignalR(
+                        name=f"{prefix}Row{row}{column}",
+                        read_pv=f"{prefix.upper()}ROW{row}{column.upper()}",
+                        read_widget=LED() if column == "Enable" else TextRead(),
+                    )
+                    for column in ("Enable", "Value", "Low", "High")
+                ],
+            )
+            for row in range(rows)
+        ],
+    )
+
+
+def make_group(
+    count: int, prefix: str, depth: int, shape: DeviceShape, layout: Grid | SubScreen
+) -> Group:
+    """Create a Group of `count` signals, nested `depth` levels deep"""
+    if depth <= 1 or count <= shape.group_size:
+        children = make_signals(count, prefix, shape.button_panels)
+    else:
+        n = min(shape.sub_screens, math.ceil(count / shape.group_size))
+        children = [
+            make_group(
+                count // n + (i < count % n),
+                f"{prefix}Sub{i}",
+                depth - 1,
+                shape,
+                SubScreen(),
+            )
+            for i in range(n)
+        ]
+
+    return Group(name=prefix, layout=layout, children=children)
+
+
+def make_device_children(signals: int, prefix: str, shape: DeviceShape) -> Tree:
+    """Create the Groups and table of one Device of the chain"""
+    table_signals = int(signals * shape.tables) // 4 * 4
+    signals -= table_signals
+    per_group = shape.group_size * shape.sub_screens ** (shape.depth - 1)
+    groups = max(1, math.ceil(signals / per_group))
+
+    children: list[ComponentUnion | Include] = [
+        make_group(
+            signals // groups + (g < signals % groups),
+            f"{prefix}Group{g}",
+            shape.depth,
+            shape,
+            Grid(),
+        )
+        for g in range(groups)
+    ]
+    if table_signals:
+        children.append(make_table(table_signals // 4, prefix))
+
+    return children
+
+
+def write_device_chain(shape: DeviceShape, directory: Path) -> Path:
+    """Write the chain of Devices to `directory` as YAML and return the path of the top
+    Device, which includes Synthetic1, which includes Synthetic2 and so on"""
+    devices = shape.includes + 1
+    for d in range(devices):
+        signals = shape.signals // devices + (d < shape.signals % devices)
+        children = make_device_children(signals, f"D{d}", shape)
+        if d < shape.includes:
+            children = [*children, Include(file_name=f"Synthetic{d + 1}")]
+
+        Device(label=f"Synthetic {d}", children=children).serialize(
+            directory / f"Synthetic{'' if d == 0 else d}.pvi.device.yaml"
+        )
+
+    return directory / "Synthetic.pvi.device.yaml"
+
+
+# The name of a record without its readback suffix, e.g. `$(P)$(R)GainX` in
+# `record(ai, "$(P)$(R)GainX_RBV")`
+RECORD_NAME = re.compile(r'(record\(\w+, *"\$\(P\)\$\(R\)\w+?)((?:_RBV)?")')
+# The asyn parameter of a link, e.g. `SIM_GAIN_X` in `@asyn($(PORT),...)SIM_GAIN_X"`
+ASYN_PARAMETER = re.compile(r'(@asyn\w*\((?:[^()]|\([^)]*\))*\)\w+)(")')
+
+
+def write_scaled_template(records: int, path: Path) -> int:
+    """Write copies of simDetector.template with renamed records and parameters until
+    it has at least `records` records, returning the number written"""
+    text = SIM_DETECTOR_TEMPLATE.read_text()
+    # Included templates are not read by the converter, so only keep the first
+    body = re.sub(r'^include ".*"$', "", text, flags=re.MULTILINE)
+    per_copy = len(re.findall(r"^record\(", text, flags=re.MULTILINE))
+    copies = math.ceil(records / per_copy)
+    with path.open("w") as f:
+        f.write(text)
+        for copy in range(1, copies):
+            renamed = RECORD_NAME.sub(rf"\g<1>{copy}\g<2>", body)
+            f.write(ASYN_PARAMETER.sub(rf"\g<1>_{copy}\g<2>", renamed))
+
+    return copies * per_copy
+
+
+# A widget in the style of tests/regroup/input/detector.adl
+ADL_WIDGET = """text_monitor {{
+    object {{
+        x=10
+        y={y}
+        width=100
+        height=20
+    }}
+    monitor {{
+        chan="{pv}"
+    }}
+}}
+"""
+
+
+def write_scaled_adl(pvs: list[str], directory: Path, per_file: int = 50) -> list[Path]:
+    """Write .adl files in the style of detector.adl with `per_file` of the PVs in each,
+    returning their paths"""
+    paths: list[Path] = []
+    for start in range(0, len(pvs), per_file):
+        path = directory / f"screen{start // per_file}.adl"
+        path.write_text(
+            "".join(
+                ADL_WIDGET.format(y=30 * (i + 1), pv=pv)
+                for i, pv in enumerate(pvs[start : start + per_file])
+            )
+        )
+        paths.append(path)
+
+    return paths
+
+
+@contextmanager
+def patch_format_screens(
+    replacement: Callable[..., WriteSummary],
+) -> Iterator[None]:
+    """Call `replacement` instead of `ScreenFormatterFactory.format_screens` while in
+    this context.
+
+    `replacement` is called with the original method, the factory and the arguments
+    of each call, e.g. to wrap the `write` function a Formatter passes, or to capture
+    the factory a Formatter creates without laying out any screens.
+
+    """
+    format_screens = ScreenFormatterFactory.format_screens
+
+    def patched(self: ScreenFormatterFactory[Any], *args: Any) -> WriteSummary:
+        return replacement(format_screens, self, *args)
+
+    ScreenFormatterFactory.format_screens = patched  # type: ignore
+    try:
+        yield
+    finally:
+        ScreenFormatterFactory.format_screens = format_screens
@@ -6,7 +6,20 @@
     Version number as calculated by https://github.com/pypa/setuptools_scm
 """
 
-from . import device
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
 from ._version import __version__
 
+if TYPE_CHECKING:
+    from . import device
+
 __all__ = ["__version__", "device"]
+
+
+def __getattr__(name: str) -> Any:
+    # Import device on first use, as building its models is slow, e.g. for `--version`
+    if name == "device":
+        return import_module(f"{__name__}.device")
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,23 +2,56 @@
 
 import json
 import os
+from collections.abc import Generator
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Annotated, Optional
 
 import typer
 
 from pvi import __version__
-from pvi._convert._template_convert import TemplateConverter
-from pvi._convert.utils import extract_device_and_parent_class
-from pvi._format import Formatter
-from pvi._format.template import format_template
-from pvi._pv_group import group_by_ui
-from pvi.device import Device, Include
+
+# Commands import what they need when run, so that the CLI starts quickly and each
+# command only loads its own dependencies, e.g. lxml for formatting bob files
 
 app = typer.Typer()
 convert_app = typer.Typer()
 app.add_typer(convert_app, name="convert", help="Convert a module to use PVI")
 
+TimingsOption = Annotated[
+    bool,
+    typer.Option(
+        "--timings",
+        help="Print the wall time and peak memory of each stage to stderr",
+    ),
+]
+TimingsJsonOption = Annotated[
+    Optional[Path],  # noqa
+    typer.Option(
+        ...,
+        "--timings-json",
+        help="Path to write the wall time and peak memory of each stage to as JSON",
+    ),
+]
+
+
+@contextmanager
+def report_timings(timings: bool, timings_json: Path | None) -> Generator[None]:
+    """Record the stages of a command and report them as requested"""
+    if not timings and timings_json is None:
+        yield
+        return
+
+    from pvi._timings import record_timings
+
+    with record_timings() as recorded:
+        yield
+
+    if timings:
+        typer.echo(str(recorded), err=True)
+    if timings_json is not None:
+        timings_json.write_text(recorded.to_json())
+
 
 def version_callback(value: bool):
     if value:
@@ -48,6 +81,9 @@ def schema(
     ],
 ):
     """Write the JSON schema for the pvi interface"""
+    from pvi._format import Formatter
+    from pvi.device import Device
+
     assert output.name.endswith(".schema.json"), (
         f"Expected '{output.name}' to end with '.schema.json'"
     )
@@ -69,7 +105,7 @@ def format(
         Path, typer.Argument(..., help="Directory to write output file(s) to")
     ],
     device_path: Annotated[
-        Path, typer.Argument(..., help="Path to the .pvi.device.yaml file")
+        Path, typer.Argument(..., help="Path to the .pvi.device.yaml or .json file")
     ],
     formatter_path: Annotated[
         Path, typer.Argument(..., help="Path to the .pvi.formatter.yaml file")
@@ -77,31 +113,233 @@ def format(
     yaml_paths: Annotated[
         Optional[list[Path]],  # noqa
         typer.Option(
-            ..., "--yaml-path", help="Paths to directories with .pvi.device.yaml files"
+            ...,
+            "--yaml-path",
+            help="Paths to directories with .pvi.device.yaml or .json files",
+        ),
+    ] = None,
+    build_manifest: Annotated[
+        Optional[Path],  # noqa
+        typer.Option(
+            ...,
+            "--build-manifest",
+            help=(
+                "Path of a build manifest recording the inputs of the last build. "
+                "Formatting is skipped if none of the inputs have changed."
+            ),
         ),
     ] = None,
+    depfile: Annotated[
+        Optional[Path],  # noqa
+        typer.Option(
+            ...,
+            "--depfile",
+            help=(
+                "Path of a Makefile fragment to write with the screen files as "
+                "targets and the device, includes and formatter as prerequisites"
+            ),
+        ),
+    ] = None,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            ..., "--jobs", "-j", help="Number of worker processes to create sub-screens"
+        ),
+    ] = 1,
+    timings: TimingsOption = False,
+    timings_json: TimingsJsonOption = None,
 ):
     """Create screen product from device and formatter YAML"""
+    from pvi._build import format_device
+
     yaml_paths = yaml_paths or []
 
-    device = Device.deserialize(device_path)
-    device.deserialize_parents(yaml_paths)
+    with report_timings(timings, timings_json):
+        summary = format_device(
+            output_path,
+            device_path,
+            formatter_path,
+            yaml_paths,
+            build_manifest,
+            depfile,
+            jobs,
+        )
+    if summary is None:
+        typer.echo(f"{output_path} is up to date")
+    else:
+        typer.echo(f"{output_path}: {summary}")
+
+
+@app.command()
+def stats(
+    device_path: Annotated[
+        Path, typer.Argument(..., help="Path to the .pvi.device.yaml or .json file")
+    ],
+    formatter_path: Annotated[
+        Path, typer.Argument(..., help="Path to the .pvi.formatter.yaml file")
+    ],
+    yaml_paths: Annotated[
+        Optional[list[Path]],  # noqa
+        typer.Option(
+            ...,
+            "--yaml-path",
+            help="Paths to directories with .pvi.device.yaml or .json files",
+        ),
+    ] = None,
+    suffix: Annotated[
+        Optional[str],  # noqa
+        typer.Option(
+            ...,
+            "--suffix",
+            help=(
+                "Suffix of the screen files to format, e.g. .edl. Defaults to the "
+                "default suffix of the formatter"
+            ),
+        ),
+    ] = None,
+    as_json: Annotated[
+        bool, typer.Option("--json", help="Print the counts as JSON")
+    ] = False,
+):
+    """Count the expensive operations of formatting a device, without writing files"""
+    import tempfile
+
+    from pvi._build import load_formatter
+    from pvi._counters import count_operations, format_counts
+    from pvi.device import Device
+
+    formatter = load_formatter(formatter_path)
+    if suffix is None:
+        suffix = next(iter(formatter.suffixes()), ".bob")
+
+    # Load without the device cache so that the counts do not depend on its state
+    with tempfile.TemporaryDirectory() as directory, count_operations() as counts:
+        device = Device.deserialize(device_path)
+        device.deserialize_parents(yaml_paths or [])
+        name = device_path.name.split(".")[0]
+        formatter.format(device, Path(directory) / f"{name}{suffix}")
+
+    typer.echo(
+        json.dumps(dict(counts.most_common())) if as_json else format_counts(counts)
+    )
+
 
-    formatter = Formatter.deserialize(formatter_path)
-    formatter.format(device, output_path)
+@app.command()
+def analyze(
+    device_path: Annotated[
+        Path, typer.Argument(..., help="Path to the .pvi.device.yaml or .json file")
+    ],
+    yaml_paths: Annotated[
+        Optional[list[Path]],  # noqa
+        typer.Option(
+            ...,
+            "--yaml-path",
+            help="Paths to directories with .pvi.device.yaml or .json files",
+        ),
+    ] = None,
+    widget_budget: Annotated[
+        int,
+        typer.Option(
+            ...,
+            "--widget-budget",
+            help="Warn about screens with more widgets than this",
+        ),
+    ] = 1000,
+    strict: Annotated[
+        bool,
+        typer.Option("--strict", help="Exit with an error if a screen is over budget"),
+    ] = False,
+    as_json: Annotated[
+        bool, typer.Option("--json", help="Print the analysis as JSON")
+    ] = False,
+):
+    """Estimate the screens, widgets and render cost of a device without rendering"""
+    from pvi._analyze import analyze_device
+    from pvi._cache import load_device
+
+    device = load_device(device_path, yaml_paths or [])
+    analysis = analyze_device(device, device_path.name.split(".")[0])
+    typer.echo(analysis.to_json() if as_json else str(analysis), nl=not as_json)
+
+    over_budget = analysis.over_budget(widget_budget)
+    for screen in over_budget:
+        typer.echo(
+            f"WARNING: {screen.name} has {screen.widgets} widgets, over the budget of "
+            f"{widget_budget}",
+            err=True,
+        )
+    if strict and over_budget:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def format_batch(
+    manifest: Annotated[
+        Path,
+        typer.Argument(
+            ...,
+            help=(
+                "Path to a YAML list of entries with device, formatter, output and "
+                "optional yaml_paths. Relative paths are relative to the manifest."
+            ),
+        ),
+    ],
+    jobs: Annotated[
+        int, typer.Option(..., "--jobs", "-j", help="Number of worker processes")
+    ] = 1,
+):
+    """Create screen products for every entry in a manifest"""
+    from pvi._batch import load_manifest, run_batch
+    from pvi._format.writer import WriteSummary
+
+    results = run_batch(load_manifest(manifest), jobs)
+
+    summary = WriteSummary()
+    for result in results:
+        if result.summary is not None:
+            summary.extend(result.summary)
+    typer.echo(f"Formatted {len(results)} entries: {summary}")
+
+    failures = [result for result in results if result.error is not None]
+    for result in failures:
+        typer.echo(f"Failed to format {result.entry.output}: {result.error}", err=True)
+
+    if failures:
+        typer.echo(f"{len(failures)} of {len(results)} entries failed", err=True)
+        raise typer.Exit(code=1)
 
 
 @app.command()
 def generate_template(
     device_path: Annotated[
-        Path, typer.Argument(..., help="Path to the .pvi.device.yaml file")
+        Path, typer.Argument(..., help="Path to the .pvi.device.yaml or .json file")
     ],
     pv_prefix: Annotated[str, typer.Argument(..., help="Prefix of PVI PV")],
     output_path: Annotated[Path, typer.Argument(..., help="Output file to generate")],
+    depfile: Annotated[
+        Optional[Path],  # noqa
+        typer.Option(
+            ...,
+            "--depfile",
+            help=(
+                "Path of a Makefile fragment to write with the template as target "
+                "and the device as prerequisite"
+            ),
+        ),
+    ] = None,
+    timings: TimingsOption = False,
+    timings_json: TimingsJsonOption = None,
 ):
     """Create template with info tags for device signals"""
-    device = Device.deserialize(device_path)
-    format_template(device, pv_prefix, output_path)
+    from pvi._build import write_depfile
+    from pvi._format.template import format_template
+    from pvi.device import Device
+
+    with report_timings(timings, timings_json):
+        device = Device.deserialize(device_path)
+        format_template(device, pv_prefix, output_path)
+    if depfile is not None:
+        write_depfile(depfile, [output_path], [device_path])
 
 
 @convert_app.command()
@@ -138,8 +376,21 @@ def device(
         Optional[str],  # noqa
         typer.Option(..., help="Parent Device name."),
     ] = None,
+    as_json: Annotated[
+        bool,
+        typer.Option(
+            "--json",
+            help="Write a compact .pvi.device.json, which is faster to load than YAML",
+        ),
+    ] = False,
+    timings: TimingsOption = False,
+    timings_json: TimingsJsonOption = None,
 ):
     """Convert template to device YAML"""
+    from pvi._convert._template_convert import TemplateConverter
+    from pvi._convert.utils import extract_device_and_parent_class
+    from pvi.device import Device, Include
+
     templates = templates or []
 
     device_name = None
@@ -153,17 +404,19 @@ def device(
     if device_name is None:
         raise ValueError("Either Device name or header file must be provided.")
 
-    component_group = TemplateConverter(templates).convert()
+    with report_timings(timings, timings_json):
+        component_group = TemplateConverter(templates).convert()
 
-    if parent_name:
-        component_group = list(component_group) + [Include(file_name=parent_name)]
+        if parent_name:
+            component_group = list(component_group) + [Include(file_name=parent_name)]
 
-    device = Device(label=label or device_name, children=component_group)
+        device = Device(label=label or device_name, children=component_group)
 
-    if not output.exists():
-        os.mkdir(output)
+        if not output.exists():
+            os.mkdir(output)
 
-    device.serialize(output / f"{device_name}.pvi.device.yaml")
+        suffix = ".json" if as_json else ".yaml"
+        device.serialize(output / f"{device_name}.pvi.device{suffix}")
 
 
 @app.command()
@@ -175,12 +428,20 @@ def regroup(
         list[Path],
         typer.Argument(..., help="Paths to the ui files to regroup the PVs by"),
     ],
+    timings: TimingsOption = False,
+    timings_json: TimingsJsonOption = None,
 ):
     """Regroup a device.yaml file based on ui files that the PVs appear in"""
-    device = Device.deserialize(device_path)
-    device.children = group_by_ui(device, ui_paths)
+    from pvi._pv_group import group_by_ui
+    from pvi._timings import stage
+    from pvi.device import Device
 
-    device.serialize(device_path)
+    with report_timings(timings, timings_json):
+        device = Device.deserialize(device_path)
+        with stage("regroup"):
+            device.children = group_by_ui(device, ui_paths)
+
+        device.serialize(device_path)
 
 
 @app.command()
@@ -192,15 +453,21 @@ def reconvert(
         list[Path],
         typer.Option(..., "--template", help="Paths of templates to add PVs from"),
     ],
+    timings: TimingsOption = False,
+    timings_json: TimingsJsonOption = None,
 ):
     """Add PVs to an existing device.yaml file based on extra / updated templates."""
-    device = Device.deserialize(device_path)
-    template_components = TemplateConverter(templates).convert()
-    components_to_merge = list(device.children) + list(template_components)
+    from pvi._convert._template_convert import TemplateConverter
+    from pvi.device import Device
+
+    with report_timings(timings, timings_json):
+        device = Device.deserialize(device_path)
+        template_components = TemplateConverter(templates).convert()
+        components_to_merge = list(device.children) + list(template_components)
 
-    device.merge_components(components_to_merge)
+        device.merge_components(components_to_merge)
 
-    device.serialize(device_path)
+        device.serialize(device_path)
 
 
 # test with: pipenv run python -m pvi
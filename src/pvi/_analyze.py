@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any
+
+from pvi._format.screen import ScreenFormatterFactory, ScreenLayout
+from pvi._format.utils import Bounds
+from pvi._format.widget import (
+    ActionWidgetFormatter,
+    GroupFormatter,
+    LabelWidgetFormatter,
+    PVWidgetFormatter,
+    SubScreenWidgetFormatter,
+    WidgetFormatter,
+    WidgetFormatterFactory,
+)
+from pvi.device import (
+    ButtonPanel,
+    ComponentUnion,
+    Device,
+    Group,
+    Row,
+    SignalR,
+    SignalRef,
+    SignalW,
+    Tree,
+)
+
+# Time to lay out and render one widget, and to create and write one screen, measured
+# with benchmarks/bench_stages.py for bob, edl and adl files
+SECONDS_PER_WIDGET = 90e-6
+SECONDS_PER_SCREEN = 300e-6
+
+
+@dataclass
+class ScreenAnalysis:
+    """The widgets that formatting would create on one screen
+
+    Args:
+        name: File name of the screen, without its suffix
+        depth: Number of sub screens opened to reach the screen from the top screen
+        widgets: Number of widgets, including labels and the titles of the screen and
+            its groups
+        groups: Number of Groups drawn on the screen
+        signals: Number of signals on the screen
+
+    """
+
+    name: str
+    depth: int
+    widgets: int = 0
+    groups: int = 0
+    signals: int = 0
+
+
+@dataclass
+class Expansion:
+    """The widgets created for a kind of component that expands to many widgets
+
+    Args:
+        components: Number of components of the kind
+        signals: Number of signals in the components
+        widgets: Number of widgets created for the components, including labels
+
+    """
+
+    components: int = 0
+    signals: int = 0
+    widgets: int = 0
+
+    @property
+    def factor(self) -> float:
+        """Widgets created per signal"""
+        return self.widgets / self.signals if self.signals else 0.0
+
+
+@dataclass
+class DeviceAnalysis:
+    """The screens that formatting a Device would create, estimated without rendering
+
+    Args:
+        label: Label of the Device
+        screens: The top screen followed by its sub screens, in the order they are
+            formatted
+        max_nesting: Deepest nesting of Groups in the Device
+        table_rows: Groups with a `Row` layout, each formatted as a row of a table
+        button_panels: Signals with a `ButtonPanel`, with a button for each action
+
+    """
+
+    label: str
+    screens: list[ScreenAnalysis] = field(default_factory=list[ScreenAnalysis])
+    max_nesting: int = 0
+    table_rows: Expansion = field(default_factory=Expansion)
+    button_panels: Expansion = field(default_factory=Expansion)
+
+    @property
+    def widgets(self) -> int:
+        """Number of widgets on all screens"""
+        return sum(screen.widgets for screen in self.screens)
+
+    @property
+    def estimated_seconds(self) -> float:
+        """Rough time to format all screens, from the number of widgets and screens"""
+        return (
+            self.widgets * SECONDS_PER_WIDGET + len(self.screens) * SECONDS_PER_SCREEN
+        )
+
+    def over_budget(self, widget_budget: int) -> list[ScreenAnalysis]:
+        """The screens with more than `widget_budget` widgets"""
+        return [screen for screen in self.screens if screen.widgets > widget_budget]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the analysis for `json.dumps`"""
+        return {
+            "label": self.label,
+            "screens": [asdict(screen) for screen in self.screens],
+            "widgets": self.widgets,
+            "max_nesting": self.max_nesting,
+            "table_rows": asdict(self.table_rows) | {"factor": self.table_rows.factor},
+            "button_panels": asdict(self.button_panels)
+            | {"factor": self.button_panels.factor},
+            "estimated_seconds": self.estimated_seconds,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2) + "\n"
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.label}: {_plural(self.widgets, 'widget')} on "
+            f"{_plural(len(self.screens), 'screen')}, "
+            f"Groups nested {self.max_nesting} deep",
+            "",
+            f"{'screen':<40} {'depth':>5} {'widgets':>8} {'groups':>7} {'signals':>8}",
+        ]
+        lines += [
+            f"{screen.name:<40} {screen.depth:>5} {screen.widgets:>8} "
+            f"{screen.groups:>7} {screen.signals:>8}"
+            for screen in self.screens
+        ]
+        lines.append("")
+        for name, expansion in (
+            ("table rows", self.table_rows),
+            ("ButtonPanels", self.button_panels),
+        ):
+            lines.append(
+                f"{name}: {expansion.components} with {expansion.signals} signals "
+                f"expand to {expansion.widgets} widgets ({expansion.factor:.1f}x)"
+            )
+        lines.append(f"estimated render cost: {self.estimated_seconds:.2f} s")
+        return "\n".join(lines)
+
+
+# Layout of the DLS bob formatter. Only the positions of widgets depend on it, not which
+# widgets and screens are created.
+LAYOUT = ScreenLayout(
+    spacing=5,
+    title_height=25,
+    max_height=900,
+    group_label_height=26,
+    label_width=200,
+    widget_width=200,
+    widget_height=20,
+    group_widget_indent=18,
+    group_width_offset=26,
+)
+# Widget formatters without templates, which can be laid out but not formatted
+WIDGETS = WidgetFormatterFactory[Any](
+    header_formatter_cls=LabelWidgetFormatter[Any],
+    label_formatter_cls=LabelWidgetFormatter[Any],
+    action_formatter_cls=ActionWidgetFormatter[Any],
+    sub_screen_formatter_cls=SubScreenWidgetFormatter[Any],
+    led_formatter_cls=PVWidgetFormatter[Any],
+    progress_bar_formatter_cls=PVWidgetFormatter[Any],
+    text_read_formatter_cls=PVWidgetFormatter[Any],
+    check_box_formatter_cls=PVWidgetFormatter[Any],
+    toggle_formatter_cls=PVWidgetFormatter[Any],
+    combo_box_formatter_cls=PVWidgetFormatter[Any],
+    text_write_formatter_cls=PVWidgetFormatter[Any],
+    table_formatter_cls=PVWidgetFormatter[Any],
+    bitfield_formatter_cls=PVWidgetFormatter[Any],
+    array_trace_formatter_cls=PVWidgetFormatter[Any],
+    button_panel_formatter_cls=PVWidgetFormatter[Any],
+    image_read_formatter_cls=PVWidgetFormatter[Any],
+)
+
+
+@dataclass(kw_only=True)
+class _AnalyzingFactory(ScreenFormatterFactory[Any]):
+    """A `ScreenFormatterFactory` that records the screens and widgets it lays out
+
+    Args:
+        analysis: Analysis to add each screen and expansion to
+        depth: Number of sub screens opened to reach the screen of this factory
+
+    """
+
+    analysis: DeviceAnalysis
+    depth: int = 0
+    screen: ScreenAnalysis = field(init=False)
+
+    def create_sub_screen_factory(self, file_name: str) -> _AnalyzingFactory:
+        return replace(
+            self, components={}, base_file_name=file_name, depth=self.depth + 1
+        )
+
+    def layout_screen_formatter(
+        self, components: Tree, title: str
+    ) -> GroupFormatter[Any]:
+        self.screen = ScreenAnalysis(name=self.base_file_name, depth=self.depth)
+        self.analysis.screens.append(self.screen)
+
+        screen_formatter = super().layout_screen_formatter(components, title)
+        self.screen.widgets = _count_widgets(screen_formatter)
+        self.screen.groups = sum(
+            isinstance(widget, GroupFormatter) for widget in screen_formatter.children
+        )
+        return screen_formatter
+
+    def generate_component_formatters(
+        self,
+        c: ComponentUnion,
+        bounds: Bounds,
+        add_label: bool = True,
+        stacked: bool = False,
+        squeeze: bool = False,
+    ) -> Iterator[WidgetFormatter[Any]]:
+        widgets = list(
+            super().generate_component_formatters(
+                c, bounds, add_label, stacked, squeeze
+            )
+        )
+
+        expansion: Expansion | None = None
+        match c:
+            case Group(layout=Row()):
+                expansion = self.analysis.table_rows
+                signals = sum(
+                    isinstance(child, SignalR | SignalW | SignalRef)
+                    for child in c.children
+                )
+            case SignalW(write_widget=ButtonPanel()):
+                expansion = self.analysis.button_panels
+                signals = 1
+            case SignalR() | SignalW():
+                signals = 1
+            case _:
+                # A `SignalRef` is counted as the signal it refers to
+                signals = 0
+
+        self.screen.signals += signals
+        if expansion is not None:
+            expansion.components += 1
+            expansion.signals += signals
+            expansion.widgets += len(widgets)
+
+        yield from widgets
+
+
+def _plural(n: int, noun: str) -> str:
+    return f"{n} {noun}" if n == 1 else f"{n} {noun}s"
+
+
+def _count_widgets(group: GroupFormatter[Any]) -> int:
+    """Count the widgets of a group or screen, including its title"""
+    return 1 + sum(
+        _count_widgets(widget) if isinstance(widget, GroupFormatter) else 1
+        for widget in group.children
+    )
+
+
+def _max_nesting(tree: Tree) -> int:
+    return max(
+        (1 + _max_nesting(c.children) for c in tree if isinstance(c, Group)), default=0
+    )
+
+
+def analyze_device(device: Device, name: str) -> DeviceAnalysis:
+    """Estimate the cost of formatting a Device by laying out its screens, without
+    rendering them.
+
+    The screens are laid out by a `ScreenFormatterFactory`, as when formatting, so
+    this fails for Devices that can not be formatted.
+
+    Args:
+        device: Device with its `Include`s resolved
+        name: File name of the top screen, without its suffix, which the file names
+            of sub screens start with
+
+    Returns:
+        The widgets on each screen and the components that expand to many widgets
+
+    """
+    analysis = DeviceAnalysis(
+        label=device.label, max_nesting=_max_nesting(device.children)
+    )
+    factory = _AnalyzingFactory(
+        screen_formatter_cls=GroupFormatter[Any],
+        group_formatter_cls=GroupFormatter[Any],
+        widget_formatter_factory=WIDGETS,
+        layout=LAYOUT,
+        base_file_name=name,
+        analysis=analysis,
+    )
+    factory.create_screen_formatter(device.children, device.label)
+    return analysis
@@ -0,0 +1,122 @@
+import multiprocessing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Annotated
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+from pvi._build import format_device, load_formatter
+from pvi._format.writer import WriteSummary
+from pvi._yaml_utils import load_yaml
+
+
+class BatchEntry(BaseModel):
+    """A single device and formatter to create a UI from in a batch."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    device: Annotated[
+        Path, Field(description="Path to the .pvi.device.yaml or .json file")
+    ]
+    formatter: Annotated[
+        Path, Field(description="Path to the .pvi.formatter.yaml file")
+    ]
+    output: Annotated[Path, Field(description="Path of the UI file to write")]
+    yaml_paths: Annotated[
+        list[Path],
+        Field(description="Paths to directories with .pvi.device.yaml or .json files"),
+    ] = []
+    build_manifest: Annotated[
+        Path | None,
+        Field(description="Build manifest to skip formatting if inputs are unchanged"),
+    ] = None
+    depfile: Annotated[
+        Path | None,
+        Field(description="Makefile fragment to write with the UI's dependencies"),
+    ] = None
+
+
+@dataclass
+class BatchResult:
+    entry: BatchEntry
+    error: str | None = None
+    summary: WriteSummary | None = None
+
+
+def load_manifest(manifest: Path) -> list[BatchEntry]:
+    """Load the entries of a batch manifest.
+
+    The manifest is a YAML list of `BatchEntry`. Relative paths are resolved relative
+    to the directory containing the manifest.
+
+    Args:
+        manifest: Path of the manifest YAML file
+
+    """
+    entries = TypeAdapter(list[BatchEntry]).validate_python(load_yaml(manifest))
+
+    root = manifest.parent
+
+    def resolve(path: Path | None) -> Path | None:
+        return None if path is None else root / path
+
+    return [
+        BatchEntry(
+            device=root / entry.device,
+            formatter=root / entry.formatter,
+            output=root / entry.output,
+            yaml_paths=[root / yaml_path for yaml_path in entry.yaml_paths],
+            build_manifest=resolve(entry.build_manifest),
+            depfile=resolve(entry.depfile),
+        )
+        for entry in entries
+    ]
+
+
+def _format_entry(entry: BatchEntry) -> BatchResult:
+    try:
+        summary = format_device(
+            entry.output,
+            entry.device,
+            entry.formatter,
+            entry.yaml_paths,
+            entry.build_manifest,
+            entry.depfile,
+        )
+    except Exception as e:
+        return BatchResult(entry, error=f"{type(e).__name__}: {e}")
+
+    return BatchResult(entry, summary=summary)
+
+
+def run_batch(entries: list[BatchEntry], jobs: int = 1) -> list[BatchResult]:
+    """Format every entry of a batch, continuing past entries that fail.
+
+    Formatters and their templates are loaded once in this process before starting
+    `jobs` worker processes, which inherit them when forked.
+
+    Args:
+        entries: Entries to format
+        jobs: Number of worker processes to format entries in parallel
+
+    Returns:
+        A result for each entry, in the same order as `entries`
+
+    """
+    for entry in entries:
+        try:
+            load_formatter(entry.formatter).prepare(entry.output)
+        except Exception:
+            # Reported against the entry when it is formatted
+            continue
+
+    if (
+        jobs < 2
+        or len(entries) < 2
+        # Workers that are not forked would not inherit anything from this process
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        return [_format_entry(entry) for entry in entries]
+
+    with multiprocessing.get_context("fork").Pool(min(jobs, len(entries))) as pool:
+        return pool.map(_format_entry, entries, chunksize=1)
@@ -0,0 +1,187 @@
+from pathlib import Path
+from typing import cast
+
+from pydantic import BaseModel, ValidationError
+
+from pvi import __version__
+from pvi._cache import load_device
+from pvi._format import Formatter
+from pvi._format.writer import WriteSummary, write_if_changed
+from pvi.device import find_device_yaml
+from pvi.utils import hash_file
+
+# Deserialized Formatters, keyed by resolved path, modification time and size
+_formatters: dict[tuple[Path, int, int], Formatter] = {}
+
+
+def load_formatter(formatter_path: Path) -> Formatter:
+    """Deserialize a Formatter, reusing a previously loaded Formatter if unchanged.
+
+    Args:
+        formatter_path: Path of the Formatter YAML file
+
+    """
+    stat = formatter_path.stat()
+    key = (formatter_path.resolve(), stat.st_mtime_ns, stat.st_size)
+    if (formatter := _formatters.get(key)) is None:
+        formatter = _formatters[key] = Formatter.deserialize(formatter_path)
+
+    return formatter
+
+
+def _escape_make(path: Path) -> str:
+    return str(path).replace("$", "$$").replace("#", "\\#").replace(" ", "\\ ")
+
+
+def write_depfile(depfile: Path, targets: list[Path], prerequisites: list[Path]):
+    """Write a Makefile fragment declaring that targets depend on prerequisites.
+
+    Each prerequisite also gets an empty rule, like `gcc -MP`, so that make does not
+    fail if it is deleted.
+
+    Args:
+        depfile: Path of the fragment to write
+        targets: Files produced from the prerequisites
+        prerequisites: Files read to produce the targets
+
+    """
+    prerequisites = list(dict.fromkeys(prerequisites))
+    lines = [
+        " ".join(_escape_make(target) for target in targets)
+        + ":"
+        + "".join(f" \\\n  {_escape_make(path)}" for path in prerequisites)
+    ]
+    lines += [f"{_escape_make(path)}:" for path in prerequisites]
+    write_if_changed(depfile, "\n\n".join(lines) + "\n")
+
+
+class BuildManifest(BaseModel):
+    """The inputs a UI was formatted from, to skip formatting it again if unchanged"""
+
+    version: str
+    output: Path
+    device: Path
+    formatter: Path
+    yaml_paths: list[Path]
+    outputs: list[Path]
+    includes: dict[str, Path]
+    hashes: dict[Path, str | None]
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest | None":
+        """Load a manifest, or return `None` if it does not exist or is invalid"""
+        try:
+            return cls.model_validate_json(path.read_bytes())
+        except (OSError, ValidationError):
+            return None
+
+    def is_up_to_date(
+        self,
+        output_path: Path,
+        device_path: Path,
+        formatter_path: Path,
+        yaml_paths: list[Path],
+    ) -> bool:
+        """Check if the recorded build used the same, unchanged inputs"""
+        if (
+            self.version != __version__
+            or self.output != output_path
+            or self.device != device_path
+            or self.formatter != formatter_path
+            or self.yaml_paths != yaml_paths
+            or not all(path.exists() for path in self.outputs)
+        ):
+            return False
+
+        # A new file earlier in the search paths could now shadow an include
+        for include_name, include_path in self.includes.items():
+            if find_device_yaml(include_name, yaml_paths) != include_path:
+                return False
+
+        return all(hash_file(path) == digest for path, digest in self.hashes.items())
+
+
+def format_device(
+    output_path: Path,
+    device_path: Path,
+    formatter_path: Path,
+    yaml_paths: list[Path],
+    build_manifest: Path | None = None,
+    depfile: Path | None = None,
+    jobs: int = 1,
+) -> WriteSummary | None:
+    """Load a Device, resolve its `Include`s and format it into a UI.
+
+    Args:
+        output_path: Path of the UI file to write
+        device_path: Path of the Device YAML file
+        formatter_path: Path of the Formatter YAML file to create the UI with
+        yaml_paths: Directories to search for included Device YAML files
+        build_manifest: If given, skip formatting if the manifest at this path shows
+            that the inputs are unchanged since the last build, else record the inputs
+            of this build in it
+        depfile: If given, write a Makefile fragment to this path with the UI files as
+            targets and the Device, its `Include`s and the Formatter as prerequisites
+        jobs: Number of worker processes to create sub screens in
+
+    Returns:
+        The files written and left unchanged, or `None` if formatting was skipped
+        because the build was up to date
+
+    """
+    if build_manifest is not None:
+        manifest = BuildManifest.load(build_manifest)
+        if manifest is not None and manifest.is_up_to_date(
+            output_path, device_path, formatter_path, yaml_paths
+        ):
+            if depfile is not None:
+                write_depfile(
+                    depfile,
+                    manifest.outputs,
+                    [device_path, *manifest.includes.values(), formatter_path],
+                )
+            return None
+
+    # Hash before loading so that changes made while formatting trigger a rebuild
+    hashes = {path: hash_file(path) for path in (device_path, formatter_path)}
+
+    device = load_device(device_path, yaml_paths)
+
+    formatter = load_formatter(formatter_path)
+    # Formatters written before `jobs` was added only accept a device and path
+    summary = cast(
+        WriteSummary | None,
+        formatter.format(device, output_path)
+        if jobs == 1
+        else formatter.format(device, output_path, jobs=jobs),
+    )
+    if summary is None:
+        # Formatters written before `WriteSummary` was added return nothing, so
+        # assume they wrote the output file
+        summary = WriteSummary(written=[output_path])
+    includes = device.include_paths
+
+    if build_manifest is not None:
+        dependencies = list(includes.values())
+        if (template_path := formatter.template_path(output_path)) is not None:
+            dependencies.append(template_path)
+        hashes.update((path, hash_file(path)) for path in dependencies)
+
+        manifest = BuildManifest(
+            version=__version__,
+            output=output_path,
+            device=device_path,
+            formatter=formatter_path,
+            yaml_paths=yaml_paths,
+            outputs=summary.paths,
+            includes=includes,
+            hashes=hashes,
+        )
+        write_if_changed(build_manifest, manifest.model_dump_json(indent=2) + "\n")
+
+    if depfile is not None:
+        write_depfile(
+            depfile, summary.paths, [device_path, *includes.values(), formatter_path]
+        )
+
+    return summary
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from pvi import __version__
+from pvi._timings import stage
+from pvi.device import Device, find_device_yaml
+from pvi.utils import hash_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    key TEXT PRIMARY KEY,
+    includes TEXT NOT NULL,
+    device TEXT NOT NULL
+)
+"""
+
+
+def default_cache_path() -> Path | None:
+    """Path of the device cache, or `None` if disabled by setting `PVI_NO_CACHE`.
+
+    The cache is `pvi/devices.sqlite3` in `$XDG_CACHE_HOME`, or `~/.cache` if unset.
+
+    """
+    if os.environ.get("PVI_NO_CACHE"):
+        return None
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "pvi" / "devices.sqlite3"
+
+
+class DeviceCache:
+    """Persistent cache of Devices with their `Include`s resolved.
+
+    Entries are keyed by the pvi version, the search paths and a hash of the Device
+    file, and record the file found for each `Include` with a hash of its content. An
+    entry is only used if every `Include` still resolves to the same, unchanged file,
+    so an edit to any file in the tree misses the cache.
+
+    Errors reading or writing the cache are ignored, so a missing, read-only or corrupt
+    cache only makes loading slower.
+
+    Args:
+        path: Path of the SQLite database of the cache
+
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute(SCHEMA)
+        return connection
+
+    @staticmethod
+    def _key(digest: str, yaml_paths: list[Path]) -> str:
+        key = json.dumps([__version__, digest, [str(path) for path in yaml_paths]])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, digest: str, yaml_paths: list[Path]) -> Device | None:
+        """Load a cached Device, or return `None` if missing or out of date.
+
+        Args:
+            digest: Hash of the content of the Device file
+            yaml_paths: Directories the `Include`s of the Device were resolved in
+
+        """
+        try:
+            with stage("cache"), closing(self._connect()) as connection, connection:
+                row = connection.execute(
+                    "SELECT includes, device FROM devices WHERE key = ?",
+                    (self._key(digest, yaml_paths),),
+                ).fetchone()
+        except (OSError, sqlite3.Error):
+            return None
+
+        if row is None:
+            return None
+
+        try:
+            includes: dict[str, tuple[str, str]] = json.loads(row[0])
+            for include_name, (include_path, include_digest) in includes.items():
+                # A new file earlier in the search paths could now shadow an include
+                if find_device_yaml(include_name, yaml_paths) != Path(include_path):
+                    return None
+                if hash_file(Path(include_path)) != include_digest:
+                    return None
+
+            with stage("cache"):
+                device = Device(**json.loads(row[1]))
+        except (ValueError, TypeError):
+            # A corrupt entry, or one written by an incompatible pvi
+            self._delete(digest, yaml_paths)
+            return None
+
+        device.include_paths = {
+            include_name: Path(include_path)
+            for include_name, (include_path, _) in includes.items()
+        }
+
+        return device
+
+    def put(self, digest: str, yaml_paths: list[Path], device: Device) -> None:
+        """Store a Device with its `Include`s resolved.
+
+        Args:
+            digest: Hash of the content of the Device file
+            yaml_paths: Directories the `Include`s of the Device were resolved in
+            device: Device after `deserialize_parents`
+
+        """
+        includes = {
+            include_name: (str(include_path), hash_file(include_path))
+            for include_name, include_path in device.include_paths.items()
+        }
+        try:
+            with stage("cache"), closing(self._connect()) as connection, connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO devices VALUES (?, ?, ?)",
+                    (
+                        self._key(digest, yaml_paths),
+                        json.dumps(includes),
+                        device.model_dump_json(exclude={"type"}),
+                    ),
+                )
+        except (OSError, sqlite3.Error):
+            pass
+
+    def _delete(self, digest: str, yaml_paths: list[Path]) -> None:
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute(
+                    "DELETE FROM devices WHERE key = ?",
+                    (self._key(digest, yaml_paths),),
+                )
+        except (OSError, sqlite3.Error):
+            pass
+
+
+def load_device(device_path: Path, yaml_paths: list[Path]) -> Device:
+    """Deserialize a Device and resolve its `Include`s, using the device cache.
+
+    Args:
+        device_path: Path of the Device YAML file
+        yaml_paths: Directories to search for included Device YAML files
+
+    """
+    cache_path = default_cache_path()
+    digest = hash_file(device_path)
+    if cache_path is None or digest is None:
+        device = Device.deserialize(device_path)
+        device.deserialize_parents(yaml_paths)
+        return device
+
+    cache = DeviceCache(cache_path)
+    if (device := cache.get(digest, yaml_paths)) is None:
+        device = Device.deserialize(device_path)
+        device.deserialize_parents(yaml_paths)
+        cache.put(digest, yaml_paths, device)
+
+    return device
@@ -1,4 +1,6 @@
 import re
+import warnings
+from functools import cached_property
 from typing import Annotated, Any, ClassVar, cast
 
 from pydantic import Field
@@ -25,6 +27,7 @@ class RecordError(Exception):
 
 class AsynRecord(Record):
     def model_post_init(self, __context: Any):
+        super().model_post_init(__context)
         # We don't care about records without INP or OUT or with both (error)
         if all(k in self.fields.keys() for k in ("INP", "OUT")) or not any(
             k in self.fields.keys() for k in ("INP", "OUT")
@@ -40,7 +43,9 @@ class AsynRecord(Record):
         if "DESC" not in self.fields.keys():
             self.fields["DESC"] = self.name
 
-    def get_parameter_name(self) -> str | None:
+    @cached_property
+    def parameter_name(self) -> str | None:
+        """Return the asyn parameter name of the INP or OUT field to match records."""
         # e.g. from: field(INP,  "@asyn($(PORT),$(ADDR=0),$(TIMEOUT=1))FILE_PATH")
         # extract: FILE_PATH
         parameter_name_extractor = r"@asyn\(.*\)(\S+)"
@@ -53,6 +58,19 @@ class AsynRecord(Record):
                         parameter_name = match.group(1)
         return parameter_name
 
+    def get_parameter_name(self) -> str | None:
+        """Return the asyn parameter name of the INP or OUT field to match records.
+
+        Deprecated, use `parameter_name` instead.
+
+        """
+        warnings.warn(
+            "get_parameter_name is deprecated, use parameter_name instead",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return self.parameter_name
+
     def asyn_component_type(self) -> type["AsynParameter"]:
         # For waveform records the data type is defined by DTYP
         if self.type == "waveform":
@@ -116,6 +134,7 @@ class AsynBinary(AsynParameter):
     write_widget: WriteWidgetUnion = ToggleButton()
 
     def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
         if self.write_record is not None:
             if not all(f in self.write_record.fields for f in ("ZNAM", "ONAM")):
                 print(
@@ -0,0 +1,245 @@
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from pvi._counters import count
+
+# A macro, with one level of nested macros in its default, e.g. `$(ADDR=$(A))`
+_MACRO = r"\$\((?:[^()]|\$\([^()]*\))*\)|\$\{(?:[^{}]|\$\{[^{}]*\})*\}"
+
+# A token of .db/.template syntax, after any whitespace. Comments run to the end of the
+# line and strings can not span lines, so tokens never span lines.
+DB_TOKEN = re.compile(
+    rf"""\s*(?:
+        \#.*
+        | "(?P<string>(?:[^"\\]|\\.)*)"
+        | (?P<bare>(?:[\w\-+:.\[\]<>;]|{_MACRO})+)
+        | (?P<punctuation>[(){{}},])
+    )""",
+    re.VERBOSE,
+)
+
+
+class DbSyntaxError(Exception):
+    """Invalid .db/.template syntax, with the source and line number in the message"""
+
+
+class Token(NamedTuple):
+    """A token of .db/.template syntax
+
+    `kind` is "string" or "bare" for values, else the punctuation character itself.
+    """
+
+    kind: str
+    text: str
+    line: int
+
+
+@dataclass
+class DbRecord:
+    """A record definition"""
+
+    type: str
+    name: str
+    fields: dict[str, str] = field(default_factory=dict[str, str])
+    infos: dict[str, str] = field(default_factory=dict[str, str])
+    aliases: list[str] = field(default_factory=list[str])
+
+
+@dataclass
+class DbAlias:
+    """An `alias(name, alias)` statement outside of a record"""
+
+    name: str
+    alias: str
+
+
+@dataclass
+class DbInclude:
+    """An `include "file"` statement"""
+
+    path: str
+
+
+DbStatement = DbRecord | DbAlias | DbInclude
+
+
+def tokenize(lines: Iterable[str], source: str = "<db>") -> Iterator[Token]:
+    """Split .db/.template syntax into tokens, dropping whitespace and comments.
+
+    Args:
+        lines: Lines of the database, e.g. an open file
+        source: Name of the database for error messages
+
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip()
+        position = 0
+        while position < len(line):
+            match = DB_TOKEN.match(line, position)
+            if match is None:
+                character = line[position:].lstrip()[0]
+                raise DbSyntaxError(
+                    f"{source}:{number}: Unexpected character {character!r}"
+                )
+
+            position = match.end()
+            if match["string"] is not None:
+                yield Token("string", match["string"], number)
+            elif match["bare"] is not None:
+                yield Token("bare", match["bare"], number)
+            elif match["punctuation"] is not None:
+                yield Token(match["punctuation"], match["punctuation"], number)
+
+
+class _TokenStream:
+    # Tokens with one token of lookahead, to parse statements as they are read
+
+    def __init__(self, tokens: Iterator[Token], source: str):
+        self._tokens = tokens
+        self._source = source
+        self._peeked: Token | None = None
+        self._line = 0
+
+    def peek(self) -> Token | None:
+        if self._peeked is None:
+            self._peeked = next(self._tokens, None)
+        return self._peeked
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise self.error("Unexpected end of file")
+        self._peeked = None
+        self._line = token.line
+        return token
+
+    def accept(self, kind: str) -> bool:
+        # Consume the next token only if it is of the given kind
+        token = self.peek()
+        if token is None or token.kind != kind:
+            return False
+        self.next()
+        return True
+
+    def expect(self, *kinds: str) -> Token:
+        token = self.next()
+        if token.kind not in kinds:
+            raise self.error(f"Expected {' or '.join(kinds)}, got {token.text!r}")
+        return token
+
+    def error(self, message: str) -> DbSyntaxError:
+        return DbSyntaxError(f"{self._source}:{self._line}: {message}")
+
+
+def _parse_value(tokens: _TokenStream) -> str:
+    token = tokens.expect("string", "bare", "{")
+    if token.kind != "{":
+        return token.text
+
+    # A JSON value, e.g. a JSON link, which is kept as compact JSON text
+    depth, parts = 1, ["{"]
+    while depth:
+        token = tokens.next()
+        depth += {"{": 1, "}": -1}.get(token.kind, 0)
+        parts.append(f'"{token.text}"' if token.kind == "string" else token.text)
+    return "".join(parts)
+
+
+def _parse_arguments(tokens: _TokenStream, n_arguments: int) -> list[str]:
+    tokens.expect("(")
+    arguments = [_parse_value(tokens)]
+    while tokens.expect(",", ")").kind == ",":
+        arguments.append(_parse_value(tokens))
+
+    if len(arguments) != n_arguments:
+        raise tokens.error(f"Expected {n_arguments} arguments, got {len(arguments)}")
+    return arguments
+
+
+def _skip_block(tokens: _TokenStream, opening: str, closing: str) -> None:
+    # Skip to the token closing a block, after its opening token
+    depth = 1
+    while depth:
+        kind = tokens.next().kind
+        if kind == opening:
+            depth += 1
+        elif kind == closing:
+            depth -= 1
+
+
+def _skip_statement(tokens: _TokenStream) -> None:
+    # Skip statements that do not define records, e.g. `path "..."` or `menu(...) {}`
+    if tokens.expect("string", "(").kind == "string":
+        return
+
+    _skip_block(tokens, "(", ")")
+    if tokens.accept("{"):
+        _skip_block(tokens, "{", "}")
+
+
+def _parse_record(tokens: _TokenStream) -> DbRecord:
+    record_type, name = _parse_arguments(tokens, 2)
+    count("db record")
+    record = DbRecord(record_type, name)
+
+    if not tokens.accept("{"):
+        return record
+
+    while (token := tokens.expect("bare", "}")).kind != "}":
+        match token.text:
+            case "field":
+                key, value = _parse_arguments(tokens, 2)
+                record.fields[key] = value
+            case "info":
+                key, value = _parse_arguments(tokens, 2)
+                record.infos[key] = value
+            case "alias":
+                record.aliases.extend(_parse_arguments(tokens, 1))
+            case _:
+                raise tokens.error(f"Unexpected {token.text!r} in record {name}")
+
+    return record
+
+
+def parse_db(lines: Iterable[str], source: str = "<db>") -> Iterator[DbStatement]:
+    """Parse a .db/.template database, yielding statements as they are read.
+
+    Only one statement is held in memory at a time, so `lines` can be a file of any
+    size. Macros are not expanded and included files are not read. Statements other
+    than records, aliases and includes, e.g. `path`, are skipped.
+
+    Args:
+        lines: Lines of the database, e.g. an open file
+        source: Name of the database for error messages
+
+    Raises:
+        DbSyntaxError: If the database is not valid syntax
+
+    """
+    tokens = _TokenStream(tokenize(lines, source), source)
+    while tokens.peek() is not None:
+        keyword = tokens.expect("bare").text
+        match keyword:
+            case "record" | "grecord":
+                yield _parse_record(tokens)
+            case "alias":
+                yield DbAlias(*_parse_arguments(tokens, 2))
+            case "include":
+                yield DbInclude(tokens.expect("string").text)
+            case _:
+                _skip_statement(tokens)
+
+
+def iter_records(lines: Iterable[str], source: str = "<db>") -> Iterator[DbRecord]:
+    """Parse a .db/.template database, yielding each record as it is read.
+
+    Args:
+        lines: Lines of the database, e.g. an open file
+        source: Name of the database for error messages
+
+    """
+    for statement in parse_db(lines, source):
+        if isinstance(statement, DbRecord):
+            yield statement
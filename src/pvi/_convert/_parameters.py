@@ -1,10 +1,11 @@
 import re
 from enum import Enum
 from functools import cached_property
-from typing import Annotated
+from typing import Annotated, Any
 
 from pydantic import BaseModel, Field
 
+from pvi._counters import count
 from pvi.device import ComponentUnion
 
 
@@ -67,6 +68,10 @@ class Record(BaseModel):
     fields: dict[str, str]  # The record fields
     infos: dict[str, str]  # Any infos to be added to the record
 
+    def model_post_init(self, context: Any, /) -> None:
+        """Count records like the `TypedModel`s they are converted to."""
+        count("model construction")
+
     @cached_property
     def name(self) -> str:
         """Return pv with macros removed to use as label on UIs."""
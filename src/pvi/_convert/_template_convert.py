@@ -1,6 +1,9 @@
-import re
+import warnings
+from collections.abc import Iterable
 from pathlib import Path
 
+from pvi._timings import stage
+from pvi._trace import span
 from pvi.device import (
     ComponentUnion,
     Grid,
@@ -16,6 +19,7 @@ from ._asyn_convert import (
     AsynRecord,
     RecordError,
 )
+from ._db_parser import DbRecord, iter_records
 from ._parameters import Parameter
 
 OVERRIDE_DESC = "# Overriding value in auto-generated template"
@@ -24,7 +28,6 @@ OVERRIDE_DESC = "# Overriding value in auto-generated template"
 class TemplateConverter:
     def __init__(self, templates: list[Path]):
         self.templates = templates
-        self._text = [t.read_text() for t in self.templates]
 
     def convert(self) -> Tree:
         return [
@@ -40,107 +43,42 @@ class TemplateConverter:
 
     def _extract_components(self) -> list[list[ComponentUnion]]:
         components: list[list[ComponentUnion]] = []
-        for text in self._text:
-            record_extractor = RecordExtractor(text)
-            asyn_records = record_extractor.get_asyn_records()
-            template_components: list[ComponentUnion] = []
-            for parameter in RecordRoleSorter.sort_records(asyn_records):
-                component = parameter.generate_component()
-                template_components.append(component)
-            components.append(template_components)
+        for template in self.templates:
+            with span("TemplateConverter.extract_components", template=str(template)):
+                with stage("parse"), template.open() as f:
+                    asyn_records = RecordExtractor(f, template.name).get_asyn_records()
+                template_components: list[ComponentUnion] = []
+                with stage("convert"):
+                    for parameter in RecordRoleSorter.sort_records(asyn_records):
+                        component = parameter.generate_component()
+                        template_components.append(component)
+                components.append(template_components)
         return components
 
 
 class RecordExtractor:
-    def __init__(self, text: str):
-        self._text = text
-
-    def _extract_record_strs(self):
-        # extract a whole record definition inc. fields and leading empty lines e.g.
-        # record(waveform, "$(P)$(R)FilePath")
-        # {
-        #    field(PINI, "YES")
-        #    field(DTYP, "asynOctetWrite")
-        #    field(INP,  "@asyn($(PORT),$(ADDR=0),$(TIMEOUT=1))FILE_PATH")
-        #    field(FTVL, "CHAR")
-        #    field(NELM, "256")
-        #    info(autosaveFields, "VAL")
-        # }
-        record_extractor = re.compile(r"\s*^[^#\n]*record\([^{]*{[^}]*}", re.MULTILINE)
-        return re.findall(record_extractor, self._text)
-
-    def _parse_record(self, record_str: str) -> tuple[str, str, str]:
-        # extract three groups from a record definition e.g.
-        # from:
-        # record(waveform, "$(P)$(R)FilePath")
-        # {
-        #    #field(PINI, "YES")
-        #    field(DTYP, "asynOctetWrite")
-        #    field(INP,  "@asyn($(PORT),$(ADDR=0),$(TIMEOUT=1))FILE_PATH")
-        #    field(FTVL, "CHAR")
-        #    field(NELM, "256")
-        #    info(autosaveFields, "VAL")
-        # }
-        # extract:
-        # Group 1 - record type: waveform
-        # Group 2 - record name : $(P)$(R)FilePath
-        # Group 3 - all fields:
-        #    #field(PINI, "YES")
-        #    field(DTYP, "asynOctetWrite")
-        #    field(INP,  "@asyn($(PORT),$(ADDR=0),$(TIMEOUT=1))FILE_PATH")
-        #    field(FTVL, "CHAR")
-        #    field(NELM, "256")
-        #    info(autosaveFields, "VAL")
-
-        # https://regex101.com/r/MZz1oa
-        record_parser = re.compile(r'record\((\w+),\s*"?([^"]+)"?\)\s*{([^}]*)}')
-        matches = re.findall(record_parser, record_str)
-        if len(matches) != 1:
-            raise RecordError(f"Parse failed on record: {record_str}")
-        return matches[0]
-
-    def _extract_fields(self, fields_str: str) -> list[tuple[str, str]]:
-        # extract two groups from a field e.g.
-        # from: field(PINI, "YES")
-        # extract:
-        # Group 1 - Field: PINI
-        # Group 2 - Value: YES
-        field_extractor = re.compile(
-            r'^[^#\n]*(?:field\()([^,]*)(?:,)(?:[^"]*)(?:")([^"]*)(?:")', re.MULTILINE
+    def __init__(self, lines: Iterable[str], source: str = "<db>"):
+        self._lines = lines
+        self._source = source
+
+    def _create_asyn_record(self, db_record: DbRecord) -> AsynRecord:
+        if db_record.type == "motor":
+            raise RecordError(f"Record `{db_record.name}` is type motor - ignoring")
+
+        return AsynRecord(
+            pv=db_record.name,
+            type=db_record.type,
+            fields=db_record.fields,
+            infos=db_record.infos,
         )
-        return re.findall(field_extractor, fields_str)
-
-    def _extract_infos(self, fields_str: str) -> list[tuple[str, str]]:
-        # extract two groups from an info tag e.g.
-        # from: info(autosaveFields, "VAL")
-        # extract:
-        # Group 1 - Field: autosaveFields
-        # Group 2 - Value: VAL
-        info_extractor = re.compile(
-            r'^[^#\n]*(?:info\()([^,]*)(?:,)(?:[^"]*)(?:")([^"]*)(?:")', re.MULTILINE
-        )
-        return re.findall(info_extractor, fields_str)
-
-    def _create_asyn_record(self, record_str: str) -> AsynRecord:
-        record_type, record_name, record_fields = self._parse_record(record_str)
-
-        if record_type == "motor":
-            newline = "\n"
-            raise RecordError(
-                f"Record `{record_str.split(newline)[0]}` is type motor - ignoring"
-            )
-
-        fields = dict(self._extract_fields(record_fields))
-        info = dict(self._extract_infos(record_fields))
-        record = AsynRecord(pv=record_name, type=record_type, fields=fields, infos=info)
-        return record
 
     def get_asyn_records(self) -> list[AsynRecord]:
-        record_strs = self._extract_record_strs()
+        # Records are parsed one at a time as the lines are read, so only the asyn
+        # records are held in memory
         record_list: list[AsynRecord] = []
-        for record_str in record_strs:
+        for db_record in iter_records(self._lines, self._source):
             try:
-                record_list.append(self._create_asyn_record(record_str))
+                record_list.append(self._create_asyn_record(db_record))
             except RecordError as error:
                 print(error)
         return record_list
@@ -168,13 +106,7 @@ class RecordRoleSorter:
             return read_records, write_records
 
         read_records, write_records = _sort_inputs_outputs(records)
-        parameters: list[Parameter] = []
-        parameters += ParameterRoleMatcher.get_actions(read_records, write_records)
-        parameters += ParameterRoleMatcher.get_readbacks(read_records, write_records)
-        parameters += ParameterRoleMatcher.get_setting_pairs(
-            read_records, write_records
-        )
-        return parameters
+        return ParameterRoleMatcher.match_records(read_records, write_records)
 
 
 class SettingPair(Parameter):
@@ -239,37 +171,79 @@ class Action(Parameter):
 
 class ParameterRoleMatcher:
     @staticmethod
-    def get_actions(
+    def match_records(
         read_records: list[AsynRecord], write_records: list[AsynRecord]
-    ) -> list[Action]:
+    ) -> list[Parameter]:
+        """Match read and write records by asyn parameter name.
+
+        Write records without a read record are actions, read records without a write
+        record are readbacks and every read and write record with the same parameter
+        name form a setting pair.
+
+        Args:
+            read_records: Records with an INP field
+            write_records: Records with an OUT field
+
+        Returns:
+            The actions, then the readbacks, then the setting pairs
+
+        """
+        write_records_by_name: dict[str | None, list[AsynRecord]] = {}
+        for w in write_records:
+            write_records_by_name.setdefault(w.parameter_name, []).append(w)
+        read_names = {r.parameter_name for r in read_records}
+
         actions = [
             Action(write_record=w)
             for w in write_records
-            if w.get_parameter_name()
-            not in [r.get_parameter_name() for r in read_records]
+            if w.parameter_name not in read_names
         ]
-        return actions
+
+        readbacks: list[Readback] = []
+        setting_pairs: list[SettingPair] = []
+        for r in read_records:
+            if r.parameter_name not in write_records_by_name:
+                readbacks.append(Readback(read_record=r))
+                continue
+
+            setting_pairs += [
+                SettingPair(read_record=r, write_record=w)
+                for w in write_records_by_name[r.parameter_name]
+            ]
+
+        return [*actions, *readbacks, *setting_pairs]
+
+    @staticmethod
+    def get_actions(
+        read_records: list[AsynRecord], write_records: list[AsynRecord]
+    ) -> list[Action]:
+        """Deprecated, use `match_records` instead."""
+        _warn_deprecated("get_actions")
+        parameters = ParameterRoleMatcher.match_records(read_records, write_records)
+        return [p for p in parameters if isinstance(p, Action)]
 
     @staticmethod
     def get_readbacks(
         read_records: list[AsynRecord], write_records: list[AsynRecord]
     ) -> list[Readback]:
-        readbacks = [
-            Readback(read_record=r)
-            for r in read_records
-            if r.get_parameter_name()
-            not in [w.get_parameter_name() for w in write_records]
-        ]
-        return readbacks
+        """Deprecated, use `match_records` instead."""
+        _warn_deprecated("get_readbacks")
+        parameters = ParameterRoleMatcher.match_records(read_records, write_records)
+        return [p for p in parameters if isinstance(p, Readback)]
 
     @staticmethod
     def get_setting_pairs(
         read_records: list[AsynRecord], write_records: list[AsynRecord]
     ) -> list[SettingPair]:
-        setting_pairs = [
-            SettingPair(read_record=r, write_record=w)
-            for r in read_records
-            for w in write_records
-            if r.get_parameter_name() == w.get_parameter_name()
-        ]
-        return setting_pairs
+        """Deprecated, use `match_records` instead."""
+        _warn_deprecated("get_setting_pairs")
+        parameters = ParameterRoleMatcher.match_records(read_records, write_records)
+        return [p for p in parameters if isinstance(p, SettingPair)]
+
+
+def _warn_deprecated(name: str) -> None:
+    warnings.warn(
+        f"ParameterRoleMatcher.{name} is deprecated, use match_records instead",
+        DeprecationWarning,
+        stacklevel=3,
+    )
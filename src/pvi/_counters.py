@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Generator
+from contextlib import contextmanager
+
+# Operations counted by `count_operations`, or None if disabled
+_counters: Counter[str] | None = None
+
+
+def count(name: str, n: int = 1) -> None:
+    """Count `n` of an operation, if operations are being counted
+
+    Args:
+        name: Name of the operation, e.g. `regex compile`
+        n: Number of operations to add
+
+    """
+    if _counters is not None:
+        _counters[name] += n
+
+
+@contextmanager
+def count_operations() -> Generator[Counter[str]]:
+    """Count the expensive operations performed while in this context.
+
+    The counts show how much work formatting a Device does, e.g. the number of template
+    copies and regex compilations per widget, independently of the speed of the machine,
+    so they can be compared between Devices and checked against budgets.
+
+    Operations done in worker processes are not counted.
+
+    """
+    global _counters
+    previous = _counters
+    _counters = Counter()
+    try:
+        yield _counters
+    finally:
+        _counters = previous
+
+
+def format_counts(counts: Counter[str]) -> str:
+    """Format counts as a table, most frequent first"""
+    lines = [f"{'operation':<20} {'count':>9}"]
+    lines += [f"{name:<20} {n:>9}" for name, n in counts.most_common()]
+    return "\n".join(lines)
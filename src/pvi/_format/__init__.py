@@ -1,5 +1,18 @@
-from .aps import APSFormatter
-from .base import Formatter
-from .dls import DLSFormatter
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+from .base import FORMATTER_MODULES, Formatter
+
+if TYPE_CHECKING:
+    from .aps import APSFormatter
+    from .dls import DLSFormatter
 
 __all__ = ["Formatter", "APSFormatter", "DLSFormatter"]
+
+
+def __getattr__(name: str) -> Any:
+    # Import Formatter child classes on first use, as they import UI libraries
+    if name in FORMATTER_MODULES:
+        return getattr(import_module(FORMATTER_MODULES[name]), name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import re
-from typing import Any
+from pathlib import Path
+from typing import Any, Self
 
+from pvi._counters import count
 from pvi._format.utils import Bounds, split_with_sep
 from pvi._format.widget import UITemplate, WidgetFormatter
 from pvi.device import TextFormat, TextRead, TextWrite, WidgetUnion
@@ -22,6 +24,8 @@ class AdlTemplate(UITemplate[str]):
         widgets = split_with_sep(text, "\n}\n")
         self.screen = "".join(widgets[:3])
         self.widgets = widgets[3:]
+        # Widget snippets found by previous searches
+        self._matches: dict[str, str] = {}
 
     def set(
         self,
@@ -44,6 +48,7 @@ class AdlTemplate(UITemplate[str]):
                     value = f"{value}.adl"  # Must include file extension
 
             # Only need single line
+            count("regex compile")
             pattern = re.compile(rf"^(\s*{item})=.*$", re.MULTILINE)
             if isinstance(value, str):
                 value = f'"{value}"'
@@ -64,10 +69,18 @@ class AdlTemplate(UITemplate[str]):
 
         return template
 
+    @classmethod
+    def from_file(cls, path: Path) -> Self:
+        return cls(path.read_text())
+
     def search(self, search: str) -> str:
-        matches = [t for t in self.widgets if re.search(search, t)]
-        assert len(matches) == 1, f"Got {len(matches)} matches for {search!r}"
-        return matches[0]
+        # Widgets are immutable strings, so results can be shared between searches
+        if (match := self._matches.get(search)) is None:
+            matches = [t for t in self.widgets if re.search(search, t)]
+            assert len(matches) == 1, f"Got {len(matches)} matches for {search!r}"
+            match = self._matches[search] = matches[0]
+
+        return match
 
     def create_group(
         self,
@@ -8,6 +8,7 @@ from pvi._format.screen import (
     ScreenFormatterFactory,
     ScreenLayout,
     WidgetFormatterFactory,
+    write_text,
 )
 from pvi._format.widget import (
     ActionWidgetFormatter,
@@ -17,11 +18,15 @@ from pvi._format.widget import (
     PVWidgetFormatter,
     SubScreenWidgetFormatter,
     WidgetFormatter,
+    load_template,
 )
 from pvi.device import Device
 
 from .base import Formatter
 from .utils import Bounds, with_title
+from .writer import WriteSummary
+
+APS_ADL = Path(__file__).parent / "aps.adl"
 
 
 class APSFormatter(Formatter):
@@ -34,9 +39,18 @@ class APSFormatter(Formatter):
     widget_width: Annotated[int, Field(description="Width of the widgets")] = 100
     widget_height: Annotated[int, Field(description="Height of the widgets")] = 20
 
-    def format(self, device: Device, path: Path) -> None:
+    def suffixes(self) -> list[str]:
+        return [".adl"]
+
+    def template_path(self, path: Path) -> Path | None:
+        return APS_ADL
+
+    def prepare(self, path: Path) -> None:
+        load_template(AdlTemplate, APS_ADL)
+
+    def format(self, device: Device, path: Path, jobs: int = 1) -> WriteSummary:
         assert path.suffix == ".adl", "Can only write adl files"
-        template = AdlTemplate((Path(__file__).parent / "aps.adl").read_text())
+        template = load_template(AdlTemplate, APS_ADL)
         layout = ScreenLayout(
             spacing=self.spacing,
             title_height=self.title_height,
@@ -167,11 +181,6 @@ class APSFormatter(Formatter):
         )
         title = f"{device.label}"
 
-        screen_formatter, sub_screens = formatter_factory.create_screen_formatter(
-            device.children, title
+        return formatter_factory.format_screens(
+            device.children, title, path, path.suffix, write_text, jobs
         )
-
-        path.write_text("".join(screen_formatter.format()))
-        for sub_screen_name, sub_screen_formatter in sub_screens:
-            sub_screen_path = Path(path.parent / f"{sub_screen_name}{path.suffix}")
-            sub_screen_path.write_text("".join(sub_screen_formatter.format()))
@@ -1,8 +1,11 @@
+from importlib import import_module
 from pathlib import Path
 from typing import Annotated, Any, Union
 
 from pydantic import Field, TypeAdapter
 
+from pvi._format.writer import WriteSummary
+from pvi._timings import stage
 from pvi._yaml_utils import YamlValidatorMixin
 from pvi.device import Device, DeviceRef, enforce_pascal_case
 from pvi.typed_model import TypedModel, as_tagged_union
@@ -19,14 +22,37 @@ class IndexEntry(TypedModel):
     macros: Annotated[dict[str, str], Field(description="Macros to launch UI with")]
 
 
+# Modules of the Formatter child classes by class name, imported when first needed so
+# that only the dependencies of the formatters in use are loaded, e.g. lxml for bob
+FORMATTER_MODULES = {
+    "APSFormatter": "pvi._format.aps",
+    "DLSFormatter": "pvi._format.dls",
+}
+
+
 class Formatter(TypedModel, YamlValidatorMixin):
     """Base UI formatter."""
 
+    @classmethod
+    def import_subclass(cls, name: str) -> None:
+        """Import the module of the Formatter child class with the given name.
+
+        Args:
+            name: Class name of the Formatter, e.g. "DLSFormatter"
+
+        """
+        if name in FORMATTER_MODULES:
+            import_module(FORMATTER_MODULES[name])
+
     @classmethod
     def type_adapter(cls) -> TypeAdapter["Formatter"]:
         """Create TypeAdapter of all child classes"""
+        # Sort as the order child classes are imported in varies
+        subclasses = sorted(
+            cls.__subclasses__(), key=lambda subclass: subclass.__name__
+        )
         return TypeAdapter(
-            as_tagged_union(Union[tuple(cls.__subclasses__())])  # type: ignore # noqa: UP007
+            as_tagged_union(Union[tuple(subclasses)])  # type: ignore # noqa: UP007
         )
 
     @classmethod
@@ -37,6 +63,7 @@ class Formatter(TypedModel, YamlValidatorMixin):
             serialized: Dictionary of class instance
 
         """
+        cls.import_subclass(serialized.get("type", ""))
         return cls.type_adapter().validate_python(serialized)
 
     @classmethod
@@ -48,7 +75,8 @@ class Formatter(TypedModel, YamlValidatorMixin):
 
         """
         serialized = cls.validate_yaml(yaml)
-        return cls.from_dict(serialized)
+        with stage("validation"):
+            return cls.from_dict(serialized)
 
     @classmethod
     def create_schema(cls) -> dict[str, Any]:
@@ -57,20 +85,62 @@ class Formatter(TypedModel, YamlValidatorMixin):
         Formatter itself is not included, as it should not be instanstiated directly.
 
         """
+        for name in FORMATTER_MODULES:
+            cls.import_subclass(name)
+
         cls.rebuild_child_models()
         return cls.type_adapter().json_schema()
 
-    def format(self, device: Device, path: Path) -> None:
+    def suffixes(self) -> list[str]:
+        """The file suffixes of the UIs this Formatter can format, the default first.
+
+        By default this is empty, as the suffixes of child classes are unknown.
+
+        """
+        return []
+
+    def template_path(self, path: Path) -> Path | None:
+        """Path of the UI template file used to format `path`, if there is one.
+
+        Args:
+            path: Output file path that will be formatted
+
+        """
+        return None
+
+    def prepare(self, path: Path) -> None:
+        """Load any resources needed to format `path` ahead of formatting.
+
+        This is called before starting worker processes so that they can share
+        resources loaded once in the parent process. By default this does nothing.
+
+        Args:
+            path: Output file path that will be formatted
+
+        """
+
+    def format(self, device: Device, path: Path, jobs: int = 1) -> WriteSummary:
         """To be implemented by child classes to define how to format specific UIs.
 
+        Files whose content is unchanged should be left untouched, which
+        `WriteSummary.write` takes care of.
+
         Args:
             device: Device to populate UI from
             path: Output file path to write UI to
+            jobs: Number of worker processes to create sub screens in. This is only
+                passed if more than 1, so child classes that do not create worker
+                processes do not need to accept it.
+
+        Returns:
+            The files written and left unchanged
 
         """
         raise NotImplementedError(self)
 
-    def format_index(self, label: str, index_entries: list[IndexEntry], path: Path):
+    def format_index(
+        self, label: str, index_entries: list[IndexEntry], path: Path
+    ) -> WriteSummary:
         """Format an index of buttons to open the given UIs.
 
         Args:
@@ -78,8 +148,11 @@ class Formatter(TypedModel, YamlValidatorMixin):
             index_entries: Buttons to format on the index UI
             path: Output path of generated UI
 
+        Returns:
+            The files written and left unchanged
+
         """
-        self.format(
+        return self.format(
             Device(
                 label=label,
                 children=[
@@ -1,6 +1,7 @@
 from collections.abc import Sequence
 from copy import deepcopy
-from typing import Any
+from pathlib import Path
+from typing import Any, Self
 
 from lxml.etree import (
     SubElement,
@@ -9,6 +10,7 @@ from lxml.etree import (
     parse,
 )
 
+from pvi._counters import count
 from pvi._format.utils import Bounds
 from pvi._format.widget import UITemplate, WidgetFormatter
 from pvi.device import (
@@ -45,8 +47,19 @@ class BobTemplate(UITemplate[_Element]):
 
         # Passing `remove_blank_text` means we can pretty print our additions
         self.tree = parse(text, parser=XMLParser(remove_blank_text=True))
+        # Index elements by their 'name' subelement so searches do not scan the tree
+        self._elements: dict[str, list[_Element]] = {}
+        for element in self.tree.iter("name"):
+            parent = element.getparent()
+            if isinstance(parent, _Element) and element.text is not None:
+                self._elements.setdefault(element.text, []).append(parent)
+
         self.screen = self.search("Display")
 
+    @classmethod
+    def from_file(cls, path: Path) -> Self:
+        return cls(str(path))
+
     def set(
         self,
         template: _Element,
@@ -68,6 +81,7 @@ class BobTemplate(UITemplate[_Element]):
 
         widget_type = template.attrib.get("type", "")
 
+        count("template deepcopy")
         t_copy = deepcopy(template)
         for item, value in properties.items():
             new_text = ""
@@ -147,29 +161,22 @@ class BobTemplate(UITemplate[_Element]):
                 Can be found in its name subelement.
 
         Returns:
-            The extracted element.
+            A copy of the extracted element.
         """
 
-        tree_copy = deepcopy(self.tree)
         # 'name' is the unique ID for each element
-        matches = [
-            e
-            for e in [
-                element.getparent()
-                for element in tree_copy.iter("name")
-                if element.text == search
-            ]
-            if isinstance(e, _Element)
-        ]
+        matches = self._elements.get(search, [])
         assert len(matches) == 1, f"Got {len(matches)} matches for {search!r}"
 
+        count("template deepcopy")
+        match = deepcopy(matches[0])
         # Isolate the screen properties
-        if matches[0].tag == "display":
-            for child in matches[0]:
+        if match.tag == "display":
+            for child in match:
                 if child.tag == "widget":
-                    matches[0].remove(child)
+                    match.remove(child)
 
-        return matches[0]
+        return match
 
     def create_group(
         self,
@@ -14,6 +14,7 @@ from pvi._format.screen import (
     ScreenFormatterFactory,
     ScreenLayout,
     WidgetFormatterFactory,
+    write_text,
 )
 from pvi._format.widget import (
     ActionWidgetFormatter,
@@ -23,11 +24,17 @@ from pvi._format.widget import (
     PVWidgetFormatter,
     SubScreenWidgetFormatter,
     WidgetFormatter,
+    load_template,
 )
+from pvi._trace import span
 from pvi.device import Device
 
 from .base import Formatter
 from .utils import Bounds, split_base_and_ext, with_title
+from .writer import WriteSummary
+
+DLS_EDL = Path(__file__).parent / "dls.edl"
+DLS_BOB = Path(__file__).parent / "dls.bob"
 
 
 class DLSFormatter(Formatter):
@@ -40,17 +47,29 @@ class DLSFormatter(Formatter):
     widget_width: Annotated[int, Field(description="Width of the widgets")] = 200
     widget_height: Annotated[int, Field(description="Height of the widgets")] = 20
 
-    def format(self, device: Device, path: Path) -> None:
+    def suffixes(self) -> list[str]:
+        return [".bob", ".edl"]
+
+    def template_path(self, path: Path) -> Path | None:
+        return {".edl": DLS_EDL, ".bob": DLS_BOB}.get(path.suffix)
+
+    def prepare(self, path: Path) -> None:
+        if path.suffix == ".edl":
+            load_template(EdlTemplate, DLS_EDL)
+        elif path.suffix == ".bob":
+            load_template(BobTemplate, DLS_BOB)
+
+    def format(self, device: Device, path: Path, jobs: int = 1) -> WriteSummary:
         if path.suffix == ".edl":
             f = self.format_edl
         elif path.suffix == ".bob":
             f = self.format_bob
         else:
             raise ValueError("Can only write .edl or .bob files")
-        f(device, path)
+        return f(device, path, jobs)
 
-    def format_edl(self, device: Device, path: Path):
-        template = EdlTemplate((Path(__file__).parent / "dls.edl").read_text())
+    def format_edl(self, device: Device, path: Path, jobs: int = 1) -> WriteSummary:
+        template = load_template(EdlTemplate, DLS_EDL)
         screen_layout = ScreenLayout(
             spacing=self.spacing,
             title_height=self.title_height,
@@ -201,17 +220,12 @@ class DLSFormatter(Formatter):
         )
         title = f"{device.label}"
 
-        screen_formatter, sub_screens = formatter_factory.create_screen_formatter(
-            device.children, title
+        return formatter_factory.format_screens(
+            device.children, title, path, all_suffixes, write_text, jobs
         )
 
-        path.write_text("".join(screen_formatter.format()))
-        for sub_screen_name, sub_screen_formatter in sub_screens:
-            sub_screen_path = Path(path.parent / f"{sub_screen_name}{all_suffixes}")
-            sub_screen_path.write_text("".join(sub_screen_formatter.format()))
-
-    def format_bob(self, device: Device, path: Path):
-        template = BobTemplate(str(Path(__file__).parent / "dls.bob"))
+    def format_bob(self, device: Device, path: Path, jobs: int = 1) -> WriteSummary:
+        template = load_template(BobTemplate, DLS_BOB)
         # LP DOCS REF: Define the layout properties
         screen_layout = ScreenLayout(
             spacing=self.spacing,
@@ -379,30 +393,28 @@ class DLSFormatter(Formatter):
         # SCREEN_FORMAT DOCS REF: Format the screen
         title = f"{device.label}"
 
-        screen_formatter, sub_screens = formatter_factory.create_screen_formatter(
-            device.children, title
+        return formatter_factory.format_screens(
+            device.children, title, path, all_suffixes, write_bob, jobs
         )
 
-        write_bob(screen_formatter, path)
-        for sub_screen_name, sub_screen_formatter in sub_screens:
-            sub_screen_path = Path(path.parent / f"{sub_screen_name}{all_suffixes}")
-            write_bob(sub_screen_formatter, sub_screen_path)
-
 
 # SCREEN_WRITE DOCS REF: Generate the screen file
 
 
-def write_bob(screen_formatter: GroupFormatter[_Element], path: Path):
-    # The root:'Display' is always the first element in texts
-    texts = screen_formatter.format()
-    element_tree = fromstring(tostring(texts[0]), None)
-    for element in texts[:0:-1]:
-        grid_step_y = element_tree.find("grid_step_y")
-        if grid_step_y is None:
-            raise ValueError(f"Could not find grid_step_y in element {element}")
+def write_bob(
+    screen_formatter: GroupFormatter[_Element], path: Path, summary: WriteSummary
+):
+    with span("write_bob", path=str(path)):
+        # The root:'Display' is always the first element in texts
+        texts = screen_formatter.format()
+        element_tree = fromstring(tostring(texts[0]), None)
+        for element in texts[:0:-1]:
+            grid_step_y = element_tree.find("grid_step_y")
+            if grid_step_y is None:
+                raise ValueError(f"Could not find grid_step_y in element {element}")
 
-        element_tree.insert(element_tree.index(grid_step_y) + 1, element)
+            element_tree.insert(element_tree.index(grid_step_y) + 1, element)
 
-    element_tree = element_tree.getroottree()
-    find_element(element_tree, "name").text = screen_formatter.title  # type: ignore
-    element_tree.write(str(path), pretty_print=True)
+        element_tree = element_tree.getroottree()
+        find_element(element_tree, "name").text = screen_formatter.title  # type: ignore
+        summary.write(path, tostring(element_tree, pretty_print=True))
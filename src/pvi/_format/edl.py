@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import re
-from typing import Any
+from pathlib import Path
+from typing import Any, Self
 
+from pvi._counters import count
 from pvi._format.utils import Bounds, split_with_sep
 from pvi._format.widget import UITemplate, WidgetFormatter
 from pvi.device import TextFormat, TextRead, TextWrite, WidgetUnion
@@ -21,6 +23,8 @@ class EdlTemplate(UITemplate[str]):
         assert "endGroup" not in text, "Can't do groups"
         self.screen, text = split_with_sep(text, "\nendScreenProperties\n", 1)
         self.widgets = split_with_sep(text, "\nendObjectProperties\n")
+        # Widget snippets found by previous searches
+        self._matches: dict[str, str] = {}
 
     def set(
         self,
@@ -38,6 +42,7 @@ class EdlTemplate(UITemplate[str]):
             if item in ["displayFileName", "yPv"]:
                 value = f"0 {value}"  # These are items in an array but we only use one
 
+            count("regex compile")
             multiline = re.compile(rf"^{item} {{[^}}]*}}$", re.MULTILINE | re.DOTALL)
             if multiline.search(template):
                 pattern = multiline
@@ -45,6 +50,7 @@ class EdlTemplate(UITemplate[str]):
                 value = "\n".join(["{"] + [f'  "{x}"' for x in lines] + ["}"])
             else:
                 # Single line
+                count("regex compile")
                 pattern = re.compile(rf"^{item} .*$", re.MULTILINE)
                 if isinstance(value, str):
                     value = f'"{value}"'
@@ -65,10 +71,18 @@ class EdlTemplate(UITemplate[str]):
 
         return template
 
+    @classmethod
+    def from_file(cls, path: Path) -> Self:
+        return cls(path.read_text())
+
     def search(self, search: str) -> str:
-        matches = [t for t in self.widgets if re.search(search, t)]
-        assert len(matches) == 1, f"Got {len(matches)} matches for {search!r}"
-        return matches[0]
+        # Widgets are immutable strings, so results can be shared between searches
+        if (match := self._matches.get(search)) is None:
+            matches = [t for t in self.widgets if re.search(search, t)]
+            assert len(matches) == 1, f"Got {len(matches)} matches for {search!r}"
+            match = self._matches[search] = matches[0]
+
+        return match
 
     def create_group(
         self,
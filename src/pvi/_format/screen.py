@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from collections.abc import Iterator, Sequence
-from dataclasses import dataclass, field
+import multiprocessing
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field, replace
+from pathlib import Path
 from typing import (
+    Any,
     Generic,
     TypeVar,
 )
@@ -13,11 +16,17 @@ from pvi._format.widget import (
     SubScreenWidgetFormatter,
     WidgetFormatter,
     WidgetFormatterFactory,
-    max_x,
-    max_y,
-    next_x,
     next_y,
 )
+from pvi._format.writer import WriteSummary
+from pvi._timings import (
+    Timings,
+    for_screen,
+    merge_timings,
+    record_worker_timings,
+    stage,
+)
+from pvi._trace import span
 from pvi.device import (
     ArrayTrace,
     ButtonPanel,
@@ -39,7 +48,9 @@ from pvi.device import (
     TableRead,
     TableWrite,
     TextRead,
+    TextWrite,
     Tree,
+    WidgetUnion,
 )
 
 T = TypeVar("T")
@@ -58,6 +69,34 @@ class ScreenLayout:
     group_width_offset: int
 
 
+@dataclass
+class Extent:
+    """Running maximum x and y of the widgets laid out so far
+
+    This is updated as widgets are added so that finding the next column is O(1),
+    rather than scanning every widget with `max_x`.
+    """
+
+    x: int = 0
+    y: int = 0
+    empty: bool = True
+
+    def add(self, widgets: Sequence[WidgetFormatter[T]]) -> None:
+        """Expand to include the bounds of `widgets`"""
+        for widget in widgets:
+            x = widget.bounds.x + widget.bounds.w
+            y = widget.bounds.y + widget.bounds.h
+            if self.empty:
+                self.x, self.y, self.empty = x, y, False
+            else:
+                self.x = max(self.x, x)
+                self.y = max(self.y, y)
+
+    def next_x(self, spacing: int = 0) -> int:
+        """The x position of a column to the right of all widgets, as `next_x`"""
+        return 0 if self.empty else self.x + spacing
+
+
 @dataclass
 class ScreenFormatterFactory(Generic[T]):
     screen_formatter_cls: type[GroupFormatter[T]]
@@ -82,6 +121,133 @@ class ScreenFormatterFactory(Generic[T]):
             A `ScreenFormatter` plus a list of (file name, `ScreenFormatter`) for any
             nested `SubScreen`s in components
 
+        """
+        with span("ScreenFormatterFactory.create_screen_formatter", title=title):
+            with for_screen(self.base_file_name), stage("layout"):
+                screen_formatter = self.layout_screen_formatter(components, title)
+            sub_screens = self.create_sub_screen_formatters(screen_formatter.children)
+            return screen_formatter, sub_screens
+
+    def format_screens(
+        self,
+        components: Tree,
+        title: str,
+        path: Path,
+        suffix: str,
+        write: Callable[[GroupFormatter[T], Path, WriteSummary], None],
+        jobs: int = 1,
+    ) -> WriteSummary:
+        """Create a screen for `components` and all of its sub screens and write them
+
+        Sub screens are independent once the top level screen is laid out, so with
+        `jobs` > 1 each sub screen, including any sub screens nested in it, is laid
+        out and written in a pool of forked worker processes. The files written and
+        the order they are reported in do not depend on `jobs`.
+
+        Args:
+            components: A list of components that make up a device
+            title: The title of the screen
+            path: Path to write the screen to
+            suffix: Suffix to add to the file name of each sub screen
+            write: Function to format a `ScreenFormatter` and write it to a path
+            jobs: Number of worker processes to create sub screens in
+
+        Returns:
+            The files written and left unchanged
+
+        """
+        with (
+            span("ScreenFormatterFactory.create_screen_formatter", title=title),
+            for_screen(self.base_file_name),
+            stage("layout"),
+        ):
+            screen_formatter = self.layout_screen_formatter(components, title)
+        sub_screen_widget_formatters = self.find_sub_screen_widget_formatters(
+            screen_formatter.children
+        )
+
+        summary = WriteSummary()
+        with for_screen(self.base_file_name), stage("render"):
+            write(screen_formatter, path, summary)
+
+        if (
+            jobs < 2
+            or len(sub_screen_widget_formatters) < 2
+            # Workers that are not forked would not inherit the work to do
+            or "fork" not in multiprocessing.get_all_start_methods()
+        ):
+            for sub_screen_widget_formatter in sub_screen_widget_formatters:
+                summary.extend(
+                    self.write_sub_screen(
+                        sub_screen_widget_formatter, path.parent, suffix, write
+                    )
+                )
+            return summary
+
+        global _sub_screen_work
+        _sub_screen_work = (
+            self,
+            sub_screen_widget_formatters,
+            path.parent,
+            suffix,
+            write,
+        )
+        try:
+            with multiprocessing.get_context("fork").Pool(
+                min(jobs, len(sub_screen_widget_formatters))
+            ) as pool:
+                for sub_screen_summary, timings in pool.map(
+                    _write_sub_screen,
+                    range(len(sub_screen_widget_formatters)),
+                    chunksize=1,
+                ):
+                    summary.extend(sub_screen_summary)
+                    merge_timings(timings)
+        finally:
+            _sub_screen_work = None
+
+        return summary
+
+    def write_sub_screen(
+        self,
+        sub_screen_widget_formatter: SubScreenWidgetFormatter[T],
+        directory: Path,
+        suffix: str,
+        write: Callable[[GroupFormatter[T], Path, WriteSummary], None],
+    ) -> WriteSummary:
+        """Create the screen opened by a sub screen button and any nested in it and
+        write them to `directory`
+
+        Returns:
+            The files written and left unchanged
+
+        """
+        summary = WriteSummary()
+        for sub_screen_name, sub_screen_formatter in self.create_sub_screen_formatter(
+            sub_screen_widget_formatter
+        ):
+            with for_screen(sub_screen_name), stage("render"):
+                write(
+                    sub_screen_formatter,
+                    directory / f"{sub_screen_name}{suffix}",
+                    summary,
+                )
+
+        return summary
+
+    def layout_screen_formatter(
+        self, components: Tree, title: str
+    ) -> GroupFormatter[T]:
+        """Create an instance of `screen_cls` populated with widgets of `components`,
+        without creating the screens of any `SubScreen`s
+
+        Args:
+            components: A list of components that make up a device
+            title: The title of the screen
+
+        Returns:
+            A `ScreenFormatter`
+
         """
         full_w = (
             self.layout.label_width + self.layout.widget_width + 2 * self.layout.spacing
@@ -89,6 +255,7 @@ class ScreenFormatterFactory(Generic[T]):
         screen_bounds = Bounds(h=self.layout.max_height)
         widget_dims = {"w": full_w, "h": self.layout.widget_height}
         screen_widgets: list[WidgetFormatter[T]] = []
+        screen_extent = Extent()
         columns: list[Bounds] = [Bounds(**widget_dims)]
 
         content_stacked = False
@@ -115,7 +282,7 @@ class ScreenFormatterFactory(Generic[T]):
                 continue
             last_column_bounds = columns[-1]
             next_column_bounds = Bounds(
-                x=next_x(screen_widgets, self.layout.spacing),
+                x=screen_extent.next_x(self.layout.spacing),
                 y=0,
                 **widget_dims,
             )
@@ -124,42 +291,35 @@ class ScreenFormatterFactory(Generic[T]):
             if isinstance(c, Group) and not isinstance(c.layout, Row):
                 # Create embedded group widget containing its components
                 # Note: Group adjusts bounds to fit the components
-                screen_widgets.extend(
-                    self.create_group_formatters(
-                        c,
-                        screen_bounds=screen_bounds,
-                        column_bounds=last_column_bounds,
-                        next_column_bounds=next_column_bounds,
-                        squeeze=not in_subscreen,
-                    )
+                widgets = self.create_group_formatters(
+                    c,
+                    screen_bounds=screen_bounds,
+                    column_bounds=last_column_bounds,
+                    next_column_bounds=next_column_bounds,
+                    squeeze=not in_subscreen,
                 )
             else:
                 # Create top level single line widget or Row of widgets
                 # Note: This will change columns in place
-                screen_widgets.extend(
-                    self.create_component_widget_formatters(
-                        c,
-                        parent_bounds=screen_bounds,
-                        column_bounds=last_column_bounds,
-                        next_column_bounds=next_column_bounds,
-                        # Indent top-level widgets to align with Group widgets
-                        indent=True,
-                        stacked=content_stacked,
-                    )
+                widgets = self.create_component_widget_formatters(
+                    c,
+                    parent_bounds=screen_bounds,
+                    column_bounds=last_column_bounds,
+                    next_column_bounds=next_column_bounds,
+                    # Indent top-level widgets to align with Group widgets
+                    indent=True,
+                    stacked=content_stacked,
                 )
+            screen_widgets.extend(widgets)
+            screen_extent.add(widgets)
 
             if next_column_bounds.y != 0:
                 columns.append(next_column_bounds)
 
-        sub_screens = self.create_sub_screen_formatters(screen_widgets)
-
-        screen_bounds.w = max_x(screen_widgets)
-        screen_bounds.h = max_y(screen_widgets)
-        return (
-            self.screen_formatter_cls(
-                bounds=screen_bounds, title=title, children=screen_widgets
-            ),
-            sub_screens,
+        screen_bounds.w = screen_extent.x
+        screen_bounds.h = screen_extent.y
+        return self.screen_formatter_cls(
+            bounds=screen_bounds, title=title, children=screen_widgets
         )
 
     def create_sub_screen_formatters(
@@ -184,6 +344,29 @@ class ScreenFormatterFactory(Generic[T]):
         Returns:
             List of (file name, `ScreenFormatter`) created from `SubScreenFactory`s
 
+        """
+        sub_screen_formatters: list[tuple[str, GroupFormatter[T]]] = []
+        for sub_screen_widget_formatter in self.find_sub_screen_widget_formatters(
+            screen_widgets
+        ):
+            sub_screen_formatters.extend(
+                self.create_sub_screen_formatter(sub_screen_widget_formatter)
+            )
+
+        return sub_screen_formatters
+
+    def find_sub_screen_widget_formatters(
+        self, screen_widgets: list[WidgetFormatter[T]]
+    ) -> list[SubScreenWidgetFormatter[T]]:
+        """Find the `SubScreenWidgetFormatters` that open a screen to be created
+
+        Args:
+            screen_widgets: List of `WidgetFormatters` of a screen
+
+        Returns:
+            `SubScreenWidgetFormatters` at the root of the screen or nested in a Group,
+            excluding references to existing screens
+
         """
         sub_screen_widget_formatters = [
             # At the root
@@ -199,29 +382,48 @@ class ScreenFormatterFactory(Generic[T]):
             if isinstance(group_widget_factory, SubScreenWidgetFormatter)
         ]
 
-        sub_screen_formatters: list[tuple[str, GroupFormatter[T]]] = []
-        for sub_screen_widget_formatter in sub_screen_widget_formatters:
-            if sub_screen_widget_formatter.components is None:
-                # This is a reference to an existing screen - don't create it
-                continue
+        return [
+            sub_screen_widget_formatter
+            for sub_screen_widget_formatter in sub_screen_widget_formatters
+            # Else this is a reference to an existing screen - don't create it
+            if sub_screen_widget_formatter.components is not None
+        ]
 
-            factory: ScreenFormatterFactory[T] = ScreenFormatterFactory(
-                screen_formatter_cls=self.screen_formatter_cls,
-                group_formatter_cls=self.group_formatter_cls,
-                widget_formatter_factory=self.widget_formatter_factory,
-                layout=self.layout,
-                base_file_name=f"{sub_screen_widget_formatter.file_name}",
-            )
-            screen_formatter, _sub_screen_formatters = factory.create_screen_formatter(
-                [sub_screen_widget_formatter.components],
-                sub_screen_widget_formatter.components.name,
-            )
-            sub_screen_formatters.append(
-                (sub_screen_widget_formatter.file_name, screen_formatter)
-            )
-            sub_screen_formatters.extend(_sub_screen_formatters)
+    def create_sub_screen_formatter(
+        self, sub_screen_widget_formatter: SubScreenWidgetFormatter[T]
+    ) -> list[tuple[str, GroupFormatter[T]]]:
+        """Create the `ScreenFormatter` for the screen a `SubScreenWidgetFormatter`
+        opens, followed by those of any sub screens nested in it
 
-        return sub_screen_formatters
+        Args:
+            sub_screen_widget_formatter: Formatter of the button opening the screen
+
+        Returns:
+            List of (file name, `ScreenFormatter`)
+
+        """
+        assert sub_screen_widget_formatter.components is not None
+
+        factory = self.create_sub_screen_factory(sub_screen_widget_formatter.file_name)
+        screen_formatter, sub_screen_formatters = factory.create_screen_formatter(
+            [sub_screen_widget_formatter.components],
+            sub_screen_widget_formatter.components.name,
+        )
+        return [(sub_screen_widget_formatter.file_name, screen_formatter)] + (
+            sub_screen_formatters
+        )
+
+    def create_sub_screen_factory(self, file_name: str) -> ScreenFormatterFactory[T]:
+        """Create the factory for a sub screen of the screen of this factory
+
+        `SignalRef`s can only refer to components on the same screen, so the factory
+        starts without the components of this screen.
+
+        Args:
+            file_name: File name of the sub screen, without its suffix
+
+        """
+        return replace(self, components={}, base_file_name=file_name)
 
     def create_group_formatters(
         self,
@@ -263,38 +465,25 @@ class ScreenFormatterFactory(Generic[T]):
         elif any(_has_plot_widget(child) for child in c.children):
             split_out_plots(c)
 
+        # The children of a group are positioned relative to the group, so lay it out
+        # once and then place it in whichever column it fits
         group_formatter = self.create_group_formatter(
-            c,
-            bounds=Bounds(x=column_bounds.x, y=column_bounds.y, h=screen_bounds.h),
-            squeeze=squeeze,
+            c, bounds=Bounds(h=screen_bounds.h), squeeze=squeeze
         )
+        group_formatter.bounds.w += self.layout.group_width_offset
 
-        if group_formatter.bounds.h + group_formatter.bounds.y <= screen_bounds.h:
+        if group_formatter.bounds.h + column_bounds.y <= screen_bounds.h:
             # Group fits in this column
-            group_formatter.bounds.w += self.layout.group_width_offset
-
-            # Update y for current column
-            column_bounds.y = (
-                group_formatter.bounds.y
-                + group_formatter.bounds.h
-                + self.layout.spacing
-            )
+            target_column_bounds = column_bounds
         else:
-            # Won't fit in first column, recreate in next column
-            group_formatter = self.create_group_formatter(
-                c,
-                bounds=Bounds(
-                    x=next_column_bounds.x, y=next_column_bounds.y, h=screen_bounds.h
-                ),
-                squeeze=squeeze,
-            )
-            group_formatter.bounds.w += self.layout.group_width_offset
+            # Won't fit in first column, place in next column
+            target_column_bounds = next_column_bounds
 
-            next_column_bounds.y = (
-                group_formatter.bounds.y
-                + group_formatter.bounds.h
-                + self.layout.spacing
-            )
+        group_formatter.bounds.x = target_column_bounds.x
+        group_formatter.bounds.y = target_column_bounds.y
+        target_column_bounds.y = (
+            group_formatter.bounds.y + group_formatter.bounds.h + self.layout.spacing
+        )
 
         return [group_formatter]
 
@@ -317,6 +506,7 @@ class ScreenFormatterFactory(Generic[T]):
         )
         column_bounds = Bounds(w=full_w, h=self.layout.widget_height)
         widget_factories: list[WidgetFormatter[T]] = []
+        extent = Extent()
 
         assert isinstance(group.layout, Grid | SubScreen), (
             "Can only do Grid and SubScreen at the moment"
@@ -342,27 +532,27 @@ class ScreenFormatterFactory(Generic[T]):
                     component = c
 
             next_column_bounds = Bounds(
-                x=next_x(widget_factories, self.layout.spacing),
+                x=extent.next_x(self.layout.spacing),
                 w=full_w,
                 h=self.layout.widget_height,
             )
-            widget_factories.extend(
-                self.create_component_widget_formatters(
-                    component,
-                    parent_bounds=bounds,
-                    column_bounds=column_bounds,
-                    next_column_bounds=next_column_bounds,
-                    add_label=add_label,
-                    stacked=isinstance(group.layout, Grid) and group.layout.stacked,
-                    squeeze=squeeze,
-                )
+            widgets = self.create_component_widget_formatters(
+                component,
+                parent_bounds=bounds,
+                column_bounds=column_bounds,
+                next_column_bounds=next_column_bounds,
+                add_label=add_label,
+                stacked=isinstance(group.layout, Grid) and group.layout.stacked,
+                squeeze=squeeze,
             )
+            widget_factories.extend(widgets)
+            extent.add(widgets)
             if next_column_bounds.y != 0:
                 # We have moved onto the next column
                 column_bounds = next_column_bounds
 
-        bounds.h = max_y(widget_factories)
-        bounds.w = max_x(widget_factories)
+        bounds.h = extent.y
+        bounds.w = extent.x
         return self.group_formatter_cls(
             bounds=bounds, title=group.get_label(), children=widget_factories
         )
@@ -416,24 +606,123 @@ class ScreenFormatterFactory(Generic[T]):
             tmp_column_bounds.h = 2 * self.layout.widget_height + self.layout.spacing
             tmp_next_column_bounds.h = tmp_column_bounds.h
 
+        # Decide which column to use before creating any widgets
+        if (
+            self.measure_component_formatters(c, tmp_column_bounds, add_label, stacked)
+            <= parent_bounds.h
+        ):
+            # Current column still fits on screen
+            bounds, target_column_bounds = tmp_column_bounds, column_bounds
+        else:
+            # Widget makes current column too tall. Place in next column.
+            bounds, target_column_bounds = tmp_next_column_bounds, next_column_bounds
+
         widgets = list(
-            self.generate_component_formatters(
-                c, tmp_column_bounds, add_label, stacked, squeeze
-            )
+            self.generate_component_formatters(c, bounds, add_label, stacked, squeeze)
         )
-        if max_y(widgets) <= parent_bounds.h:
-            # Current column still fits on screen
-            column_bounds.y = next_y(widgets, self.layout.spacing)
+        target_column_bounds.y = next_y(widgets, self.layout.spacing)
+
+        return widgets
+
+    def measure_component_formatters(
+        self,
+        c: ComponentUnion,
+        bounds: Bounds,
+        add_label: bool = True,
+        stacked: bool = False,
+    ) -> int:
+        """Measure the height of a component without creating its widgets
+
+        This must mirror the vertical layout of `generate_component_formatters`.
+
+        Args:
+            c: Component object
+            bounds: The size and position of the component widgets (x,y,w,h).
+            add_label: Whether the component has an associated label. Defaults to True.
+
+        Returns:
+            The maximum y of the widgets `generate_component_formatters` would create,
+            or 0 if it would not create any, as `max_y`
+        """
+        y, h = bounds.y, bounds.h
+        bottom = 0
+
+        if isinstance(c, Group) and isinstance(c.layout, Row):
+            if c.layout.header is not None:
+                if c.layout.header:
+                    bottom = y + h
+                y += self.layout.widget_height + self.layout.spacing
+
+            row_components: Sequence[Group | Component] = c.children
+            if stacked and any(
+                isinstance(child, SignalRW) and isinstance(child.read_widget, TextRead)
+                for child in c.children
+            ):
+                h = 2 * self.layout.widget_height + self.layout.spacing
+        elif isinstance(c, SignalW) and isinstance(c.write_widget, ButtonPanel):
+            # Mirror the SignalX per action and SignalR readback without creating them
+            if c.write_widget.actions:
+                bottom = y + h
+            if isinstance(c, SignalRW) and c.read_widget is not None:
+                bottom = max(bottom, y + h * _lines(c.read_widget))
+            row_components = []
         else:
-            # Widget makes current column too tall. Repeat in next column.
-            widgets = list(
-                self.generate_component_formatters(
-                    c, tmp_next_column_bounds, add_label, stacked, squeeze
-                )
+            row_components = [c]
+
+            match c:
+                case (
+                    SignalR(read_widget=TableRead())
+                    | SignalW(write_widget=TableWrite())
+                ):
+                    add_label = False
+                    h *= 10
+                case SignalR(read_widget=ImageRead() | ArrayTrace()):
+                    add_label = False
+                case _:
+                    pass
+
+        if add_label:
+            bottom = max(bottom, y + h)
+
+        if isinstance(c, SignalRef):
+            return max(
+                bottom,
+                self.measure_component_formatters(
+                    self.components[c.name], Bounds(y=y, h=h), add_label
+                ),
             )
-            next_column_bounds.y = next_y(widgets, self.layout.spacing)
 
-        return widgets
+        for rc in row_components:
+            if isinstance(rc, SignalX):
+                bottom = max(bottom, y + h)
+            elif isinstance(rc, SignalRW):
+                if stacked and isinstance(rc.read_widget, TextRead):
+                    row_h = (h - self.layout.spacing) // 2
+                    bottom_y = y + row_h + self.layout.spacing
+                    bottom = max(
+                        bottom,
+                        y + row_h * _lines(rc.write_widget),
+                        bottom_y + row_h * _lines(rc.read_widget),
+                    )
+                elif rc.read_widget:
+                    bottom = max(
+                        bottom,
+                        y + h * _lines(rc.write_widget),
+                        y + h * _lines(rc.read_widget),
+                    )
+                else:
+                    bottom = max(bottom, y + h * _lines(rc.write_widget))
+            elif isinstance(rc, SignalW):
+                bottom = max(bottom, y + h * _lines(rc.write_widget))
+            elif isinstance(rc, SignalR):
+                if rc.read_widget is not None:
+                    bottom = max(bottom, y + h * _lines(rc.read_widget))
+            elif isinstance(rc, Group) and isinstance(rc.layout, SubScreen):
+                bottom = max(bottom, y + h)
+            elif isinstance(rc, DeviceRef):
+                bottom = max(bottom, y + h)
+
+        return bottom
 
     def generate_component_formatters(
         self,
@@ -625,6 +914,36 @@ class ScreenFormatterFactory(Generic[T]):
         )
 
 
+# Sub screens to create in forked worker processes, which inherit it from the parent
+_sub_screen_work: (
+    tuple[
+        ScreenFormatterFactory[Any],
+        list[SubScreenWidgetFormatter[Any]],
+        Path,
+        str,
+        Callable[[GroupFormatter[Any], Path, WriteSummary], None],
+    ]
+    | None
+) = None
+
+
+def _write_sub_screen(index: int) -> tuple[WriteSummary, Timings | None]:
+    assert _sub_screen_work is not None, "Only valid in a forked worker process"
+    factory, sub_screen_widget_formatters, directory, suffix, write = _sub_screen_work
+    with record_worker_timings() as timings:
+        summary = factory.write_sub_screen(
+            sub_screen_widget_formatters[index], directory, suffix, write
+        )
+    return summary, timings
+
+
+def write_text(
+    screen_formatter: GroupFormatter[str], path: Path, summary: WriteSummary
+):
+    """Format a screen of text widgets and write it to `path`"""
+    summary.write(path, "".join(screen_formatter.format()))
+
+
 def is_table(component: Group) -> bool:
     return len(component.children) > 1 and all(
         isinstance(sub_component, Group) and isinstance(sub_component.layout, Row)
@@ -645,6 +964,11 @@ def split_out_plots(component: Group):
     ]
 
 
+def _lines(widget: WidgetUnion) -> int:
+    """The number of rows of `widget_height` that `pv_widget_formatter` allocates"""
+    return widget.get_lines() if isinstance(widget, TextRead | TextWrite) else 1
+
+
 def _has_plot_widget(component: ComponentUnion) -> bool:
     return isinstance(component, SignalR) and isinstance(
         component.read_widget, ImageRead | ArrayTrace
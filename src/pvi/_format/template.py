@@ -3,6 +3,7 @@ from pathlib import Path
 
 from jinja2 import Template
 
+from pvi._timings import stage
 from pvi.device import (
     Device,
     SignalR,
@@ -40,8 +41,10 @@ def format_template(device: Device, pv_prefix: str, output: Path):
             case _:
                 pass
 
-    with output.open("w") as expanded, open(PVI_TEMPLATE) as template:
+    with stage("render"), open(PVI_TEMPLATE) as template:
         template_txt = Template(template.read()).render(
             device=device.label, pv_prefix=pv_prefix, records=records
         )
+
+    with stage("write"), output.open("w") as expanded:
         expanded.write(template_txt + "\n")
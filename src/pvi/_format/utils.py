@@ -1,27 +1,28 @@
 from __future__ import annotations
 
 from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import accumulate
 from pathlib import Path
 from typing import TypeVar
 
-from pydantic import BaseModel
 
-
-class Bounds(BaseModel):
+@dataclass(slots=True)
+class Bounds:
     x: int = 0
     y: int = 0
     w: int = 0
     h: int = 0
 
     def clone(self) -> Bounds:
-        return Bounds(x=self.x, y=self.y, w=self.w, h=self.h)
+        return Bounds(self.x, self.y, self.w, self.h)
 
     def split_left(self, width: int, spacing: int) -> tuple[Bounds, Bounds]:
         """Split horizontally by width of first element"""
         to_split = width + spacing
         assert to_split < self.w, f"Can't split off {to_split} from {self.w}"
-        left = Bounds(x=self.x, y=self.y, w=width, h=self.h)
-        right = Bounds(x=self.x + to_split, y=self.y, w=self.w - to_split, h=self.h)
+        left = Bounds(self.x, self.y, width, self.h)
+        right = Bounds(self.x + to_split, self.y, self.w - to_split, self.h)
         return left, right
 
     def split_by_ratio(
@@ -30,13 +31,14 @@ class Bounds(BaseModel):
         """Split horizontally by ratio of widths, separated by spacing"""
         splits = len(ratio) - 1
         widget_space = self.w - splits * spacing
-        widget_widths = tuple(int(widget_space * r) for r in ratio)
-        widget_xs = tuple(
-            self.x + sum(widget_widths[:i]) + spacing * i for i in range(splits + 1)
+        widget_widths = [int(widget_space * r) for r in ratio]
+        # x of each widget is offset by the widths and spacing of the ones before it
+        widget_xs = accumulate(
+            (w + spacing for w in widget_widths[:-1]), initial=self.x
         )
 
         return tuple(
-            Bounds(x=x, y=self.y, w=w, h=self.h)
+            Bounds(x, self.y, w, self.h)
             for x, w in zip(widget_xs, widget_widths, strict=True)
         )
 
@@ -48,7 +50,7 @@ class Bounds(BaseModel):
         """Split vertically into count equal heights, separated by spacing"""
         widget_h = (self.h - (count - 1) * spacing) // count
         return tuple(
-            Bounds(x=self.x, y=self.y + i * (widget_h + spacing), w=self.w, h=widget_h)
+            Bounds(self.x, self.y + i * (widget_h + spacing), self.w, widget_h)
             for i in range(count)
         )
 
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import hashlib
 from collections.abc import Callable
 from dataclasses import dataclass, field
 from enum import StrEnum
+from pathlib import Path
 from typing import Any, Generic, Self, TypeVar
 
+from pvi._counters import count
 from pvi._format.utils import Bounds
+from pvi._trace import span
 from pvi.device import (
     LED,
     ArrayTrace,
@@ -30,6 +34,18 @@ T = TypeVar("T")
 class UITemplate(Generic[T]):
     screen: T
 
+    @classmethod
+    def from_file(cls, path: Path) -> Self:
+        """Parse a template file
+
+        Prefer `load_template`, which caches the parsed template for the process.
+
+        Args:
+            path: Path of the template file
+
+        """
+        raise NotImplementedError(cls)
+
     def search(self, search: str) -> T:
         """Extract a snippet from the template
 
@@ -76,7 +92,36 @@ class UITemplate(Generic[T]):
         raise NotImplementedError(self)
 
 
-@dataclass
+UITemplateT = TypeVar("UITemplateT", bound=UITemplate[Any])
+
+# Parsed templates, keyed by template class, resolved path and content hash
+_template_cache: dict[tuple[type[UITemplate[Any]], Path, str], UITemplate[Any]] = {}
+
+
+def load_template(template_cls: type[UITemplateT], path: Path) -> UITemplateT:
+    """Load a template file, reusing a previously parsed template if unchanged
+
+    Templates are cached for the lifetime of the process, keyed by the resolved path
+    and a hash of the file content, so an edited template is parsed again.
+
+    Args:
+        template_cls: The `UITemplate` class to parse the file with
+        path: Path of the template file
+
+    Returns:
+        The parsed template
+
+    """
+    path = path.resolve()
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    key = (template_cls, path, digest)
+    if (template := _template_cache.get(key)) is None:
+        template = _template_cache[key] = template_cls.from_file(path)
+
+    return template  # type: ignore
+
+
+@dataclass(slots=True)
 class WidgetFormatter(Generic[T]):
     bounds: Bounds
 
@@ -113,6 +158,7 @@ class WidgetFormatter(Generic[T]):
         """
 
         def format(self: WidgetFormatter[T]) -> list[T]:
+            count("widget")
             properties: dict[str, str] = {}
             if property_map is not None:
                 for placeholder, widget_property in property_map.items():
@@ -130,26 +176,28 @@ class WidgetFormatter(Generic[T]):
                 )
             ]
 
+        count("formatter class")
         return type(  # type: ignore
             f"""{cls.__name__}<{search.strip('"')}>""",
             (cls,),
-            {"format": format},
+            # Keep instances without a __dict__, like the slotted parent class
+            {"__slots__": (), "format": format},
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class LabelWidgetFormatter(WidgetFormatter[T]):
     text: str
     tooltip: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class PVWidgetFormatter(WidgetFormatter[T]):
     pv: str
     widget: WidgetUnion
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionWidgetFormatter(WidgetFormatter[T]):
     label: str
     pv: str
@@ -160,7 +208,7 @@ class ActionWidgetFormatter(WidgetFormatter[T]):
         return f"{self.pv} = {self.value}\n$(pv_value)"
 
 
-@dataclass
+@dataclass(slots=True)
 class SubScreenWidgetFormatter(WidgetFormatter[T]):
     label: str
     file_name: str
@@ -173,7 +221,7 @@ class GroupType(StrEnum):
     SCREEN = "SCREEN"
 
 
-@dataclass
+@dataclass(slots=True)
 class GroupFormatter(WidgetFormatter[T]):
     bounds: Bounds
     title: str
@@ -217,38 +265,42 @@ class GroupFormatter(WidgetFormatter[T]):
         """
 
         def format(self: GroupFormatter[T]) -> list[T]:
-            padding = sized(self.bounds)
-            texts: list[T] = []
-            made_widgets: list[T] = []
-
-            if search == GroupType.SCREEN:
-                properties: dict[str, str] = {}
-                if property_map is not None:
-                    for placeholder, widget_property in property_map.items():
-                        assert hasattr(self, widget_property), (
-                            f"{self} has no property {widget_property}"
+            count("group")
+            with span("GroupFormatter.format", title=self.title):
+                padding = sized(self.bounds)
+                texts: list[T] = []
+                made_widgets: list[T] = []
+
+                if search == GroupType.SCREEN:
+                    properties: dict[str, str] = {}
+                    if property_map is not None:
+                        for placeholder, widget_property in property_map.items():
+                            assert hasattr(self, widget_property), (
+                                f"{self} has no property {widget_property}"
+                            )
+                            properties[placeholder] = getattr(self, widget_property)
+
+                    texts.append(
+                        template.set(
+                            template.screen, self.bounds, properties=properties
                         )
-                        properties[placeholder] = getattr(self, widget_property)
-
-                texts.append(
-                    template.set(template.screen, self.bounds, properties=properties)
-                )
-                # Make screen title
-                if widget_formatter_hook:
-                    for widget in widget_formatter_hook(self.bounds, self.title):
-                        texts += widget.format()
-                for c in self.children:
-                    c.bounds.x += padding.x
-                    c.bounds.y += padding.y
-                    texts += c.format()
-
-            if search == GroupType.GROUP:
-                # Make group object
-                if widget_formatter_hook:
-                    for widget in widget_formatter_hook(self.bounds, self.title):
-                        made_widgets += widget.format()
-                texts += template.create_group(made_widgets, self.children, padding)
-            return texts
+                    )
+                    # Make screen title
+                    if widget_formatter_hook:
+                        for widget in widget_formatter_hook(self.bounds, self.title):
+                            texts += widget.format()
+                    for c in self.children:
+                        c.bounds.x += padding.x
+                        c.bounds.y += padding.y
+                        texts += c.format()
+
+                if search == GroupType.GROUP:
+                    # Make group object
+                    if widget_formatter_hook:
+                        for widget in widget_formatter_hook(self.bounds, self.title):
+                            made_widgets += widget.format()
+                    texts += template.create_group(made_widgets, self.children, padding)
+                return texts
 
         def resize(self: GroupFormatter[T]):
             """Resize based on widget template.
@@ -262,10 +314,11 @@ class GroupFormatter(WidgetFormatter[T]):
             )
             pass
 
+        count("formatter class")
         return type(  # type: ignore
             f"{cls.__name__}<{search}>",
             (cls,),
-            {"format": format, "resize": resize},
+            {"__slots__": (), "format": format, "resize": resize},
         )
 
 
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import secrets
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pvi._counters import count
+from pvi._timings import stage
+
+
+def _create_temporary_file(path: Path) -> tuple[int, Path]:
+    """Create a new file to write the content of `path` to, next to `path`
+
+    The file is created with permissions 0o666 and the kernel removes those in the
+    umask, unlike `tempfile.mkstemp`, which creates files only the user can read.
+
+    Returns:
+        A file descriptor open for writing and the path of the file
+
+    """
+    while True:
+        tmp = path.parent / f".{path.name}.{secrets.token_hex(4)}"
+        try:
+            return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp
+        except FileExistsError:
+            continue
+
+
+def write_if_changed(path: Path, content: str | bytes) -> bool:
+    """Atomically write `content` to `path`, unless it already has that content.
+
+    The content is written to a temporary file in the same directory, which is then
+    renamed over `path`, so readers never see a partially written file. An existing
+    file keeps its permissions, else the permissions respect the umask.
+
+    Args:
+        path: Path of the file to write
+        content: Content to write, encoded as UTF-8 if given as `str`
+
+    Returns:
+        `False` if `path` already had the content and was left untouched
+
+    """
+    if isinstance(content, str):
+        content = content.encode()
+
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        mode = None
+    else:
+        if stat.st_size == len(content) and path.read_bytes() == content:
+            return False
+        mode = stat.st_mode & 0o7777
+
+    fd, tmp = _create_temporary_file(path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return True
+
+
+@dataclass
+class WriteSummary:
+    """The files written by a `Formatter` and those left unchanged."""
+
+    written: list[Path] = field(default_factory=list[Path])
+    unchanged: list[Path] = field(default_factory=list[Path])
+
+    @property
+    def paths(self) -> list[Path]:
+        """All files produced, whether written or unchanged"""
+        return self.written + self.unchanged
+
+    def extend(self, other: WriteSummary) -> None:
+        """Add the files recorded in another summary to this one"""
+        self.written += other.written
+        self.unchanged += other.unchanged
+
+    def write(self, path: Path, content: str | bytes) -> None:
+        """Write a file with `write_if_changed` and record the outcome.
+
+        Args:
+            path: Path of the file to write
+            content: Content to write
+
+        """
+        with stage("write"):
+            written = write_if_changed(path, content)
+
+        if written:
+            count("file written")
+            self.written.append(path)
+        else:
+            count("file unchanged")
+            self.unchanged.append(path)
+
+    def __str__(self) -> str:
+        return f"{len(self.written)} written, {len(self.unchanged)} unchanged"
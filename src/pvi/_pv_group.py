@@ -1,6 +1,10 @@
 import re
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Container, Iterable, Iterator
 from pathlib import Path
 
+from pvi._ui_readers import UI_PV_READERS, WidgetPV
 from pvi.device import (
     ComponentUnion,
     Device,
@@ -12,49 +16,138 @@ from pvi.device import (
     walk,
 )
 
+# A y-coordinate in a UI file, with digits in a match group named `y`. The digits may
+# be missing, as any `y=` is a candidate for the coordinate of a following PV.
+Y_COORDINATE = re.compile(r"y=(?P<y>\d*)")
 
-def find_pvs(pvs: list[str], file_path: Path) -> tuple[list[str], list[str]]:
-    """Search for the PVs in the file and return lists of found and not found pvs"""
 
+class PatternScanner:
+    """Aho-Corasick automaton to find every occurrence of many patterns in a text in a
+    single pass, including occurrences that overlap.
+
+    Args:
+        patterns: Strings to search for
+
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        # State 0 is the root. Each state has transitions by character, a fallback
+        # state for the longest proper suffix that is also a prefix of a pattern and
+        # the patterns that end at that state
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple[str, ...]] = [()]
+
+        for pattern in dict.fromkeys(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (pattern,)
+
+        # Breadth first so that fallbacks, which are shallower, are complete first
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, str]]:
+        """Yield the start index and pattern of every occurrence in `text`"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern in output[state]:
+                yield index - len(pattern) + 1, pattern
+
+
+def _find_pv_coordinates_in_widgets(
+    scanner: PatternScanner, widget_pvs: Iterable[WidgetPV], pvs: Container[str]
+) -> dict[str, int]:
+    # Each PV takes the y-coordinate of the last widget with a PV that contains it
+    coordinates: dict[str, int] = {}
+    for widget_pv in widget_pvs:
+        for _, pv in scanner.iter_matches(widget_pv.pv):
+            if pv in pvs:
+                coordinates[pv] = widget_pv.y
+
+    return coordinates
+
+
+def _find_pv_coordinates_in_text(
+    scanner: PatternScanner, file_path: Path, pvs: Container[str]
+) -> dict[str, int]:
+    # Each PV takes the nearest `y=` before its last occurrence anywhere in the file
     with open(file_path) as f:
         file_content = f.read()
 
-    pv_coordinates: dict[int, list[str]] = {}
-    remaining_pvs = list(pvs)
-    for pv in pvs:
-        if pv not in file_content:
-            continue
-
-        # This regex searches for the first y coordinate before the given PV
-        # https://regex101.com/r/41yX56/1
-        widget_regex = re.compile(
-            "".join(
-                (
-                    # The y-coordinate in a match group named `y`
-                    r"y=(?P<y>\d+)",
-                    # Negative lookahead asserting no further y-coordinate before PV
-                    r"(?!.*y=.*" + pv + r")",
-                    # Any characters and then PV
-                    r".*" + pv,
-                )
-            ),
-            re.MULTILINE | re.DOTALL,
+    # Single pass over the file for all PVs, keeping the last occurrence of each
+    last_occurrence: dict[str, int] = {}
+    for start, pv in scanner.iter_matches(file_content):
+        if pv in pvs:
+            last_occurrence[pv] = start
+
+    # Offset index of y-coordinates to find the nearest one preceding a PV
+    y_matches = list(Y_COORDINATE.finditer(file_content))
+    y_offsets = [match.start() for match in y_matches]
+
+    coordinates: dict[str, int] = {}
+    for pv, start in last_occurrence.items():
+        index = bisect_left(y_offsets, start) - 1
+        assert index >= 0 and y_matches[index]["y"], (
+            f"{pv} found in {file_path.name} but did not match a y coordinate"
         )
-        match = re.search(widget_regex, file_content)
+        coordinates[pv] = int(y_matches[index]["y"])
+
+    return coordinates
 
-        assert match, f"{pv} found in {file_path.name} but did not match a y coordinate"
 
-        y = int(match["y"])
-        if y in pv_coordinates:
-            pv_coordinates[y].append(pv)
-        else:
-            pv_coordinates[y] = [pv]
+def _find_pv_coordinates(
+    scanner: PatternScanner, file_path: Path, pvs: Container[str]
+) -> dict[str, int]:
+    # Coordinates of the PVs found in the file, ignoring other patterns of the scanner
+    reader = UI_PV_READERS.get(file_path.suffix)
+    if reader is None:
+        return _find_pv_coordinates_in_text(scanner, file_path, pvs)
+    else:
+        return _find_pv_coordinates_in_widgets(scanner, reader(file_path), pvs)
 
-        remaining_pvs.remove(pv)
 
-    grouped_pvs: list[str] = []
-    for coord in sorted(pv_coordinates.keys()):
-        grouped_pvs.extend(pv_coordinates[coord])
+def _order_by_coordinate(
+    pv_coordinates: dict[str, int], order: dict[str, int]
+) -> list[str]:
+    # Order by y-coordinate, keeping the order of the PVs at the same coordinate
+    return sorted(pv_coordinates, key=lambda pv: (pv_coordinates[pv], order[pv]))
+
+
+def find_pvs(pvs: list[str], file_path: Path) -> tuple[list[str], list[str]]:
+    """Search for the PVs in the file and return lists of found and not found pvs
+
+    Found PVs are ordered by the y-coordinate of the widget they were last found in.
+    .bob, .edl and .adl files are streamed by a reader for the format that finds the
+    PVs of each widget. Other files are searched as text, taking the nearest `y=`
+    before the PV as the coordinate of its widget.
+    """
+    order = {pv: index for index, pv in enumerate(dict.fromkeys(pvs))}
+    pv_coordinates = _find_pv_coordinates(PatternScanner(pvs), file_path, order)
+
+    grouped_pvs = _order_by_coordinate(pv_coordinates, order)
+    remaining_pvs = [pv for pv in pvs if pv not in pv_coordinates]
 
     return grouped_pvs, remaining_pvs
 
@@ -79,15 +172,27 @@ def group_by_ui(device: Device, ui_paths: list[Path]) -> Tree:
     # PVs without macros to search for in UI
     pv_names = [s.name for s in signals]
 
+    # Search every file with one scanner for all PVs, only keeping those not found in
+    # an earlier file, so each file takes time proportional to the PVs found in it
+    # rather than to all PVs still to be found
+    scanner = PatternScanner(pv_names)
+    order = {pv: index for index, pv in enumerate(dict.fromkeys(pv_names))}
+    remaining = set(pv_names)
     group_pv_map: dict[str, list[str]] = {}
     for ui in ui_paths:
-        ui_pvs, pv_names = find_pvs(pv_names, ui)
-        if ui_pvs:
-            group_pv_map[ui.stem] = ui_pvs
+        pv_coordinates = _find_pv_coordinates(scanner, ui, remaining)
+        if pv_coordinates:
+            group_pv_map[ui.stem] = _order_by_coordinate(pv_coordinates, order)
+            remaining.difference_update(pv_coordinates)
+    pv_names = [pv for pv in pv_names if pv in remaining]
 
     if pv_names:
         print(f"Did not find group for {' | '.join(pv_names)}")
 
+    signals_by_name: dict[str, list[ComponentUnion]] = {}
+    for signal in signals:
+        signals_by_name.setdefault(signal.name, []).append(signal)
+
     # Create groups for parameters we found in the files
     ui_groups: list[Group] = [
         Group(
@@ -96,8 +201,7 @@ def group_by_ui(device: Device, ui_paths: list[Path]) -> Tree:
             children=[  # Note: Need to preserve order in group_pvs here
                 signal
                 for pv_name in group_pvs
-                for signal in signals
-                if signal.name == pv_name
+                for signal in signals_by_name.get(pv_name, [])
             ],
             label=group_name if enforce_pascal_case(group_name) != group_name else None,
         )
@@ -105,8 +209,10 @@ def group_by_ui(device: Device, ui_paths: list[Path]) -> Tree:
     ]
 
     # Separate any parameters we failed to find a group for
-    grouped_pvs = [pv_name for group in ui_groups for pv_name in group.children]
-    ungrouped_pvs = [pv_name for pv_name in signals if pv_name not in grouped_pvs]
+    grouped_names = {
+        pv_name for group_pvs in group_pv_map.values() for pv_name in group_pvs
+    }
+    ungrouped_pvs = [signal for signal in signals if signal.name not in grouped_names]
 
     # Add any ungrouped parameters on the end
     if ungrouped_pvs:
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from pvi._trace import span
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss() -> int:
+    """The peak resident set size of this process in bytes, or 0 if unknown"""
+    if resource is None:
+        return 0
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@dataclass
+class StageTiming:
+    """Time and memory spent in one stage
+
+    Args:
+        seconds: Wall time spent in the stage, excluding stages nested in it
+        peak_rss_bytes: Peak resident set size of the process when the stage last
+            exited
+        rss_growth_bytes: Growth of the peak resident set size while in the stage,
+            excluding stages nested in it
+        calls: Number of times the stage was entered
+
+    """
+
+    seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    rss_growth_bytes: int = 0
+    calls: int = 0
+
+
+@dataclass
+class _RunningStage:
+    name: str
+    screen: str | None
+    start: float
+    nested: float = 0.0
+
+
+@dataclass
+class Timings:
+    """Wall time and peak memory of each stage of a command, in the order that each
+    stage was first entered, and of the stages of each screen that was formatted"""
+
+    stages: dict[str, StageTiming] = field(default_factory=dict[str, StageTiming])
+    screens: dict[str, dict[str, StageTiming]] = field(
+        default_factory=dict[str, dict[str, StageTiming]]
+    )
+    _running: list[_RunningStage] = field(default_factory=list[_RunningStage])
+    _screen: str | None = None
+    _peak_rss: int = field(default_factory=peak_rss)
+
+    def _record_rss(self) -> None:
+        # Attribute growth of the peak since the last stage was entered or exited to
+        # the innermost running stage
+        rss = peak_rss()
+        if self._running:
+            running = self._running[-1]
+            for timing in self._timings(running.name, running.screen):
+                timing.rss_growth_bytes += rss - self._peak_rss
+                timing.peak_rss_bytes = rss
+        self._peak_rss = rss
+
+    def _timings(self, name: str, screen: str | None) -> list[StageTiming]:
+        timings = [self.stages.setdefault(name, StageTiming())]
+        if screen is not None:
+            timings.append(
+                self.screens.setdefault(screen, {}).setdefault(name, StageTiming())
+            )
+        return timings
+
+    @contextmanager
+    def stage(self, name: str) -> Generator[None]:
+        """Record the time and memory spent in a stage.
+
+        Time spent in a stage nested in a different stage only counts towards the
+        inner stage, and a stage nested in itself is only recorded once.
+
+        Args:
+            name: Name of the stage
+
+        """
+        if any(running.name == name for running in self._running):
+            yield
+            return
+
+        self._record_rss()
+        self._running.append(_RunningStage(name, self._screen, time.perf_counter()))
+        try:
+            yield
+        finally:
+            self._record_rss()
+            running = self._running.pop()
+            elapsed = time.perf_counter() - running.start
+            for timing in self._timings(name, running.screen):
+                timing.seconds += elapsed - running.nested
+                timing.calls += 1
+            if self._running:
+                self._running[-1].nested += elapsed
+
+    @contextmanager
+    def for_screen(self, name: str) -> Generator[None]:
+        """Also record the stages entered in this context for the named screen
+
+        Args:
+            name: File name of the screen, without its suffix
+
+        """
+        screen, self._screen = self._screen, name
+        try:
+            yield
+        finally:
+            self._screen = screen
+
+    def merge(self, other: Timings) -> None:
+        """Add the stages and screens recorded in another process to these.
+
+        Time and growth in memory are summed, so with stages run in parallel worker
+        processes the time can be more than the wall time. The peak memory is the
+        largest of either process.
+
+        Args:
+            other: Timings of a worker process
+
+        """
+        for name, timing in other.stages.items():
+            _add_timing(self.stages.setdefault(name, StageTiming()), timing)
+        for screen, stages in other.screens.items():
+            screen_stages = self.screens.setdefault(screen, {})
+            for name, timing in stages.items():
+                _add_timing(screen_stages.setdefault(name, StageTiming()), timing)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the stages and screens for `json.dumps`"""
+        return {
+            "stages": {name: asdict(timing) for name, timing in self.stages.items()},
+            "screens": {
+                screen: {name: asdict(timing) for name, timing in stages.items()}
+                for screen, stages in self.screens.items()
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2) + "\n"
+
+    def __str__(self) -> str:
+        lines = [f"{'stage':<20} {'calls':>7} {'s':>9} {'peak MiB':>9} {'+MiB':>7}"]
+        lines += [
+            f"{name:<20} {timing.calls:>7} {timing.seconds:>9.3f} "
+            f"{timing.peak_rss_bytes / 2**20:>9.1f} "
+            f"{timing.rss_growth_bytes / 2**20:>7.1f}"
+            for name, timing in self.stages.items()
+        ]
+        total = sum(timing.seconds for timing in self.stages.values())
+        lines.append(f"{'total':<20} {'':>7} {total:>9.3f}")
+
+        if self.screens:
+            lines.append("")
+            lines.append(f"{'screen':<40} {'s':>9} {'+MiB':>7}")
+            for screen, stages in self.screens.items():
+                seconds = sum(timing.seconds for timing in stages.values())
+                growth = sum(timing.rss_growth_bytes for timing in stages.values())
+                lines.append(f"{screen:<40} {seconds:>9.3f} {growth / 2**20:>7.1f}")
+
+        return "\n".join(lines)
+
+
+def _add_timing(timing: StageTiming, other: StageTiming) -> None:
+    timing.seconds += other.seconds
+    timing.peak_rss_bytes = max(timing.peak_rss_bytes, other.peak_rss_bytes)
+    timing.rss_growth_bytes += other.rss_growth_bytes
+    timing.calls += other.calls
+
+
+# Timings being recorded by `record_timings`, or None if disabled
+_timings: Timings | None = None
+
+
+@contextmanager
+def record_timings() -> Generator[Timings]:
+    """Record the time and memory spent in each stage while in this context.
+
+    Memory is measured as the peak resident set size of the process, which only ever
+    grows, so the stages that raise the peak are those that need the most memory.
+
+    """
+    global _timings
+    previous = _timings
+    _timings = Timings()
+    try:
+        yield _timings
+    finally:
+        _timings = previous
+
+
+@contextmanager
+def record_worker_timings() -> Generator[Timings | None]:
+    """Record the stages of a forked worker process in new `Timings`, if the parent
+    process is recording timings, to return them to be merged with `merge_timings`.
+
+    The worker inherits a copy of the timings of the parent, so without this they
+    would be recorded in the copy and lost when the worker exits.
+
+    """
+    if _timings is None:
+        yield None
+    else:
+        with record_timings() as timings:
+            yield timings
+
+
+def merge_timings(timings: Timings | None) -> None:
+    """Merge the timings of a worker process into those being recorded, if any
+
+    Args:
+        timings: Timings returned from `record_worker_timings` in a worker process
+
+    """
+    if _timings is not None and timings is not None:
+        _timings.merge(timings)
+
+
+@contextmanager
+def stage(name: str) -> Generator[None]:
+    """Record the time and memory spent in a stage, if timings are being recorded, and
+    trace it as a span, if tracing is enabled
+
+    Args:
+        name: Name of the stage, e.g. `yaml load`
+
+    """
+    if _timings is None:
+        with span(name):
+            yield
+    else:
+        with span(name), _timings.stage(name):
+            yield
+
+
+@contextmanager
+def for_screen(name: str) -> Generator[None]:
+    """Also record stages entered in this context for a screen, if timings are being
+    recorded
+
+    Args:
+        name: File name of the screen, without its suffix
+
+    """
+    if _timings is None:
+        yield
+    else:
+        with _timings.for_screen(name):
+            yield
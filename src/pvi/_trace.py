@@ -0,0 +1,134 @@
+"""Spans of time spent in pvi, written as Chrome trace events for chrome://tracing or
+https://ui.perfetto.dev when tracing is enabled.
+
+Tracing is enabled by setting `PVI_TRACE` to the path of a trace file, or by calling
+`enable_trace`. Events are appended to the file as each span ends, in the JSON array
+format without the optional closing bracket, so every process tracing to the same
+file, e.g. the workers of a parallel build or the pvi commands of a make -j build,
+appears on one timeline.
+
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+TRACE_ENV = "PVI_TRACE"
+
+# File descriptor of the trace file, or None if tracing is disabled
+_trace_fd: int | None = None
+# Process that the name of the process was last written for, to write it again in
+# forked worker processes
+_named_pid: int | None = None
+
+_NO_SPAN = nullcontext()
+
+
+def _write(events: list[dict[str, Any]]) -> None:
+    assert _trace_fd is not None
+    # A single write to a file opened to append is not interleaved with the writes of
+    # other processes
+    os.write(_trace_fd, "".join(json.dumps(e) + ",\n" for e in events).encode())
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict[str, Any]):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        end = time.perf_counter()
+        if _trace_fd is None:
+            return
+
+        global _named_pid
+        pid = os.getpid()
+        events: list[dict[str, Any]] = []
+        if _named_pid != pid:
+            _named_pid = pid
+            events.append(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "args": {"name": " ".join(["pvi", *sys.argv[1:2]])},
+                }
+            )
+        events.append(
+            {
+                "name": self.name,
+                "cat": "pvi",
+                "ph": "X",
+                # perf_counter is a monotonic clock shared by all processes
+                "ts": self.start * 1e6,
+                "dur": (end - self.start) * 1e6,
+                "pid": pid,
+                "tid": threading.get_native_id(),
+                "args": self.args,
+            }
+        )
+        _write(events)
+
+
+def enable_trace(path: Path | None) -> None:
+    """Append the spans that end from now on to a trace file, or stop tracing.
+
+    Args:
+        path: Path of the trace file, created if it does not exist, or `None` to
+            disable tracing
+
+    """
+    global _trace_fd, _named_pid
+    if _trace_fd is not None:
+        os.close(_trace_fd)
+        _trace_fd = _named_pid = None
+
+    if path is None:
+        return
+
+    try:
+        # Only the process that creates the file starts the array
+        _trace_fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL)
+        os.write(_trace_fd, b"[\n")
+    except FileExistsError:
+        _trace_fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+
+
+def span(name: str, /, **args: Any) -> AbstractContextManager[None]:
+    """Record the time spent in this context as a span, if tracing is enabled.
+
+    If tracing is disabled this returns a shared no-op context, so spans can be placed
+    on hot paths.
+
+    Args:
+        name: Name of the span, e.g. the function it times
+        args: Details to show with the span, e.g. the file being processed
+
+    """
+    if _trace_fd is None:
+        return _NO_SPAN
+
+    return _Span(name, args)
+
+
+if trace_path := os.environ.get(TRACE_ENV):
+    enable_trace(Path(trace_path))
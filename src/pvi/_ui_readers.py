@@ -0,0 +1,155 @@
+import re
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import NamedTuple
+
+from lxml.etree import (
+    _Element,  # pyright: ignore [reportPrivateUsage]
+    iterparse,
+)
+
+
+class WidgetPV(NamedTuple):
+    """A PV of a widget in a UI file and the position of the widget"""
+
+    pv: str
+    x: int
+    y: int
+
+
+@dataclass
+class _Widget:
+    # A widget that has been opened but not closed while reading a UI file
+    x: int = 0
+    y: int = 0
+    pvs: list[str] = field(default_factory=list[str])
+    element: _Element | None = None
+
+
+# Elements of a bob widget, or of one of its properties, that contain a PV
+BOB_PV_TAGS = {"pv_name", "x_pv", "y_pv"}
+
+
+def read_bob_pvs(path: Path) -> Iterator[WidgetPV]:
+    """Stream the PVs of the widgets in a Phoebus .bob file.
+
+    Elements are freed once read, so memory does not grow with the size of the file.
+    Positions of widgets in groups are made absolute.
+
+    Args:
+        path: Path of the .bob file
+
+    """
+    widgets: list[_Widget] = []
+    for event, element in iterparse(
+        str(path), events=("start", "end"), tag=["widget", "x", "y", *BOB_PV_TAGS]
+    ):
+        if event == "start":
+            if element.tag == "widget":
+                widgets.append(_Widget(element=element))
+            continue
+
+        if element.tag == "widget":
+            widget = widgets.pop()
+            x = widget.x + sum(parent.x for parent in widgets)
+            y = widget.y + sum(parent.y for parent in widgets)
+            for pv in widget.pvs:
+                yield WidgetPV(pv, x, y)
+
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]  # pyright: ignore [reportOptionalSubscript]
+        elif not widgets or not element.text:
+            continue
+        elif element.tag in BOB_PV_TAGS:
+            widgets[-1].pvs.append(element.text)
+        elif element.getparent() is widgets[-1].element:
+            if element.tag == "x":
+                widgets[-1].x = int(element.text)
+            elif element.tag == "y":
+                widgets[-1].y = int(element.text)
+
+
+# A property of an edl object, e.g. `controlPv "$(P)$(R)Gain"` or `yPv {`
+EDL_PROPERTY = re.compile(r"(?P<key>\w+)\s+(?P<value>.*)")
+# A quoted value in a `{` ... `}` block of an edl property, e.g. `0 "$(P)$(R)Trace"`
+EDL_BLOCK_VALUE = re.compile(r'\d+\s+"(?P<value>.*)"')
+
+
+def read_edl_pvs(path: Path) -> Iterator[WidgetPV]:
+    """Stream the PVs of the objects in an EDM .edl file.
+
+    Every `...Pv` property of an object is a PV of that object.
+
+    Args:
+        path: Path of the .edl file
+
+    """
+    objects: list[_Widget] = []
+    # Whether lines are in a block of values and if it is a block of PVs
+    in_block = pv_block = False
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if in_block:
+                if line == "}":
+                    in_block = False
+                elif pv_block and (match := EDL_BLOCK_VALUE.fullmatch(line)):
+                    objects[-1].pvs.append(match["value"])
+            elif line == "beginObjectProperties":
+                objects.append(_Widget())
+            elif not objects:
+                continue
+            elif line == "endObjectProperties":
+                obj = objects.pop()
+                for pv in obj.pvs:
+                    if pv:
+                        yield WidgetPV(pv, obj.x, obj.y)
+            elif match := EDL_PROPERTY.fullmatch(line):
+                key, value = match["key"], match["value"]
+                if value == "{":
+                    in_block, pv_block = True, key.endswith("Pv")
+                elif key == "x":
+                    objects[-1].x = int(value)
+                elif key == "y":
+                    objects[-1].y = int(value)
+                elif key.endswith("Pv") and value.startswith('"'):
+                    objects[-1].pvs.append(value.strip('"'))
+
+
+# A coordinate of an adl object, e.g. `y=30`
+ADL_COORDINATE = re.compile(r"(?P<axis>[xy])=(?P<value>-?\d+)")
+# An attribute of an adl widget that contains a PV, e.g. `chan="$(P)$(R)Gain"`
+ADL_PV = re.compile(r'(?:chan[A-D]?|rdbk|ctrl|[xy]data|trigger|erase)="(?P<pv>.*)"')
+
+
+def read_adl_pvs(path: Path) -> Iterator[WidgetPV]:
+    """Stream the PVs of the widgets in a MEDM .adl file.
+
+    The `object` block with the position of a widget comes before its PVs, so each PV
+    takes the last position read.
+
+    Args:
+        path: Path of the .adl file
+
+    """
+    x = y = 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if match := ADL_COORDINATE.fullmatch(line):
+                if match["axis"] == "x":
+                    x = int(match["value"])
+                else:
+                    y = int(match["value"])
+            elif (match := ADL_PV.fullmatch(line)) and match["pv"]:
+                yield WidgetPV(match["pv"], x, y)
+
+
+# Readers of UI files by suffix
+UI_PV_READERS: dict[str, Callable[[Path], Iterator[WidgetPV]]] = {
+    ".bob": read_bob_pvs,
+    ".edl": read_edl_pvs,
+    ".adl": read_adl_pvs,
+}
@@ -1,9 +1,12 @@
+import json
 import re
 from pathlib import Path
-from typing import Any, TypeVar, overload
+from typing import Any, TypeVar, cast, overload
 
 from ruamel.yaml import YAML
 
+from pvi._timings import stage
+
 T = TypeVar("T")
 Leaf = dict[str, Any] | list[Any]
 Branch = dict[str, "Branch | Any"] | list["Branch | Any"]
@@ -67,6 +70,11 @@ def dump_yaml(serialized: dict[str, Any], path: Path) -> None:
     yaml.dump(serialized, path, transform=add_line_before_type)  # type: ignore
 
 
+def is_json(path: Path) -> bool:
+    """Whether the file is the JSON rather than YAML form of a pvi file"""
+    return path.suffix == ".json"
+
+
 def load_yaml(path: Path) -> dict[str, Any]:
     """Load yaml from file."""
     return YAML(typ="safe").load(path)  # type: ignore
@@ -77,10 +85,23 @@ class YamlValidatorMixin:
 
     Inheriting this mixin registers that the child class can be serialized to a custom
     pvi.{cls}.yaml - where cls is the class name in lower case - and provides a utility
-    to validate that a given YAML file matches the class or its child classes.
+    to validate that a given YAML file matches the class or its child classes. The
+    equivalent pvi.{cls}.json is also accepted, for files that are generated rather
+    than written by hand.
 
     """
 
+    @classmethod
+    def import_subclass(cls, name: str) -> None:
+        """Import the module of the child class with the given name, if it is known.
+
+        By default child classes must have been imported before they are validated.
+
+        Args:
+            name: Name of the child class
+
+        """
+
     @classmethod
     def validate_yaml(cls: type, yaml: Path) -> dict[str, Any]:
         """Validate the YAML file and load into a serialized dictionary of an instance.
@@ -104,14 +125,23 @@ class YamlValidatorMixin:
             cls = cls.__mro__[1]
 
         # Check the file extension matches the given cls
-        suffix = f".pvi.{cls.__name__.lower()}.yaml"
-        if not yaml.name.endswith(suffix):
-            raise ValueError(f"Expected '{yaml.name}' to end with '{suffix}'")
-
-        serialized: dict[str, Any] = load_yaml(yaml)
+        suffixes = (
+            f".pvi.{cls.__name__.lower()}.yaml",
+            f".pvi.{cls.__name__.lower()}.json",
+        )
+        if not yaml.name.endswith(suffixes):
+            raise ValueError(
+                f"Expected '{yaml.name}' to end with '{suffixes[0]}' or '{suffixes[1]}'"
+            )
+
+        with stage("yaml load"):
+            serialized: dict[str, Any] = (
+                json.loads(yaml.read_bytes()) if is_json(yaml) else load_yaml(yaml)
+            )
 
         cls_type: str = serialized.get("type", cls.__name__)
         if cls_type != cls.__name__:
+            cast(type[YamlValidatorMixin], cls).import_subclass(cls_type)
             try:
                 cls = [c for c in cls.__subclasses__() if c.__name__ == cls_type][0]
             except IndexError:
@@ -11,11 +11,14 @@ from pydantic import (
     BaseModel,
     ConfigDict,
     Field,
+    PrivateAttr,
     ValidationError,
     model_validator,
 )
 
-from pvi._yaml_utils import YamlValidatorMixin, dump_yaml, type_first
+from pvi._timings import stage
+from pvi._trace import span
+from pvi._yaml_utils import YamlValidatorMixin, dump_yaml, is_json, type_first
 from pvi.typed_model import TypedModel, as_tagged_union
 from pvi.utils import find_pvi_yaml
 
@@ -344,6 +347,10 @@ class Component(Named):
     def __eq__(self, other: object) -> bool:
         return isinstance(other, Component) and self.name == other.name
 
+    def __hash__(self) -> int:
+        # Consistent with __eq__, so components can be used in sets and dict keys
+        return hash(self.name)
+
 
 class Signal(Component, AccessModeMixin):
     """Base signal type representing one or two PVs of a `Device`."""
@@ -533,6 +540,18 @@ class Device(TypedModel, YamlValidatorMixin):
     ] = None
     children: Annotated[Tree, Field(description="Child Components")] = []
 
+    # Device YAML files of `Include`s resolved by `deserialize_parents`, by file name
+    _include_paths: dict[str, Path] = PrivateAttr(default_factory=dict[str, Path])
+
+    @property
+    def include_paths(self) -> dict[str, Path]:
+        """Paths of the Device YAML files resolved for `Include` statements"""
+        return dict(self._include_paths)
+
+    @include_paths.setter
+    def include_paths(self, include_paths: dict[str, Path]):
+        self._include_paths = dict(include_paths)
+
     def _to_dict(self) -> dict[str, Any]:
         """Serialize a `Device` instance to a `dict`.
 
@@ -549,29 +568,39 @@ class Device(TypedModel, YamlValidatorMixin):
         return d
 
     def serialize(self, yaml: Path):
-        """Serialize a `Device` instance to YAML.
+        """Serialize a `Device` instance to YAML, or compact JSON for a `.json` path.
 
         Args:
-            yaml: Path of YAML file
+            yaml: Path of YAML or JSON file
 
         """
-        d = self._to_dict()
-        dump_yaml(d, yaml)
+        with stage("write"):
+            if is_json(yaml):
+                yaml.write_text(
+                    self.model_dump_json(exclude_none=True, exclude={"type"})
+                )
+            else:
+                d = self._to_dict()
+                dump_yaml(d, yaml)
 
     @classmethod
     def deserialize(cls, yaml: Path) -> Device:
-        """Instantiate a Device instance from YAML.
+        """Instantiate a Device instance from YAML or JSON.
+
+        JSON is much faster to load than YAML for large generated devices.
 
         Args:
-            serialized: Dictionary of class instance
+            yaml: Path of YAML or JSON file
 
         """
-        serialized = cls.validate_yaml(yaml)
-        try:
-            return cls(**serialized)
-        except ValidationError:
-            print(f"\nFailed to validate `{yaml}` as Device:\n")
-            raise
+        with span("Device.deserialize", path=str(yaml)):
+            serialized = cls.validate_yaml(yaml)
+            try:
+                with stage("validation"):
+                    return cls(**serialized)
+            except ValidationError:
+                print(f"\nFailed to validate `{yaml}` as Device:\n")
+                raise
 
     def deserialize_parents(self, yaml_paths: list[Path]):
         """Populate Device with Components from Device yaml of parent classes.
@@ -588,12 +617,13 @@ class Device(TypedModel, YamlValidatorMixin):
         if self.parent:
             self.children = list(self.children) + [Include(file_name=self.parent)]
         components: Tree = []
-        for component in self.children:
-            if isinstance(component, Include):
-                expanded_components = self.expand_includes(component, yaml_paths)
-                components.extend(expanded_components)
-            else:
-                components.append(component)
+        with stage("include resolution"):
+            for component in self.children:
+                if isinstance(component, Include):
+                    expanded_components = self.expand_includes(component, yaml_paths)
+                    components.extend(expanded_components)
+                else:
+                    components.append(component)
 
         self.merge_components(components)
         pass
@@ -602,7 +632,9 @@ class Device(TypedModel, YamlValidatorMixin):
         self, component: Include, yaml_paths: list[Path]
     ) -> list[ComponentUnion]:
         resolved: list[ComponentUnion] = []
-        include_components = find_components(component.file_name, yaml_paths)
+        include_components = find_components(
+            component.file_name, yaml_paths, self._include_paths
+        )
         for new_component in include_components:
             if isinstance(new_component, Include):
                 resolved.extend(self.expand_includes(new_component, yaml_paths))
@@ -620,10 +652,16 @@ class Device(TypedModel, YamlValidatorMixin):
         return resolved
 
     def merge_components(self, components: Tree) -> None:
+        with stage("merge"):
+            self._merge_components(components)
+
+    def _merge_components(self, components: Tree) -> None:
         merged: list[ComponentUnion | Include] = []
         # Components we may merge on
         # Key is group name, and value is group and index into `merged`
         component_by_name: dict[str, tuple[Group, int]] = {}
+        # Names of the children of every group in `component_by_name`
+        grouped_names: set[str] = set()
 
         for component in components:
             if not isinstance(component, Group):
@@ -641,12 +679,12 @@ class Device(TypedModel, YamlValidatorMixin):
                 continue
 
             if (existing := component_by_name.get(component.name)) is None:
-                for group, _ in component_by_name.values():
-                    # New group, so remove any component that already exists
-                    # in another group
-                    component.children = [
-                        c for c in component.children if c not in group.children
-                    ]
+                # New group, so remove any component that already exists
+                # in another group
+                component.children = [
+                    c for c in component.children if c.name not in grouped_names
+                ]
+                grouped_names.update(c.name for c in component.children)
                 component_by_name[component.name] = (component, len(merged))
                 merged.append(component)
             else:
@@ -666,6 +704,7 @@ class Device(TypedModel, YamlValidatorMixin):
                         merged_children.append(existing_children)
 
                 group.children = merged_children + list(new_children.values())
+                grouped_names.update(new_children)
 
         self.children = merged
 
@@ -677,19 +716,55 @@ class Device(TypedModel, YamlValidatorMixin):
         return json.dumps('{"parameters":[' + param_tree + "]}")
 
 
-def find_components(yaml_name: str, yaml_paths: list[Path]) -> Tree:
+def find_device_yaml(yaml_name: str, yaml_paths: list[Path]) -> Path | None:
+    """Find the YAML or JSON file of the Device with the given name in the search
+    paths"""
+    return find_pvi_yaml(f"{yaml_name}.pvi.device.yaml", yaml_paths)
+
+
+# Validated children of included Devices, keyed by file name, resolved path,
+# modification time and size, so each file is only deserialized once per process
+_components_cache: dict[tuple[str, Path, int, int], list[ComponentUnion | Include]] = {}
+
+
+def find_components(
+    yaml_name: str,
+    yaml_paths: list[Path],
+    include_paths: dict[str, Path] | None = None,
+) -> Tree:
+    """Find the components of the Device with the given name in the search paths.
+
+    Args:
+        yaml_name: Name of the Device (basename of the yaml file)
+        yaml_paths: Directories to search for the Device YAML file
+        include_paths: If given, record the path of the Device YAML file found here
+
+    """
     if yaml_name == "asynPortDriver":
         return []  # asynPortDriver is the most base class and has no parameters
 
-    # Look in this module first
-    device_name = f"{yaml_name}.pvi.device.yaml"
-    device_yaml = find_pvi_yaml(device_name, yaml_paths)
+    with span("find_components", name=yaml_name):
+        # Look in this module first
+        device_yaml = find_device_yaml(yaml_name, yaml_paths)
+
+        if device_yaml is None:
+            raise OSError(
+                f"Cannot find {yaml_name}.pvi.device.yaml or .json in {yaml_paths}"
+            )
+
+        if include_paths is not None:
+            include_paths[yaml_name] = device_yaml
 
-    if device_yaml is None:
-        raise OSError(f"Cannot find {device_name} in {yaml_paths}")
+        stat = device_yaml.stat()
+        key = (yaml_name, device_yaml.resolve(), stat.st_mtime_ns, stat.st_size)
+        if (components := _components_cache.get(key)) is None:
+            device = Device.deserialize(device_yaml)
+            if device.parent:
+                device.children = list(device.children) + [
+                    Include(file_name=device.parent)
+                ]
 
-    device = Device.deserialize(device_yaml)
-    if device.parent:
-        device.children = list(device.children) + [Include(file_name=device.parent)]
+            components = _components_cache[key] = list(device.children)
 
-    return list(device.children)
+        # Return copies, as merging and layout modify the children of Groups
+        return [component.model_copy(deep=True) for component in components]
@@ -17,6 +17,8 @@ from pydantic.json_schema import (
     JsonSchemaMode,
 )
 
+from pvi._counters import count
+
 
 class TypedModel(BaseModel):
     """A Base class for members of tagged unions discriminated by the class name.
@@ -31,11 +33,15 @@ class TypedModel(BaseModel):
     """
 
     # Do not allow extra fields during validation
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", defer_build=True)
 
     # Whether child models have been rebuilt with type field inserted
     models_typed: ClassVar[bool] = False
 
+    def model_post_init(self, context: Any, /) -> None:
+        """Count constructions of models, to show the work done by operations."""
+        count("model construction")
+
     @computed_field  # type: ignore
     @property
     def type(self) -> str:
@@ -128,10 +134,11 @@ def as_tagged_union(union: type[TypedModel]):
     Members will be tagged with their class name to be discriminated by pydantic.
 
     Args:
-        union: `Union` of `TypedModel` to convert to a tagged union
+        union: `Union` of `TypedModel` to convert to a tagged union, or a single
+            `TypedModel`, which is what a `Union` of one member reduces to
 
     """
-    union_members = get_args(union)
+    union_members = get_args(union) or (union,)
 
     return Annotated[
         Union[tuple(cls._tag() for cls in union_members)],  # type: ignore # noqa: UP007
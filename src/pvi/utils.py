@@ -1,10 +1,90 @@
+import hashlib
+import os
+import stat
 from pathlib import Path
 
 
+class PviYamlIndex:
+    """Index of the files in a list of directories, to find files by name.
+
+    Files in directories earlier in the list shadow files with the same name in later
+    directories. The index is rebuilt when the modification time of any of the
+    directories changes, so files can be found without listing the directories again.
+
+    Args:
+        yaml_paths: Directories to index, in search order
+
+    """
+
+    def __init__(self, yaml_paths: list[Path]):
+        self.yaml_paths = list(yaml_paths)
+        self._mtimes: list[int | None] = []
+        # Path of each file name and the position of its directory in `yaml_paths`
+        self._files: dict[str, tuple[int, Path]] = {}
+
+    def _directory_mtimes(self) -> list[int | None]:
+        mtimes: list[int | None] = []
+        for yaml_path in self.yaml_paths:
+            try:
+                st = os.stat(yaml_path)
+            except OSError:
+                mtimes.append(None)
+                continue
+
+            mtimes.append(st.st_mtime_ns if stat.S_ISDIR(st.st_mode) else None)
+
+        return mtimes
+
+    def find(self, *yaml_names: str) -> Path | None:
+        """Find the first file with any of the given names in the indexed directories.
+
+        Names earlier in `yaml_names` are preferred in the same directory.
+        """
+        mtimes = self._directory_mtimes()
+        if mtimes != self._mtimes:
+            files: dict[str, tuple[int, Path]] = {}
+            for position, (yaml_path, mtime) in enumerate(
+                zip(self.yaml_paths, mtimes, strict=True)
+            ):
+                if mtime is not None:
+                    for f in yaml_path.iterdir():
+                        files.setdefault(f.name, (position, f))
+
+            self._files, self._mtimes = files, mtimes
+
+        found = [self._files[name] for name in yaml_names if name in self._files]
+        # min is stable, so keeps the order of names for files in the same directory
+        return min(found, key=lambda file: file[0])[1] if found else None
+
+
+# Indexes shared by every lookup with the same search paths
+_indexes: dict[tuple[Path, ...], PviYamlIndex] = {}
+
+
+def get_pvi_yaml_index(yaml_paths: list[Path]) -> PviYamlIndex:
+    """Get the shared index of the given directories, creating it if necessary"""
+    key = tuple(yaml_paths)
+    if (index := _indexes.get(key)) is None:
+        index = _indexes[key] = PviYamlIndex(yaml_paths)
+
+    return index
+
+
 def find_pvi_yaml(yaml_name: str, yaml_paths: list[Path]) -> Path | None:
-    """Find a yaml file in given directory"""
-    for yaml_path in yaml_paths:
-        if yaml_path.is_dir():
-            if yaml_name in [f.name for f in yaml_path.iterdir()]:
-                return yaml_path / yaml_name
-    return None
+    """Find a yaml file in given directory, or the equivalent .json file.
+
+    A .yaml file is preferred over a .json file in the same directory.
+    """
+    names = [yaml_name]
+    if yaml_name.endswith(".yaml"):
+        names.append(yaml_name.removesuffix(".yaml") + ".json")
+
+    return get_pvi_yaml_index(yaml_paths).find(*names)
+
+
+def hash_file(path: Path) -> str | None:
+    """Hash the content of a file, or return `None` if it cannot be read"""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
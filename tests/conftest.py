@@ -50,3 +50,12 @@ class Helper:
 @pytest.fixture
 def helper():
     return Helper
+
+
+@pytest.fixture(autouse=True)
+def device_cache(tmp_path_factory, monkeypatch):
+    """Give each test an empty device cache rather than the user's cache"""
+    cache_home = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    monkeypatch.delenv("PVI_NO_CACHE", raising=False)
+    return cache_home / "pvi" / "devices.sqlite3"
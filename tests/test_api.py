@@ -1,11 +1,39 @@
+import json
+import os
+import shutil
 from pathlib import Path
 
 import pytest
 from pydantic import ValidationError
 
+from pvi._analyze import Expansion, analyze_device
+from pvi._cache import load_device
+from pvi._counters import count_operations
+from pvi._format.aps import APSFormatter
 from pvi._format.base import Formatter, IndexEntry
-from pvi._format.dls import DLSFormatter
+from pvi._format.bob import BobTemplate
+from pvi._format.dls import DLS_BOB, DLSFormatter
+from pvi._format.screen import Extent, ScreenFormatterFactory, ScreenLayout
 from pvi._format.template import format_template
+from pvi._format.utils import Bounds
+from pvi._format.widget import (
+    ActionWidgetFormatter,
+    GroupFormatter,
+    LabelWidgetFormatter,
+    PVWidgetFormatter,
+    SubScreenWidgetFormatter,
+    WidgetFormatter,
+    WidgetFormatterFactory,
+    load_template,
+    max_x,
+    max_y,
+    next_x,
+)
+from pvi._format.writer import write_if_changed
+from pvi._pv_group import PatternScanner, find_pvs
+from pvi._timings import record_timings
+from pvi._trace import enable_trace
+from pvi._ui_readers import UI_PV_READERS, WidgetPV
 from pvi.device import (
     LED,
     ButtonPanel,
@@ -14,7 +42,9 @@ from pvi.device import (
     DeviceRef,
     Grid,
     Group,
+    Row,
     SignalR,
+    SignalRef,
     SignalRW,
     SignalW,
     SignalX,
@@ -254,6 +284,213 @@ def test_group_sub_screen(tmp_path, helper):
     helper.assert_output_matches(expected_bob, output_bob)
 
 
+def test_count_operations_of_button_panel(tmp_path):
+    formatter_yaml = HERE / "format" / "input" / "dls.bob.pvi.formatter.yaml"
+    formatter = Formatter.deserialize(formatter_yaml)
+
+    counts = []
+    for actions in ({"Start": "1"}, {"Start": "1", "Stop": "0", "Reset": "2"}):
+        device = Device(
+            label="Device",
+            children=[
+                SignalW(
+                    name="Acquire",
+                    write_pv="ACQUIRE",
+                    write_widget=ButtonPanel(actions=actions),
+                )
+            ],
+        )
+        with count_operations() as counted:
+            formatter.format(device, tmp_path / "device.bob")
+        counts.append(counted)
+
+    one, three = counts
+    # Each action is a widget, but the formatter classes are only built once
+    assert three["widget"] == one["widget"] + 2
+    assert three["template deepcopy"] > one["template deepcopy"]
+    assert three["formatter class"] == one["formatter class"]
+    assert one["file written"] == three["file written"] == 1
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize(
+    "device_yaml",
+    [
+        "child.pvi.device.yaml",
+        "static_table.pvi.device.yaml",
+        "stacked.pvi.device.yaml",
+        "all_widgets/ButtonPanel.pvi.device.yaml",
+    ],
+)
+def test_analyze_matches_formatted_widgets(tmp_path, device_yaml):
+    input_path = HERE / "format" / "input"
+    device = load_device(input_path / device_yaml, [input_path])
+    name = Path(device_yaml).name.split(".")[0]
+
+    analysis = analyze_device(device, name)
+    with count_operations() as counts:
+        summary = DLSFormatter().format(device, tmp_path / f"{name}.bob")
+
+    assert analysis.widgets == counts["widget"]
+    assert [screen.name for screen in analysis.screens] == [
+        path.stem for path in summary.paths
+    ]
+    assert (
+        len(analysis.screens) + sum(s.groups for s in analysis.screens)
+        == (counts["group"])
+    )
+
+
+def test_analyze_sub_screens_and_expansions(tmp_path):
+    device = Device(
+        label="Device",
+        children=[
+            SignalRW(
+                name="Acquire",
+                write_pv="ACQUIRE",
+                write_widget=ButtonPanel(actions={"Start": "1", "Stop": "0"}),
+                read_pv="ACQUIRE_RBV",
+                read_widget=LED(),
+            ),
+            DeviceRef(name="Ref", pv="REF", ui="ref"),
+            Group(
+                name="Group1",
+                layout=SubScreen(),
+                children=[
+                    Group(
+                        name="Group2",
+                        layout=SubScreen(),
+                        children=[SignalR(name="A", read_pv="A")],
+                    ),
+                ],
+            ),
+        ],
+    )
+
+    analysis = analyze_device(device, "device")
+    with count_operations() as counts:
+        DLSFormatter().format(device, tmp_path / "device.bob")
+
+    assert analysis.widgets == counts["widget"]
+    assert [(screen.name, screen.depth) for screen in analysis.screens] == [
+        ("device", 0),
+        ("device_Group1", 1),
+        ("device_Group1_Group2", 2),
+    ]
+    assert analysis.max_nesting == 2
+    # A label, a button for each action and the readback
+    assert analysis.button_panels == Expansion(components=1, signals=1, widgets=4)
+    assert analysis.button_panels.factor == 4
+    assert analysis.over_budget(5) == [analysis.screens[0]]
+    assert str(analysis).splitlines()[0] == (
+        f"Device: {analysis.widgets} widgets on 3 screens, Groups nested 2 deep"
+    )
+    single = analyze_device(Device(label="Single"), "single")
+    assert str(single).splitlines()[0] == (
+        "Single: 1 widget on 1 screen, Groups nested 0 deep"
+    )
+
+
+def test_analyze_fails_like_format(tmp_path):
+    # A SignalRef can only refer to a signal earlier on the same screen
+    device = Device(
+        label="Device",
+        children=[
+            SignalR(name="A", read_pv="A"),
+            Group(
+                name="Group1",
+                layout=SubScreen(),
+                children=[SignalRef(name="A")],
+            ),
+        ],
+    )
+
+    with pytest.raises(KeyError, match="A"):
+        DLSFormatter().format(device, tmp_path / "device.bob")
+    with pytest.raises(KeyError, match="A"):
+        analyze_device(device, "device")
+
+
+def test_record_timings_of_sub_screens(tmp_path):
+    formatter_yaml = HERE / "format" / "input" / "dls.bob.pvi.formatter.yaml"
+    formatter = Formatter.deserialize(formatter_yaml)
+    device = Device(
+        label="Device",
+        children=[
+            Group(
+                name=name,
+                layout=SubScreen(),
+                children=[
+                    SignalR(name=f"{name}A", read_pv=f"$(P){name}:A"),
+                    SignalR(name=f"{name}B", read_pv=f"$(P){name}:B"),
+                ],
+            )
+            for name in ("Group1", "Group2")
+        ],
+    )
+
+    with record_timings() as timings:
+        formatter.format(device, tmp_path / "device.bob")
+
+    assert list(timings.stages) == ["layout", "render", "write"]
+    assert all(timing.calls == 3 for timing in timings.stages.values())
+    assert list(timings.screens) == ["device", "device_Group1", "device_Group2"]
+    for stages in timings.screens.values():
+        assert list(stages) == ["layout", "render", "write"]
+        assert all(timing.calls == 1 for timing in stages.values())
+
+    # Rendering excludes the time spent writing, so the screens add up to the total
+    assert timings.stages["render"].seconds == pytest.approx(
+        sum(stages["render"].seconds for stages in timings.screens.values())
+    )
+
+
+def test_trace_sub_screens_in_parallel(tmp_path):
+    formatter_yaml = HERE / "format" / "input" / "dls.bob.pvi.formatter.yaml"
+    formatter = Formatter.deserialize(formatter_yaml)
+    device = Device(
+        label="Device",
+        children=[
+            Group(
+                name=name,
+                layout=SubScreen(),
+                children=[SignalR(name=f"{name}A", read_pv=f"$(P){name}:A")],
+            )
+            for name in ("Group1", "Group2")
+        ],
+    )
+
+    trace_path = tmp_path / "trace.json"
+    enable_trace(trace_path)
+    try:
+        formatter.format(device, tmp_path / "device.bob", jobs=2)
+    finally:
+        enable_trace(None)
+
+    # The closing bracket is optional, as processes append events as spans end
+    events = json.loads(trace_path.read_text().rstrip().rstrip(",") + "]")
+    spans = [event for event in events if event["ph"] == "X"]
+    assert sorted(
+        span["args"]["path"] for span in spans if span["name"] == "write_bob"
+    ) == [
+        str(tmp_path / name)
+        for name in ("device.bob", "device_Group1.bob", "device_Group2.bob")
+    ]
+    assert {span["name"] for span in spans} >= {
+        "ScreenFormatterFactory.create_screen_formatter",
+        "GroupFormatter.format",
+        "write_bob",
+    }
+    # Each screen, including the top screen, is created in a titled span
+    assert sorted(
+        span["args"]["title"]
+        for span in spans
+        if span["name"] == "ScreenFormatterFactory.create_screen_formatter"
+    ) == ["Device", "Group1", "Group2"]
+    # Each sub screen is created in a worker process
+    assert len({span["pid"] for span in spans}) == 3
+
+
 def test_index(tmp_path, helper):
     expected_bob = HERE / "format" / "output" / "index.bob"
     output_bob = tmp_path / "index.bob"
@@ -273,6 +510,60 @@ def test_index(tmp_path, helper):
     helper.assert_output_matches(expected_bob, output_bob)
 
 
+def test_formatter_suffixes():
+    assert DLSFormatter().suffixes() == [".bob", ".edl"]
+    assert APSFormatter().suffixes() == [".adl"]
+
+
+def test_write_if_changed_respects_umask(tmp_path):
+    umask = os.umask(0o027)
+    try:
+        assert write_if_changed(tmp_path / "new.bob", "content")
+    finally:
+        os.umask(umask)
+
+    assert (tmp_path / "new.bob").stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ["new.bob"]
+
+
+def test_format_leaves_unchanged_files_untouched(tmp_path):
+    device = Device(
+        label="Device",
+        children=[
+            SignalR(name="Read", read_pv="$(P)Read"),
+            Group(
+                name="Sub",
+                layout=SubScreen(),
+                children=[SignalW(name="Write", write_pv="$(P)Write")],
+            ),
+        ],
+    )
+    output_bob = tmp_path / "device.bob"
+    sub_screen_bob = tmp_path / "device_Sub.bob"
+
+    summary = DLSFormatter().format(device, output_bob)
+    assert summary.written == [output_bob, sub_screen_bob]
+    assert summary.unchanged == []
+
+    output_bob.chmod(0o600)
+    mtime_ns = output_bob.stat().st_mtime_ns
+    summary = DLSFormatter().format(device, output_bob)
+    assert summary.written == []
+    assert summary.unchanged == [output_bob, sub_screen_bob]
+    assert output_bob.stat().st_mtime_ns == mtime_ns
+
+    # A changed file is replaced, keeping its permissions
+    device.label = "Changed"
+    summary = DLSFormatter().format(device, output_bob)
+    assert summary.written == [output_bob]
+    assert summary.unchanged == [sub_screen_bob]
+    assert output_bob.stat().st_mode & 0o777 == 0o600
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "device.bob",
+        "device_Sub.bob",
+    ]
+
+
 def test_pvi_template(tmp_path, helper):
     read = SignalR(name="Read", read_pv="$(P)Read")
     write = SignalW(name="Write", write_pv="$(P)Write")
@@ -291,3 +582,236 @@ def test_pvi_template(tmp_path, helper):
     format_template(device, "$(P)", output_template)
 
     helper.assert_output_matches(expected_bob, output_template)
+
+
+def test_load_template_is_cached(tmp_path):
+    template_path = tmp_path / "dls.bob"
+    shutil.copy(DLS_BOB, template_path)
+
+    template = load_template(BobTemplate, template_path)
+    assert load_template(BobTemplate, template_path) is template
+    # Each search returns a new copy of the indexed element
+    assert template.search("Label") is not template.search("Label")
+
+    # Changing the content of the template causes it to be parsed again
+    with template_path.open("a") as f:
+        f.write("<!-- Edited -->\n")
+    assert load_template(BobTemplate, template_path) is not template
+
+
+@pytest.mark.parametrize(
+    "bounds,ratio,spacing,expected",
+    [
+        (
+            Bounds(x=10, y=5, w=100, h=20),
+            (1 / 3, 1 / 3, 1 / 3),
+            5,
+            [(10, 30), (45, 30), (80, 30)],
+        ),
+        (Bounds(w=200, h=20), (0.5, 0.5), 5, [(0, 97), (102, 97)]),
+        # Widths are rounded down, so the widgets can fall short of the full width
+        (Bounds(x=10, y=5, w=101, h=20), (0.25, 0.75), 4, [(10, 24), (38, 72)]),
+        (
+            Bounds(x=3, w=100, h=20),
+            (0.1, 0.2, 0.7),
+            2,
+            [(3, 9), (14, 19), (35, 67)],
+        ),
+        (Bounds(w=7, h=1), (1 / 3, 1 / 3, 1 / 3), 0, [(0, 2), (2, 2), (4, 2)]),
+    ],
+)
+def test_bounds_split_by_ratio(bounds, ratio, spacing, expected):
+    split = bounds.split_by_ratio(ratio, spacing)
+    assert [(b.x, b.w) for b in split] == expected
+    assert all((b.y, b.h) == (bounds.y, bounds.h) for b in split)
+
+
+def test_bounds_split_into():
+    bounds = Bounds(w=205, h=20)
+    assert bounds.split_into(4, 5) == (
+        Bounds(x=0, w=47, h=20),
+        Bounds(x=52, w=47, h=20),
+        Bounds(x=104, w=47, h=20),
+        Bounds(x=156, w=47, h=20),
+    )
+
+
+def test_bounds_split_left():
+    left, right = Bounds(x=10, y=5, w=100, h=20).split_left(30, 5)
+    assert left == Bounds(x=10, y=5, w=30, h=20)
+    assert right == Bounds(x=45, y=5, w=65, h=20)
+
+    with pytest.raises(AssertionError, match="Can't split off 100 from 100"):
+        Bounds(w=100, h=20).split_left(95, 5)
+
+
+def test_extent_matches_widget_scan():
+    widgets: list[WidgetFormatter[str]] = [
+        LabelWidgetFormatter[str](bounds=Bounds(x=x, y=y, w=w, h=h), text="")
+        for x, y, w, h in [(0, 0, 10, 20), (50, 5, 5, 5), (20, 60, 10, 10)]
+    ]
+    extent = Extent()
+    assert extent.next_x(4) == next_x([], 4) == 0
+
+    for i in range(len(widgets)):
+        extent.add(widgets[i : i + 1])
+        assert extent.x == max_x(widgets[: i + 1])
+        assert extent.y == max_y(widgets[: i + 1])
+        assert extent.next_x(4) == next_x(widgets[: i + 1], 4)
+
+
+@pytest.mark.parametrize("stacked", [False, True])
+@pytest.mark.parametrize(
+    "component",
+    [
+        SignalR(name="Read", read_pv="READ"),
+        SignalR(name="Lines", read_pv="LINES", read_widget=TextRead(lines=3)),
+        SignalR(name="NoWidget", read_pv="NO_WIDGET", read_widget=None),
+        SignalRW(name="ReadWrite", write_pv="RW", read_pv="RW_RBV"),
+        SignalRW(
+            name="ReadWriteLines",
+            write_pv="RW",
+            write_widget=TextWrite(lines=2),
+            read_pv="RW_RBV",
+        ),
+        SignalW(
+            name="Buttons",
+            write_pv="BUTTONS",
+            write_widget=ButtonPanel(actions={"Go": "1", "Stop": "0"}),
+        ),
+        SignalRW(
+            name="ButtonsReadback",
+            write_pv="BUTTONS",
+            write_widget=ButtonPanel(actions={"Go": "1"}),
+            read_pv="BUTTONS_RBV",
+            read_widget=TextRead(lines=2),
+        ),
+        SignalX(name="Execute", write_pv="EXECUTE"),
+        SignalR(name="Table", read_pv="TABLE", read_widget=TableRead()),
+        DeviceRef(name="Ref", pv="REF", ui="ref.bob"),
+        Group(
+            name="Row",
+            layout=Row(header=["A", "B"]),
+            children=[
+                SignalRW(name="A", write_pv="A", read_pv="A_RBV"),
+                SignalR(name="B", read_pv="B"),
+            ],
+        ),
+        SignalRef(name="Read"),
+    ],
+)
+def test_measure_matches_generated_widgets(component, stacked):
+    factory = ScreenFormatterFactory[str](
+        screen_formatter_cls=GroupFormatter[str],
+        group_formatter_cls=GroupFormatter[str],
+        widget_formatter_factory=WidgetFormatterFactory(
+            header_formatter_cls=LabelWidgetFormatter[str],
+            label_formatter_cls=LabelWidgetFormatter[str],
+            action_formatter_cls=ActionWidgetFormatter[str],
+            sub_screen_formatter_cls=SubScreenWidgetFormatter[str],
+            text_read_formatter_cls=PVWidgetFormatter[str],
+            text_write_formatter_cls=PVWidgetFormatter[str],
+            table_formatter_cls=PVWidgetFormatter[str],
+            button_panel_formatter_cls=PVWidgetFormatter[str],
+        ),
+        layout=ScreenLayout(
+            spacing=4,
+            title_height=26,
+            max_height=900,
+            group_label_height=26,
+            label_width=120,
+            widget_width=120,
+            widget_height=20,
+            group_widget_indent=18,
+            group_width_offset=26,
+        ),
+        components={"Read": SignalR(name="Read", read_pv="READ")},
+    )
+    bounds = Bounds(x=10, y=30, w=400, h=20)
+
+    widgets = list(
+        factory.generate_component_formatters(component, bounds, stacked=stacked)
+    )
+    measured = factory.measure_component_formatters(component, bounds, stacked=stacked)
+    assert measured == max_y(widgets)
+
+
+def test_format_sub_screens_in_parallel(tmp_path):
+    device = Device(
+        label="Device",
+        children=[
+            Group(
+                name=f"Sub{i}",
+                layout=SubScreen(),
+                children=[
+                    SignalR(name=f"Read{i}", read_pv=f"READ{i}"),
+                    Group(
+                        name=f"Nested{i}",
+                        layout=SubScreen(),
+                        children=[SignalW(name=f"Write{i}", write_pv=f"WRITE{i}")],
+                    ),
+                ],
+            )
+            for i in range(3)
+        ],
+    )
+    serial_path = tmp_path / "serial"
+    parallel_path = tmp_path / "parallel"
+    serial_path.mkdir()
+    parallel_path.mkdir()
+
+    serial = DLSFormatter().format(device, serial_path / "device.bob")
+    parallel = DLSFormatter().format(device, parallel_path / "device.bob", jobs=2)
+
+    names = [path.name for path in serial.written]
+    assert names == [
+        "device.bob",
+        "device_Sub0.bob",
+        "device_Sub0_Nested0.bob",
+        "device_Sub1.bob",
+        "device_Sub1_Nested1.bob",
+        "device_Sub2.bob",
+        "device_Sub2_Nested2.bob",
+    ]
+    assert [path.name for path in parallel.written] == names
+    for name in names:
+        assert (parallel_path / name).read_bytes() == (serial_path / name).read_bytes()
+
+
+def test_pattern_scanner_finds_overlapping_matches():
+    scanner = PatternScanner(["he", "she", "his", "hers"])
+
+    assert list(scanner.iter_matches("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_find_pvs_in_text_orders_by_nearest_preceding_y(tmp_path):
+    ui = tmp_path / "device.opi"
+    ui.write_text(
+        "y=30 chan=P:Gain\ny=10 chan=P:GainMode\ny=20 chan=P:Offset\ny=5 P:Gain again\n"
+    )
+
+    assert find_pvs(["P:Gain", "P:GainMode", "P:Offset", "P:Missing"], ui) == (
+        ["P:Gain", "P:GainMode", "P:Offset"],
+        ["P:Missing"],
+    )
+
+
+@pytest.mark.parametrize(
+    "ui,expected",
+    [
+        ("detector.adl", [WidgetPV("Gain", 10, 30), WidgetPV("Offset", 10, 60)]),
+        ("detector.bob", [WidgetPV("Gain", 10, 30), WidgetPV("Offset", 10, 60)]),
+        (
+            "detector.edl",
+            [
+                WidgetPV("Gain", 10, 30),
+                WidgetPV("Offset", 10, 60),
+                WidgetPV("Trace", 10, 80),
+            ],
+        ),
+    ],
+)
+def test_read_ui_pvs(ui, expected):
+    path = HERE / "regroup" / "input" / ui
+
+    assert list(UI_PV_READERS[path.suffix](path)) == expected
@@ -5,9 +5,32 @@ from pvi._convert._asyn_convert import (
     AsynFloat64Waveform,
     AsynInt32Waveform,
     AsynInt64Waveform,
+    AsynRecord,
     AsynWaveform,
+    RecordError,
     get_waveform_parameter,
 )
+from pvi._convert._db_parser import (
+    DbAlias,
+    DbInclude,
+    DbRecord,
+    DbSyntaxError,
+    parse_db,
+)
+from pvi._convert._template_convert import (
+    Action,
+    ParameterRoleMatcher,
+    Readback,
+    SettingPair,
+)
+from pvi._counters import count_operations
+
+ASYN_LINK = "@asyn($(PORT),$(ADDR=0),$(TIMEOUT=1))"
+
+
+def asyn_record(pv: str, link_field: str, link: str) -> AsynRecord:
+    record_type = "ai" if link_field == "INP" else "ao"
+    return AsynRecord(pv=pv, type=record_type, fields={link_field: link}, infos={})
 
 
 @pytest.mark.parametrize(
@@ -32,3 +55,133 @@ def test_get_waveform_parameter(dtyp, expected):
 def test_get_waveform_parameter_unknown_raises():
     with pytest.raises(AssertionError, match="asynUnknown"):
         get_waveform_parameter("asynUnknown")
+
+
+def test_parse_db():
+    db = """\
+# record(ai, "Commented") {}
+include "base.template"
+path "$(TOP)/db"
+alias("$(P)Gain", "$(P)GainAlias")
+menu(menuScan) {
+    choice(menuScanPassive, "Passive")
+}
+grecord(ai, "$(P)Gain")
+{
+    field(DESC, "Gain {in braces} # not a comment")  # A comment
+    field(INP, "@asyn($(PORT),$(ADDR=0),$(TIMEOUT=1))GAIN")
+    #field(PINI, "YES")
+    field(SCAN, $(SCAN=I/O Intr))
+    field(INPB, {pva: {pv: "$(P)Other", proc: true}})
+    info(autosaveFields, "VAL")
+    alias("$(P)Gain2")
+}
+record(bo, $(P)Reset)
+"""
+
+    assert list(parse_db(db.splitlines())) == [
+        DbInclude("base.template"),
+        DbAlias("$(P)Gain", "$(P)GainAlias"),
+        DbRecord(
+            type="ai",
+            name="$(P)Gain",
+            fields={
+                "DESC": "Gain {in braces} # not a comment",
+                "INP": "@asyn($(PORT),$(ADDR=0),$(TIMEOUT=1))GAIN",
+                "SCAN": "$(SCAN=I/O Intr)",
+                "INPB": '{pva:{pv:"$(P)Other",proc:true}}',
+            },
+            infos={"autosaveFields": "VAL"},
+            aliases=["$(P)Gain2"],
+        ),
+        DbRecord(type="bo", name="$(P)Reset"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "db,error",
+    [
+        ('record(ai, "Gain") {\n    field(DESC, "Gain)\n}', "db:2: Unexpected char"),
+        ('record(ai, "Gain") {\n    field(DESC)\n}', "db:2: Expected 2 arguments"),
+        ('record(ai, "Gain") {\n    field(DESC, "Gain")\n', "db:2: Unexpected end"),
+    ],
+)
+def test_parse_db_syntax_error(db, error):
+    with pytest.raises(DbSyntaxError, match=error):
+        list(parse_db(db.splitlines(), "db"))
+
+
+@pytest.mark.parametrize(
+    "link_field,link,parameter_name",
+    [
+        ("INP", f"{ASYN_LINK}GAIN", "GAIN"),
+        ("OUT", f"{ASYN_LINK}GAIN", "GAIN"),
+        ("OUT", "@asyn(PORT,0,1)", None),
+    ],
+)
+def test_asyn_record_parameter_name(link_field, link, parameter_name):
+    with count_operations() as counts:
+        record = asyn_record("$(P)Gain", link_field, link)
+    assert counts["model construction"] == 1
+    assert record.parameter_name == parameter_name
+    with pytest.deprecated_call():
+        assert record.get_parameter_name() == parameter_name
+
+
+@pytest.mark.parametrize(
+    "fields,error",
+    [
+        ({"INP": "$(P)Other CP"}, "no @asyn field"),
+        ({"DESC": "Gain"}, "no input or output field or both"),
+        ({"INP": f"{ASYN_LINK}GAIN", "OUT": f"{ASYN_LINK}GAIN"}, "or both"),
+    ],
+)
+def test_asyn_record_without_asyn_link_raises(fields, error):
+    with pytest.raises(RecordError, match=error):
+        AsynRecord(pv="$(P)Gain", type="ai", fields=fields, infos={})
+
+
+def test_match_records():
+    gain_rbv = asyn_record("$(P)Gain_RBV", "INP", f"{ASYN_LINK}GAIN")
+    temperature = asyn_record("$(P)Temperature", "INP", f"{ASYN_LINK}TEMPERATURE")
+    gain = asyn_record("$(P)Gain", "OUT", f"{ASYN_LINK}GAIN")
+    gain_fine = asyn_record("$(P)GainFine", "OUT", f"{ASYN_LINK}GAIN")
+    reset = asyn_record("$(P)Reset", "OUT", f"{ASYN_LINK}RESET")
+    read_records = [gain_rbv, temperature]
+    write_records = [gain, reset, gain_fine]
+
+    actions = [Action(write_record=reset)]
+    readbacks = [Readback(read_record=temperature)]
+    setting_pairs = [
+        SettingPair(read_record=gain_rbv, write_record=gain),
+        SettingPair(read_record=gain_rbv, write_record=gain_fine),
+    ]
+    assert ParameterRoleMatcher.match_records(read_records, write_records) == [
+        *actions,
+        *readbacks,
+        *setting_pairs,
+    ]
+
+    with pytest.deprecated_call():
+        assert ParameterRoleMatcher.get_actions(read_records, write_records) == actions
+    with pytest.deprecated_call():
+        assert (
+            ParameterRoleMatcher.get_readbacks(read_records, write_records) == readbacks
+        )
+    with pytest.deprecated_call():
+        assert (
+            ParameterRoleMatcher.get_setting_pairs(read_records, write_records)
+            == setting_pairs
+        )
+
+
+def test_match_records_without_parameter_name():
+    # Records whose asyn link has no parameter name are matched with each other
+    read = asyn_record("$(P)Status", "INP", "@asyn(PORT,0,1)")
+    write = asyn_record("$(P)Command", "OUT", "@asyn(PORT,0,1)")
+    unmatched = asyn_record("$(P)Reset", "OUT", f"{ASYN_LINK}RESET")
+
+    assert ParameterRoleMatcher.match_records([read], [write, unmatched]) == [
+        Action(write_record=unmatched),
+        SettingPair(read_record=read, write_record=write),
+    ]
@@ -1,3 +1,4 @@
+import json
 import os
 import shutil
 import subprocess
@@ -5,11 +6,12 @@ import sys
 from pathlib import Path
 
 import pytest
+from typer.testing import CliRunner
 
 from pvi import __version__
 from pvi.__main__ import app
 from pvi._format import Formatter
-from pvi.device import Device, Grid, Group, Include
+from pvi.device import Device, Grid, Group, Include, SignalR, SubScreen
 
 HERE = Path(__file__).parent
 
@@ -19,6 +21,26 @@ def test_cli_version():
     assert subprocess.check_output(cmd).decode().strip() == __version__
 
 
+def imported_modules(code: str) -> list[str]:
+    code += "; import sys; print(*sys.modules)"
+    return subprocess.check_output([sys.executable, "-c", code]).decode().split()
+
+
+def test_cli_imports_lazily():
+    # Commands import their dependencies when run, to start the CLI quickly
+    modules = imported_modules("import pvi.__main__")
+    assert not {"pvi.device", "pydantic", "jinja2", "lxml"} & set(modules)
+
+    # Only the Formatter that is deserialized is imported
+    formatter = HERE / "format" / "input" / "aps.adl.pvi.formatter.yaml"
+    modules = imported_modules(
+        "from pathlib import Path; from pvi._format import Formatter; "
+        f"Formatter.deserialize(Path({str(formatter)!r}))"
+    )
+    assert "pvi._format.aps" in modules
+    assert not {"pvi._format.dls", "lxml"} & set(modules)
+
+
 @pytest.mark.parametrize(
     "filename",
     [
@@ -99,6 +121,30 @@ def test_format_parent_child(tmp_path, helper):
         )
 
 
+def test_format_parent_child_json(tmp_path, helper):
+    expected_path = HERE / "format" / "output" / "parent_child.bob"
+    input_path = HERE / "format" / "input"
+    formatter_path = input_path / "dls.bob.pvi.formatter.yaml"
+    # Includes are found as .pvi.device.json when there is no .pvi.device.yaml
+    json_path = tmp_path / "json"
+    ui_path = tmp_path / "ui"
+    json_path.mkdir()
+    ui_path.mkdir()
+    for name in ("child", "parent", "grandparent"):
+        device = Device.deserialize(input_path / f"{name}.pvi.device.yaml")
+        device.serialize(json_path / f"{name}.pvi.device.json")
+
+    with pytest.deprecated_call():
+        helper.assert_cli_output_matches(
+            app,
+            expected_path,
+            "format --yaml-path " + str(json_path),
+            ui_path / "parent_child.bob",
+            json_path / "child.pvi.device.json",
+            formatter_path,
+        )
+
+
 def test_signal_default_widgets(tmp_path, helper):
     expected_path = HERE / "format" / "output" / "signal_default_widgets.bob"
     input_path = HERE / "format" / "input"
@@ -114,6 +160,331 @@ def test_signal_default_widgets(tmp_path, helper):
         )
 
 
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_format_batch(tmp_path, helper):
+    input_path = HERE / "format" / "input"
+    expected_path = HERE / "format" / "output" / "all_widgets"
+    manifest = tmp_path / "batch.yaml"
+    manifest.write_text(
+        f"""\
+- device: {input_path}/all_widgets/LED.pvi.device.yaml
+  formatter: {input_path}/dls.bob.pvi.formatter.yaml
+  output: output/LED.bob
+  yaml_paths: [{input_path}]
+- device: {input_path}/all_widgets/Missing.pvi.device.yaml
+  formatter: {input_path}/dls.bob.pvi.formatter.yaml
+  output: output/Missing.bob
+- device: {input_path}/all_widgets/TextRead.pvi.device.yaml
+  formatter: {input_path}/dls.edl.pvi.formatter.yaml
+  output: output/TextRead.edl
+"""
+    )
+    (tmp_path / "output").mkdir()
+
+    result = CliRunner().invoke(app, ["format-batch", str(manifest), "--jobs", "2"])
+
+    # The missing device is reported without stopping the other entries
+    assert result.exit_code == 1
+    assert "Missing.bob" in result.output
+    assert "1 of 3 entries failed" in result.output
+    assert sorted(p.name for p in (tmp_path / "output").iterdir()) == [
+        "LED.bob",
+        "TextRead.edl",
+    ]
+    helper.assert_output_matches(
+        expected_path / "LED.bob", tmp_path / "output" / "LED.bob"
+    )
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_format_build_manifest(tmp_path):
+    input_path = HERE / "format" / "input"
+    for name in ("child", "parent", "grandparent"):
+        shutil.copy(input_path / f"{name}.pvi.device.yaml", tmp_path)
+
+    output_path = tmp_path / "child.bob"
+    args = [
+        "format",
+        "--yaml-path",
+        str(tmp_path),
+        "--build-manifest",
+        str(tmp_path / "child.manifest.json"),
+        str(output_path),
+        str(tmp_path / "child.pvi.device.yaml"),
+        str(input_path / "dls.bob.pvi.formatter.yaml"),
+    ]
+
+    result = CliRunner().invoke(app, args)
+    assert result.exit_code == 0
+    assert "up to date" not in result.output
+
+    # Nothing changed, so the UI is not formatted again
+    output_path.write_text("unchanged")
+    result = CliRunner().invoke(app, args)
+    assert result.exit_code == 0
+    assert "up to date" in result.output
+    assert output_path.read_text() == "unchanged"
+
+    # Changing an included device triggers a rebuild
+    parent = tmp_path / "parent.pvi.device.yaml"
+    parent.write_text(parent.read_text() + "\n")
+    result = CliRunner().invoke(app, args)
+    assert result.exit_code == 0
+    assert "up to date" not in result.output
+    assert output_path.read_text() != "unchanged"
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_format_depfile(tmp_path):
+    input_path = HERE / "format" / "input"
+    yaml_path = tmp_path / "device yaml"
+    yaml_path.mkdir()
+    for name in ("child", "parent", "grandparent"):
+        shutil.copy(input_path / f"{name}.pvi.device.yaml", yaml_path)
+
+    output_path = tmp_path / "child.bob"
+    depfile = tmp_path / "child.bob.d"
+    formatter_path = input_path / "dls.bob.pvi.formatter.yaml"
+    result = CliRunner().invoke(
+        app,
+        [
+            "format",
+            "--yaml-path",
+            str(yaml_path),
+            "--depfile",
+            str(depfile),
+            str(output_path),
+            str(yaml_path / "child.pvi.device.yaml"),
+            str(formatter_path),
+        ],
+    )
+    assert result.exit_code == 0
+
+    escaped = str(yaml_path).replace(" ", "\\ ")
+    prerequisites = [
+        f"{escaped}/child.pvi.device.yaml",
+        f"{escaped}/parent.pvi.device.yaml",
+        f"{escaped}/grandparent.pvi.device.yaml",
+        str(formatter_path),
+    ]
+    assert depfile.read_text() == (
+        f"{output_path}:"
+        + "".join(f" \\\n  {p}" for p in prerequisites)
+        + "".join(f"\n\n{p}:" for p in prerequisites)
+        + "\n"
+    )
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_format_with_formatter_without_jobs(tmp_path, monkeypatch):
+    from pvi._format.dls import DLSFormatter
+
+    # A Formatter overriding `format` as it was before `jobs` and `WriteSummary`
+    def format(self: DLSFormatter, device: Device, path: Path) -> None:
+        path.write_text(device.label)
+
+    monkeypatch.setattr(DLSFormatter, "format", format)
+
+    input_path = HERE / "format" / "input"
+    output_path = tmp_path / "static_table.bob"
+    depfile = tmp_path / "static_table.bob.d"
+    device_path = input_path / "static_table.pvi.device.yaml"
+    formatter_path = input_path / "dls.bob.pvi.formatter.yaml"
+    result = CliRunner().invoke(
+        app,
+        [
+            "format",
+            "--depfile",
+            str(depfile),
+            str(output_path),
+            str(device_path),
+            str(formatter_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output == f"{output_path}: 1 written, 0 unchanged\n"
+    assert output_path.read_text() == "StaticTable - $(P)$(R)"
+    assert depfile.read_text().startswith(f"{output_path}:")
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_analyze():
+    input_path = HERE / "format" / "input"
+    device_path = input_path / "static_table.pvi.device.yaml"
+    result = CliRunner().invoke(app, ["analyze", "--json", str(device_path)])
+    assert result.exit_code == 0, result.output
+
+    analysis = json.loads(result.output)
+    assert [screen["name"] for screen in analysis["screens"]] == ["static_table"]
+    assert analysis["widgets"] == analysis["screens"][0]["widgets"] > 0
+    assert analysis["table_rows"]["components"] > 0
+
+    result = CliRunner().invoke(
+        app, ["analyze", "--widget-budget", "10", "--strict", str(device_path)]
+    )
+    assert result.exit_code == 1
+    assert "WARNING: static_table has" in result.output
+    assert "over the budget of 10" in result.output
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_stats():
+    input_path = HERE / "format" / "input"
+    result = CliRunner().invoke(
+        app,
+        [
+            "stats",
+            "--json",
+            "--yaml-path",
+            str(input_path),
+            str(input_path / "child.pvi.device.yaml"),
+            str(input_path / "aps.adl.pvi.formatter.yaml"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    counts = json.loads(result.output)
+    assert counts["file written"] == 1
+    assert counts["regex compile"] > counts["widget"] > 0
+    assert "template deepcopy" not in counts
+    # Nothing is written next to the inputs
+    assert not (input_path / "child.adl").exists()
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_format_timings(tmp_path):
+    input_path = HERE / "format" / "input"
+    timings_path = tmp_path / "timings.json"
+    result = CliRunner().invoke(
+        app,
+        [
+            "format",
+            "--timings-json",
+            str(timings_path),
+            str(tmp_path / "static_table.bob"),
+            str(input_path / "static_table.pvi.device.yaml"),
+            str(input_path / "dls.bob.pvi.formatter.yaml"),
+        ],
+    )
+    assert result.exit_code == 0
+
+    timings = json.loads(timings_path.read_text())
+    assert list(timings["stages"]) == [
+        "cache",
+        "yaml load",
+        "validation",
+        "include resolution",
+        "merge",
+        "layout",
+        "render",
+        "write",
+    ]
+    assert list(timings["screens"]) == ["static_table"]
+    assert list(timings["screens"]["static_table"]) == ["layout", "render", "write"]
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_format_timings_of_sub_screens_in_parallel(tmp_path):
+    device_path = tmp_path / "device.pvi.device.yaml"
+    Device(
+        label="Device",
+        children=[
+            Group(
+                name=name,
+                layout=SubScreen(),
+                children=[SignalR(name=f"{name}A", read_pv=f"$(P){name}:A")],
+            )
+            for name in ("Group1", "Group2", "Group3")
+        ],
+    ).serialize(device_path)
+    timings_path = tmp_path / "timings.json"
+    result = CliRunner().invoke(
+        app,
+        [
+            "format",
+            "--timings-json",
+            str(timings_path),
+            "--jobs",
+            "2",
+            str(tmp_path / "device.bob"),
+            str(device_path),
+            str(HERE / "format" / "input" / "dls.bob.pvi.formatter.yaml"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    # The sub-screens written by worker processes are merged into the timings
+    timings = json.loads(timings_path.read_text())
+    assert sorted(timings["screens"]) == [
+        "device",
+        "device_Group1",
+        "device_Group2",
+        "device_Group3",
+    ]
+    for stages in timings["screens"].values():
+        assert list(stages) == ["layout", "render", "write"]
+    assert timings["stages"]["render"]["calls"] == 4
+    assert timings["stages"]["write"]["calls"] == 4
+
+
+def test_format_trace(tmp_path):
+    input_path = HERE / "format" / "input"
+    trace_path = tmp_path / "trace.json"
+    cmd = [
+        sys.executable,
+        "-W",
+        "ignore::DeprecationWarning",
+        "-m",
+        "pvi",
+        "format",
+        "--yaml-path",
+        str(input_path),
+        str(tmp_path / "child.bob"),
+        str(input_path / "child.pvi.device.yaml"),
+        str(input_path / "dls.bob.pvi.formatter.yaml"),
+    ]
+    subprocess.check_call(cmd, env={**os.environ, "PVI_TRACE": str(trace_path)})
+
+    events = json.loads(trace_path.read_text().rstrip().rstrip(",") + "]")
+    assert events[0]["args"] == {"name": "pvi format"}
+    assert [
+        event["args"]["name"] for event in events if event["name"] == "find_components"
+    ] == ["parent", "grandparent"]
+    # Stages are traced too
+    assert {"Device.deserialize", "yaml load", "write_bob", "write"} <= {
+        event["name"] for event in events
+    }
+    # Every screen written is created in its own span
+    screen_spans = [
+        event
+        for event in events
+        if event["name"] == "ScreenFormatterFactory.create_screen_formatter"
+    ]
+    assert len(screen_spans) == len(list(tmp_path.glob("*.bob"))) == 1
+    assert screen_spans[0]["args"]["title"] == "Child"
+
+
+def test_generate_template_depfile(tmp_path):
+    device_path = HERE / "format" / "input" / "static_table.pvi.device.yaml"
+    output_path = tmp_path / "static_table.template"
+    depfile = tmp_path / "static_table.template.d"
+    result = CliRunner().invoke(
+        app,
+        [
+            "generate-template",
+            "--depfile",
+            str(depfile),
+            str(device_path),
+            "$(P)",
+            str(output_path),
+        ],
+    )
+    assert result.exit_code == 0
+    assert depfile.read_text() == (
+        f"{output_path}: \\\n  {device_path}\n\n{device_path}:\n"
+    )
+
+
 def test_convert_header(tmp_path, helper):
     expected_path = HERE / "convert" / "output"
     input_path = HERE / "convert" / "input"
@@ -129,6 +500,29 @@ def test_convert_header(tmp_path, helper):
     )
 
 
+def test_convert_json(tmp_path):
+    expected_path = HERE / "convert" / "output"
+    input_path = HERE / "convert" / "input"
+    result = CliRunner().invoke(
+        app,
+        [
+            "convert",
+            "device",
+            str(tmp_path),
+            "--json",
+            "--header",
+            str(input_path / "simDetector.h"),
+            "--template",
+            str(input_path / "simDetector.template"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    device = Device.deserialize(tmp_path / "simDetector.pvi.device.json")
+    expected = Device.deserialize(expected_path / "simDetector.pvi.device.yaml")
+    assert device.model_dump() == expected.model_dump()
+
+
 def test_convert_device_name(tmp_path, helper):
     expected_path = HERE / "convert" / "output"
     input_path = HERE / "convert" / "input"
@@ -168,7 +562,8 @@ def test_reconvert(tmp_path, helper):
     )
 
 
-def test_regroup_preserves_includes(tmp_path, helper):
+@pytest.mark.parametrize("ui", ["detector.adl", "detector.bob", "detector.edl"])
+def test_regroup_preserves_includes(tmp_path, helper, ui):
     """Regroup should skip Include nodes and pass them through unchanged."""
     expected_path = HERE / "regroup" / "output"
     input_path = HERE / "regroup" / "input"
@@ -180,7 +575,7 @@ def test_regroup_preserves_includes(tmp_path, helper):
         expected_path / filename,
         "regroup",
         tmp_path / filename,
-        input_path / "detector.adl",
+        input_path / ui,
     )
 
 
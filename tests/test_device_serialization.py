@@ -1,5 +1,7 @@
 import json
 import os
+import shutil
+import sqlite3
 from pathlib import Path
 from typing import Annotated, TypeAlias
 from unittest.mock import patch
@@ -7,6 +9,7 @@ from unittest.mock import patch
 import pytest
 from pydantic import BaseModel, Discriminator, Field, Tag, ValidationError
 
+from pvi._cache import DeviceCache, load_device
 from pvi.device import (
     LED,
     CheckBox,
@@ -21,8 +24,10 @@ from pvi.device import (
     TableWrite,
     TextRead,
     TextWrite,
+    find_components,
 )
 from pvi.typed_model import TypedModel
+from pvi.utils import hash_file
 
 
 @pytest.fixture
@@ -60,6 +65,9 @@ def device():
 DEVICE_YAML = Path(__file__).parent / "test.pvi.device.yaml"
 BAD_DEVICE_YAML = Path(__file__).parent / "bad.pvi.device.yaml"
 DEPRECATED_DEVICE_YAML = Path(__file__).parent / "deprecated.pvi.device.yaml"
+GRANDPARENT_DEVICE_YAML = (
+    Path(__file__).parent / "format" / "input" / "grandparent.pvi.device.yaml"
+)
 
 
 def test_serialize(device: Device):
@@ -82,6 +90,18 @@ def test_deserialize_raises_validation_error():
         Device.deserialize(BAD_DEVICE_YAML)
 
 
+def test_validate_yaml_raises_for_wrong_suffix(tmp_path):
+    device_yaml = tmp_path / "device.yaml"
+    shutil.copy(DEVICE_YAML, device_yaml)
+
+    with pytest.raises(
+        ValueError,
+        match=r"Expected 'device.yaml' to end with '\.pvi\.device\.yaml' or "
+        r"'\.pvi\.device\.json'",
+    ):
+        Device.validate_yaml(device_yaml)
+
+
 @pytest.mark.filterwarnings("error::DeprecationWarning")
 def test_deserialize_parents_raises_deprecation_warning():
     with patch("pvi.device.Device.expand_includes", return_value=[]):
@@ -111,3 +131,165 @@ def test_validate_fails():
 
     with pytest.raises(ValidationError):
         Container(m=NotTypedModel()).model_dump_json()
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_find_components_deserializes_once(tmp_path):
+    device_yaml = tmp_path / "grandparent.pvi.device.yaml"
+    shutil.copy(GRANDPARENT_DEVICE_YAML, device_yaml)
+
+    with patch.object(Device, "deserialize", wraps=Device.deserialize) as deserialize:
+        components = find_components("grandparent", [tmp_path])
+        group = components[0]
+        assert isinstance(group, Group)
+        group.children = []
+
+        # Cached components are not modified by changes to returned copies
+        group = find_components("grandparent", [tmp_path])[0]
+        assert isinstance(group, Group) and group.children
+        assert deserialize.call_count == 1
+
+        # Changing the file causes it to be deserialized again
+        device_yaml.write_text(device_yaml.read_text().replace("Top", "Bottom"))
+        group = find_components("grandparent", [tmp_path])[0]
+        assert isinstance(group, Group)
+        assert group.children[0].name == "GrandParentBottomSignal"
+        assert deserialize.call_count == 2
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_load_device_is_cached(tmp_path, device_cache, monkeypatch):
+    for name in ("child", "parent", "grandparent"):
+        shutil.copy(
+            GRANDPARENT_DEVICE_YAML.parent / f"{name}.pvi.device.yaml", tmp_path
+        )
+    child_yaml = tmp_path / "child.pvi.device.yaml"
+    parent_yaml = tmp_path / "parent.pvi.device.yaml"
+
+    expected = load_device(child_yaml, [tmp_path])
+    assert device_cache.exists()
+
+    with patch.object(Device, "deserialize", wraps=Device.deserialize) as deserialize:
+        device = load_device(child_yaml, [tmp_path])
+        assert device == expected
+        assert device.include_paths == expected.include_paths
+        assert deserialize.call_count == 0
+
+        # Changing an included device misses the cache, deserializing the device and
+        # the changed include
+        parent_yaml.write_text(parent_yaml.read_text().replace("Parent", "Base"))
+        device = load_device(child_yaml, [tmp_path])
+        assert device != expected
+        assert deserialize.call_count == 2
+
+        # Disabling the cache always deserializes the device
+        monkeypatch.setenv("PVI_NO_CACHE", "1")
+        assert load_device(child_yaml, [tmp_path]) == device
+        assert deserialize.call_count == 3
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_load_device_ignores_corrupt_cache_entry(tmp_path, device_cache):
+    for name in ("child", "parent", "grandparent"):
+        shutil.copy(
+            GRANDPARENT_DEVICE_YAML.parent / f"{name}.pvi.device.yaml", tmp_path
+        )
+    child_yaml = tmp_path / "child.pvi.device.yaml"
+
+    expected = load_device(child_yaml, [tmp_path])
+    digest = hash_file(child_yaml)
+    assert digest is not None
+
+    cache = DeviceCache(device_cache)
+    with sqlite3.connect(device_cache) as connection:
+        connection.execute("UPDATE devices SET device = ?", ('{"label": 1}',))
+    assert cache.get(digest, [tmp_path]) is None
+
+    # The corrupt entry is deleted and replaced the next time the device is loaded
+    with sqlite3.connect(device_cache) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM devices").fetchone() == (0,)
+    assert load_device(child_yaml, [tmp_path]) == expected
+    assert cache.get(digest, [tmp_path]) == expected
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_cache_serializes_components_validated_before_schema(tmp_path, device_cache):
+    for name in ("child", "parent", "grandparent"):
+        shutil.copy(
+            GRANDPARENT_DEVICE_YAML.parent / f"{name}.pvi.device.yaml", tmp_path
+        )
+    child_yaml = tmp_path / "child.pvi.device.yaml"
+
+    # Components of includes are cached by `find_components` before the type field
+    # is added to the core schema, and must still serialize without warnings
+    find_components("parent", [tmp_path])
+    Device.model_json_schema()
+    expected = load_device(child_yaml, [tmp_path])
+
+    digest = hash_file(child_yaml)
+    assert digest is not None
+    assert DeviceCache(device_cache).get(digest, [tmp_path]) == expected
+
+
+def test_components_hash_by_name():
+    read = SignalR(name="Gain", read_pv="GAIN_RBV")
+    write = SignalW(name="Gain", write_pv="GAIN")
+
+    assert read == write and hash(read) == hash(write)
+    components = [read, write, SignalR(name="Offset", read_pv="OFFSET")]
+    assert set(components) == set(components[::2])
+
+
+def test_merge_components():
+    device = Device(label="Device", children=[])
+    device.merge_components(
+        [
+            Group(
+                name="Settings",
+                layout=Grid(),
+                children=[
+                    SignalR(name="Gain", read_pv="GAIN_RBV"),
+                    SignalR(name="Offset", read_pv="OFFSET_RBV"),
+                ],
+            ),
+            Group(
+                name="Extra",
+                layout=Grid(),
+                children=[
+                    SignalR(name="Gain", read_pv="OTHER"),
+                    SignalR(name="Temperature", read_pv="TEMP"),
+                ],
+            ),
+            Group(
+                name="Settings",
+                layout=Grid(),
+                children=[
+                    SignalW(name="Offset", write_pv="OFFSET"),
+                    SignalR(name="Exposure", read_pv="EXPOSURE"),
+                ],
+            ),
+            Include(file_name="Parent"),
+            SignalR(name="Status", read_pv="STATUS"),
+        ]
+    )
+
+    # Groups are merged by name, with later components overriding earlier ones and
+    # components only added to the first group they appear in
+    assert device.children == [
+        Group(
+            name="Settings",
+            layout=Grid(),
+            children=[
+                SignalR(name="Gain", read_pv="GAIN_RBV"),
+                SignalW(name="Offset", write_pv="OFFSET"),
+                SignalR(name="Exposure", read_pv="EXPOSURE"),
+            ],
+        ),
+        Group(name="Extra", layout=Grid(), children=[]),
+        Include(file_name="Parent"),
+        SignalR(name="Status", read_pv="STATUS"),
+    ]
+    settings, extra = device.children[:2]
+    assert isinstance(settings, Group) and isinstance(extra, Group)
+    assert [type(c) for c in settings.children] == [SignalR, SignalW, SignalR]
+    assert extra.children == [SignalR(name="Temperature", read_pv="TEMP")]
@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from pvi.utils import PviYamlIndex, find_pvi_yaml
+
+
+def test_find_pvi_yaml_shadowing_order(tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    (first / "a.pvi.device.yaml").touch()
+    (second / "a.pvi.device.yaml").touch()
+    (second / "b.pvi.device.yaml").touch()
+
+    yaml_paths = [tmp_path / "missing", first, second]
+    assert find_pvi_yaml("a.pvi.device.yaml", yaml_paths) == first / "a.pvi.device.yaml"
+    assert (
+        find_pvi_yaml("b.pvi.device.yaml", yaml_paths) == second / "b.pvi.device.yaml"
+    )
+    assert find_pvi_yaml("c.pvi.device.yaml", yaml_paths) is None
+
+
+def test_pvi_yaml_index_lists_directories_once_until_modified(tmp_path):
+    index = PviYamlIndex([tmp_path])
+    (tmp_path / "a.pvi.device.yaml").touch()
+
+    with patch.object(type(tmp_path), "iterdir", autospec=True) as iterdir:
+        iterdir.side_effect = lambda path: list(path.glob("*"))
+        assert index.find("a.pvi.device.yaml") == tmp_path / "a.pvi.device.yaml"
+        assert index.find("b.pvi.device.yaml") is None
+        assert iterdir.call_count == 1
+
+        # Adding a file modifies the directory, so it is indexed again
+        (tmp_path / "b.pvi.device.yaml").touch()
+        assert index.find("b.pvi.device.yaml") == tmp_path / "b.pvi.device.yaml"
+        assert iterdir.call_count == 2